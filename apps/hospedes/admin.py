@@ -5,17 +5,31 @@ from django.http import HttpResponseRedirect
 from django.contrib import messages
 from django.urls import reverse
 from .models import (
-    Pessoa, Contato, RelacionamentoPessoas, Plataforma,
-    Reserva, DocumentoReserva, PessoaReserva
+    Pessoa, Contato, RelacionamentoPessoas, Plataforma, Propriedade,
+    Reserva, DocumentoReserva, PessoaReserva, ImportacaoArquivo,
+    RegistroAlteracao, Blob, PessoaStats, ReservaArquivada
 )
 
 class ContatoInline(admin.TabularInline):
     model = Contato
     extra = 1
 
+def miniatura_documento(obj):
+    """Miniatura com link para o arquivo original; evita carregar o scan completo na listagem."""
+    if not obj or not obj.arquivo:
+        return '-'
+    if obj.miniatura:
+        return format_html(
+            '<a href="{}" target="_blank"><img src="{}" alt="" loading="lazy" style="max-height: 80px;"></a>',
+            obj.arquivo.url, obj.miniatura.url
+        )
+    return format_html('<a href="{}" target="_blank">Visualizar</a>', obj.arquivo.url)
+miniatura_documento.short_description = 'Arquivo'
+
 class DocumentoReservaInline(admin.TabularInline):
     model = DocumentoReserva
     extra = 1
+    readonly_fields = [miniatura_documento]
 
 class PessoaReservaInline(admin.TabularInline):
     model = PessoaReserva
@@ -45,11 +59,17 @@ class PlataformaAdmin(admin.ModelAdmin):
     list_filter = ['ativo']
     search_fields = ['nome']
 
+@admin.register(Propriedade)
+class PropriedadeAdmin(admin.ModelAdmin):
+    list_display = ['nome', 'ativo']
+    list_filter = ['ativo']
+    search_fields = ['nome']
+
 @admin.register(Reserva)
 class ReservaAdmin(admin.ModelAdmin):
-    list_display = ['codigo_confirmacao', 'hospede_principal', 'plataforma', 
+    list_display = ['codigo_confirmacao', 'hospede_principal', 'plataforma', 'propriedade',
                    'data_entrada', 'data_saida', 'noites', 'status', 'ganhos_brutos']
-    list_filter = ['status', 'plataforma']
+    list_filter = ['status', 'plataforma', 'propriedade']
     search_fields = ['codigo_confirmacao', 'hospede_principal__nome']
     readonly_fields = ['created_at', 'updated_at']
     inlines = [DocumentoReservaInline, PessoaReservaInline]
@@ -78,12 +98,66 @@ class DocumentoReservaAdmin(admin.ModelAdmin):
     list_filter = ['tipo_documento']
     search_fields = ['reserva__codigo_confirmacao', 'pessoa__nome']
     
+    readonly_fields = ['get_arquivo', 'blob', 'hash_conteudo', 'tamanho']
+    list_select_related = ['reserva', 'pessoa']
+    
     def get_arquivo(self, obj):
-        if obj.arquivo:
-            return format_html('<a href="{}" target="_blank">Visualizar</a>', obj.arquivo.url)
-        return '-'
+        return miniatura_documento(obj)
     get_arquivo.short_description = 'Arquivo'
 
+@admin.register(PessoaStats)
+class PessoaStatsAdmin(admin.ModelAdmin):
+    list_display = ['pessoa', 'estadias', 'noites', 'get_receita', 'primeira_estadia', 'ultima_estadia']
+    list_filter = ['ultima_estadia']
+    search_fields = ['pessoa__nome']
+    list_select_related = ['pessoa']
+    readonly_fields = ['pessoa', 'estadias', 'noites', 'receita_centavos', 'primeira_estadia',
+                      'ultima_estadia', 'updated_at']
+
+    def get_receita(self, obj):
+        return f'R$ {obj.receita:.2f}'
+    get_receita.short_description = 'Receita'
+    get_receita.admin_order_field = 'receita_centavos'
+
+    # Mantido pelas gravações de Reserva e pelo reconstruir_pessoa_stats
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(ReservaArquivada)
+class ReservaArquivadaAdmin(admin.ModelAdmin):
+    list_display = ['codigo_confirmacao', 'hospede_principal', 'plataforma', 'propriedade',
+                    'data_entrada', 'data_saida', 'status', 'arquivada_em']
+    list_filter = ['status', 'plataforma', 'propriedade']
+    search_fields = ['codigo_confirmacao', 'hospede_principal__nome']
+    list_select_related = ['hospede_principal', 'plataforma', 'propriedade']
+    date_hierarchy = 'data_entrada'
+
+    # Preenchida pelo comando arquivar_reservas
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ['hash', 'tamanho', 'referencias', 'created_at', 'updated_at']
+    search_fields = ['=hash']
+    readonly_fields = ['hash', 'arquivo', 'tamanho', 'referencias', 'created_at', 'updated_at']
+
+    # Blobs são criados pelos uploads e removidos pelo coletar_blobs
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 @admin.register(PessoaReserva)
 class PessoaReservaAdmin(admin.ModelAdmin):
     list_display = ['reserva', 'pessoa', 'tipo_envolvimento']
@@ -93,3 +167,28 @@ class PessoaReservaAdmin(admin.ModelAdmin):
         'pessoa__nome',
         'pessoa__cpf'
     ]
+
+@admin.register(ImportacaoArquivo)
+class ImportacaoArquivoAdmin(admin.ModelAdmin):
+    list_display = ['nome_arquivo', 'plataforma', 'status', 'linhas_processadas',
+                   'criadas', 'atualizadas', 'ignoradas', 'erros', 'created_at', 'concluida_em']
+    list_filter = ['status', 'plataforma']
+    search_fields = ['nome_arquivo', 'fingerprint']
+    readonly_fields = ['fingerprint', 'created_at', 'updated_at', 'concluida_em']
+
+@admin.register(RegistroAlteracao)
+class RegistroAlteracaoAdmin(admin.ModelAdmin):
+    list_display = ['modelo', 'objeto_id', 'acao', 'usuario', 'created_at']
+    list_filter = ['modelo', 'acao']
+    search_fields = ['=objeto_id']
+    readonly_fields = ['modelo', 'objeto_id', 'acao', 'alteracoes', 'usuario', 'created_at']
+
+    # Log somente de inserção
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
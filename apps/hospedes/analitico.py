@@ -0,0 +1,176 @@
+"""
+Histogramas de antecedência, duração da estadia e tamanho do grupo, por
+plataforma e temporada.
+
+As contagens por faixa ficam pré-calculadas em HistogramaReservas (uma linha
+por métrica/plataforma/temporada, com uma lista curta de inteiros), então os
+gráficos leem poucos kilobytes em vez de agregar todas as reservas. Cada
+gravação de Reserva aplica só a diferença: tira a contribuição anterior
+(snapshot do log de alterações) e soma a atual. O comando
+reconstruir_histogramas recalcula tudo (ex.: depois de mudar as faixas),
+incluindo as reservas arquivadas, que continuam contando.
+"""
+
+from bisect import bisect_right
+from collections import Counter
+from datetime import date
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import HistogramaReservas, Reserva, ReservaHistorica
+from .signals import reservas_gravadas_em_lote
+
+# Limite inferior de cada faixa; a última é aberta (ex.: 365+ dias)
+FAIXAS = {
+    'ANTECEDENCIA': (0, 1, 3, 7, 14, 30, 60, 90, 180, 365),
+    'ESTADIA': (1, 2, 3, 4, 5, 7, 10, 14, 28),
+    'GRUPO': (1, 2, 3, 4, 5, 6, 8, 10),
+}
+
+# Férias de verão e de julho; os demais meses são baixa temporada
+MESES_ALTA_TEMPORADA = {12, 1, 2, 7}
+
+CAMPOS_HISTOGRAMA = [
+    'status', 'plataforma_id', 'data_reserva', 'data_entrada', 'noites', 'num_adultos', 'num_criancas',
+]
+
+
+def temporada(data):
+    return 'ALTA' if data.month in MESES_ALTA_TEMPORADA else 'BAIXA'
+
+
+def faixa(metrica, valor):
+    """Índice da faixa de `valor` (valores abaixo do primeiro limite vão para a primeira)."""
+    return max(bisect_right(FAIXAS[metrica], valor) - 1, 0)
+
+
+def rotulos(metrica):
+    limites = FAIXAS[metrica]
+    resultado = []
+    for inicio, fim in zip(limites, limites[1:]):
+        resultado.append(str(inicio) if fim - inicio == 1 else f'{inicio}–{fim - 1}')
+    resultado.append(f'{limites[-1]}+')
+    return resultado
+
+
+def _data(valor):
+    return date.fromisoformat(valor) if isinstance(valor, str) else valor
+
+
+def contribuicoes(estado):
+    """
+    Faixas (metrica, plataforma_id, temporada, faixa) em que uma reserva é
+    contada, a partir de um dict com CAMPOS_HISTOGRAMA. Canceladas e estados
+    incompletos não contam.
+    """
+    if any(estado.get(campo) is None for campo in CAMPOS_HISTOGRAMA) or estado['status'] == 'CANCELADA':
+        return []
+    entrada = _data(estado['data_entrada'])
+    grupo = (estado['plataforma_id'], temporada(entrada))
+    return [
+        ('ANTECEDENCIA', *grupo, faixa('ANTECEDENCIA', (entrada - _data(estado['data_reserva'])).days)),
+        ('ESTADIA', *grupo, faixa('ESTADIA', estado['noites'])),
+        ('GRUPO', *grupo, faixa('GRUPO', estado['num_adultos'] + estado['num_criancas'])),
+    ]
+
+
+def _estado_atual(reserva):
+    return {campo: getattr(reserva, campo) for campo in CAMPOS_HISTOGRAMA}
+
+
+def _estado_anterior(reserva):
+    # Snapshot do log de alterações: valores do banco antes desta gravação
+    return getattr(reserva, '_estado_auditoria', {})
+
+
+def aplicar_deltas(deltas):
+    """Soma `deltas` ({(metrica, plataforma_id, temporada, faixa): n}) aos histogramas gravados."""
+    por_histograma = {}
+    for (metrica, plataforma_id, temporada_, indice), n in deltas.items():
+        if n:
+            por_histograma.setdefault((metrica, plataforma_id, temporada_), []).append((indice, n))
+    if not por_histograma:
+        return
+
+    existentes = {
+        (h.metrica, h.plataforma_id, h.temporada): h
+        for h in HistogramaReservas.objects.select_for_update().filter(
+            plataforma_id__in={chave[1] for chave in por_histograma}
+        )
+    }
+    novos, alterados = [], []
+    for chave, ajustes in por_histograma.items():
+        histograma = existentes.get(chave)
+        if histograma is None:
+            metrica, plataforma_id, temporada_ = chave
+            histograma = HistogramaReservas(metrica=metrica, plataforma_id=plataforma_id, temporada=temporada_)
+            novos.append(histograma)
+        else:
+            alterados.append(histograma)
+        contagens = list(histograma.contagens) + [0] * (len(FAIXAS[chave[0]]) - len(histograma.contagens))
+        for indice, n in ajustes:
+            contagens[indice] = max(contagens[indice] + n, 0)
+        histograma.contagens = contagens
+
+    HistogramaReservas.objects.bulk_create(novos)
+    HistogramaReservas.objects.bulk_update(alterados, ['contagens', 'updated_at'])
+
+
+def calcular_histogramas(queryset=None):
+    """Histogramas (não gravados) de todas as reservas, arquivadas inclusive, num único values_list."""
+    queryset = ReservaHistorica.objects.all() if queryset is None else queryset
+    contagens = Counter()
+    for linha in queryset.exclude(status='CANCELADA').values(*CAMPOS_HISTOGRAMA).order_by().iterator(chunk_size=5000):
+        contagens.update(contribuicoes(linha))
+
+    histogramas = {}
+    for (metrica, plataforma_id, temporada_, indice), n in contagens.items():
+        histograma = histogramas.get((metrica, plataforma_id, temporada_))
+        if histograma is None:
+            histograma = histogramas[(metrica, plataforma_id, temporada_)] = HistogramaReservas(
+                metrica=metrica, plataforma_id=plataforma_id, temporada=temporada_,
+                contagens=[0] * len(FAIXAS[metrica]),
+            )
+        histograma.contagens[indice] = n
+    return list(histogramas.values())
+
+
+def histogramas_para_dict(queryset=None):
+    """Histogramas gravados com os rótulos das faixas, para a API/gráficos."""
+    queryset = HistogramaReservas.objects.all() if queryset is None else queryset
+    return {
+        'faixas': {metrica: rotulos(metrica) for metrica in FAIXAS},
+        'histogramas': list(queryset.values('metrica', 'plataforma__nome', 'temporada', 'contagens')),
+    }
+
+
+@receiver(pre_save, sender=Reserva)
+def guardar_contribuicoes_anteriores(sender, instance, raw=False, **kwargs):
+    instance._histograma_anterior = contribuicoes(_estado_anterior(instance))
+
+
+@receiver(post_save, sender=Reserva)
+def atualizar_histogramas_reserva(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    deltas = Counter(contribuicoes(_estado_atual(instance)))
+    deltas.subtract(getattr(instance, '_histograma_anterior', []))
+    aplicar_deltas(deltas)
+
+
+@receiver(post_delete, sender=Reserva)
+def remover_dos_histogramas(sender, instance, **kwargs):
+    anterior = _estado_anterior(instance) or _estado_atual(instance)
+    deltas = Counter()
+    deltas.subtract(contribuicoes(anterior))
+    aplicar_deltas(deltas)
+
+
+@receiver(reservas_gravadas_em_lote)
+def atualizar_histogramas_lote(sender, reservas, **kwargs):
+    deltas = Counter()
+    for reserva in reservas:
+        deltas.update(contribuicoes(_estado_atual(reserva)))
+        deltas.subtract(contribuicoes(_estado_anterior(reserva)))
+    aplicar_deltas(deltas)
@@ -0,0 +1,389 @@
+"""
+API JSON de Reserva, Pessoa e Contato.
+
+- Listagens com paginação por cursor (keyset): o cursor guarda o valor da
+  ordenação e o id da última linha, então cada página é uma busca por índice,
+  sem OFFSET.
+- `fields=a,b,c` escolhe os campos devolvidos; eles viram o `values_list()`
+  da consulta, e a resposta é montada direto das tuplas, sem instanciar
+  modelos.
+- Filtros de status e intervalos de datas mapeiam para colunas indexadas.
+- POST/PATCH/DELETE gravam pelo modelo (full_clean + save), então log de
+  alterações, estatísticas e demais signals continuam valendo.
+- `reservas/transicoes/` aplica check-in, check-out, finalização ou
+  cancelamento a várias reservas de uma vez (ver apps.hospedes.transicoes).
+
+A autenticação é a mesma sessão do site; gravações exigem o token CSRF
+(cabeçalho X-CSRFToken).
+"""
+
+import base64
+from decimal import Decimal, InvalidOperation
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import ProtectedError, Q
+from django.http import HttpResponse, JsonResponse
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.generic import View
+from djmoney.models.fields import MoneyField
+from djmoney.money import Money
+
+from .models import Contato, Pessoa, Reserva
+
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 500
+
+
+class ErroAPI(Exception):
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.mensagem = mensagem
+        self.status = status
+
+
+def _resposta(dados, status=200):
+    return JsonResponse(dados, status=status, encoder=DjangoJSONEncoder, safe=False)
+
+
+def _lista(valor):
+    return [item for item in valor.split(',') if item]
+
+
+def _data(valor):
+    data = parse_date(valor)
+    if data is None:
+        raise ValueError
+    return data
+
+
+def _data_hora(valor):
+    data_hora = parse_datetime(valor)
+    if data_hora is None:
+        raise ValueError
+    return data_hora
+
+
+class RecursoAPI:
+    """
+    Descrição de um recurso da API. Subclasses informam o modelo, os campos
+    públicos (nome -> caminho no ORM), os filtros aceitos e as ordenações
+    (que precisam ter índice terminando em id).
+    """
+
+    model = None
+    campos = {}
+    campos_padrao = ()
+    gravaveis = ()
+    # parâmetro da query string -> (lookup do ORM, conversor)
+    filtros = {}
+    # valor de ?ordem= -> campo do modelo; '-' no início ordena de forma decrescente
+    ordens = ('id',)
+
+    def get_queryset(self):
+        return self.model.objects.all()
+
+    def campos_pedidos(self, request):
+        pedidos = _lista(request.GET.get('fields', ''))
+        if not pedidos:
+            return list(self.campos_padrao)
+        desconhecidos = [campo for campo in pedidos if campo not in self.campos]
+        if desconhecidos:
+            raise ErroAPI(f'Campos desconhecidos: {", ".join(desconhecidos)}')
+        return pedidos
+
+    def filtrar(self, queryset, request):
+        condicoes = {}
+        for parametro, (lookup, conversor) in self.filtros.items():
+            if parametro not in request.GET:
+                continue
+            try:
+                condicoes[lookup] = conversor(request.GET[parametro])
+            except (ValueError, TypeError):
+                raise ErroAPI(f'Valor inválido para {parametro}: {request.GET[parametro]}')
+        return queryset.filter(**condicoes)
+
+    def serializar(self, nomes, linhas):
+        return [dict(zip(nomes, linha)) for linha in linhas]
+
+    def valores(self, queryset, nomes):
+        return queryset.values_list(*(self.campos[nome] for nome in nomes))
+
+    # Paginação por cursor
+
+    def _ordem(self, request):
+        ordem = request.GET.get('ordem', self.ordens[0])
+        if ordem not in self.ordens:
+            raise ErroAPI(f'Ordem inválida: {ordem}. Opções: {", ".join(self.ordens)}')
+        return ordem.lstrip('-'), ordem.startswith('-')
+
+    def _codificar_cursor(self, valor, pk):
+        # str() preserva os microssegundos que o DjangoJSONEncoder truncaria
+        bruto = json.dumps([valor, pk], default=str).encode()
+        return base64.urlsafe_b64encode(bruto).decode().rstrip('=')
+
+    def _decodificar_cursor(self, cursor, campo):
+        try:
+            valor, pk = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            return self.model._meta.get_field(campo).to_python(valor), int(pk)
+        except (ValueError, TypeError, ValidationError):
+            raise ErroAPI('Cursor inválido')
+
+    def listar(self, request):
+        nomes = self.campos_pedidos(request)
+        campo, decrescente = self._ordem(request)
+        try:
+            limite = min(int(request.GET.get('limite', LIMITE_PADRAO)), LIMITE_MAXIMO)
+        except ValueError:
+            raise ErroAPI('limite deve ser um número')
+        if limite < 1:
+            raise ErroAPI('limite deve ser maior que zero')
+
+        queryset = self.filtrar(self.get_queryset(), request)
+        if request.GET.get('cursor'):
+            valor, pk = self._decodificar_cursor(request.GET['cursor'], campo)
+            lookup = 'lt' if decrescente else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{campo}__{lookup}': valor}) | Q(**{campo: valor, f'pk__{lookup}': pk})
+            )
+        prefixo = '-' if decrescente else ''
+        queryset = queryset.order_by(f'{prefixo}{campo}', f'{prefixo}pk')
+
+        # A chave do cursor vai junto na mesma consulta e sai da resposta
+        linhas = list(queryset.values_list(
+            campo, 'pk', *(self.campos[nome] for nome in nomes)
+        )[:limite + 1])
+        proximo = None
+        if len(linhas) > limite:
+            linhas = linhas[:limite]
+            parametros = request.GET.copy()
+            parametros['cursor'] = self._codificar_cursor(*linhas[-1][:2])
+            proximo = request.build_absolute_uri(f'{request.path}?{parametros.urlencode()}')
+
+        return {
+            'resultados': self.serializar(nomes, (linha[2:] for linha in linhas)),
+            'proximo': proximo,
+        }
+
+    def detalhar(self, request, pk):
+        nomes = self.campos_pedidos(request)
+        linha = self.valores(self.get_queryset().filter(pk=pk), nomes).first()
+        if linha is None:
+            raise ErroAPI('Não encontrado', status=404)
+        return self.serializar(nomes, [linha])[0]
+
+    # Gravação
+
+    def _converter(self, campo, valor):
+        if valor is None:
+            return None
+        if isinstance(campo, MoneyField):
+            try:
+                return Money(Decimal(str(valor)), campo.default_currency)
+            except InvalidOperation:
+                raise ValidationError({campo.name: 'Valor inválido.'})
+        try:
+            return campo.to_python(valor)
+        except ValidationError as e:
+            raise ValidationError({campo.name: e.messages})
+
+    def aplicar(self, instancia, dados):
+        if not isinstance(dados, dict):
+            raise ErroAPI('O corpo deve ser um objeto JSON')
+        desconhecidos = [nome for nome in dados if nome not in self.gravaveis]
+        if desconhecidos:
+            raise ErroAPI(f'Campos não graváveis: {", ".join(desconhecidos)}')
+        for nome, valor in dados.items():
+            try:
+                campo = self.model._meta.get_field(nome.removesuffix('_id'))
+            except FieldDoesNotExist:
+                campo = self.model._meta.get_field(nome)
+            setattr(instancia, campo.attname, self._converter(campo, valor))
+        instancia.full_clean()
+        instancia.save()
+        return instancia
+
+
+class ReservaAPI(RecursoAPI):
+    model = Reserva
+    campos = {
+        'id': 'id',
+        'codigo_confirmacao': 'codigo_confirmacao',
+        'status': 'status',
+        'data_reserva': 'data_reserva',
+        'data_entrada': 'data_entrada',
+        'data_saida': 'data_saida',
+        'noites': 'noites',
+        'num_adultos': 'num_adultos',
+        'num_criancas': 'num_criancas',
+        'valor_bruto': 'valor_bruto',
+        'taxa_servico': 'taxa_servico',
+        'taxa_limpeza': 'taxa_limpeza',
+        'ganhos_brutos': 'ganhos_brutos',
+        'impostos': 'impostos',
+        'hospede_principal_id': 'hospede_principal_id',
+        'hospede_nome': 'hospede_principal__nome',
+        'plataforma_id': 'plataforma_id',
+        'plataforma': 'plataforma__nome',
+        'propriedade_id': 'propriedade_id',
+        'propriedade': 'propriedade__nome',
+        'observacoes': 'observacoes',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+    campos_padrao = (
+        'id', 'codigo_confirmacao', 'status', 'data_entrada', 'data_saida', 'noites',
+        'num_adultos', 'num_criancas', 'valor_bruto', 'hospede_principal_id', 'hospede_nome', 'plataforma',
+        'propriedade',
+    )
+    gravaveis = (
+        'hospede_principal_id', 'plataforma_id', 'propriedade_id', 'codigo_confirmacao', 'data_reserva', 'data_entrada',
+        'data_saida', 'num_adultos', 'num_criancas', 'valor_bruto', 'taxa_servico', 'taxa_limpeza',
+        'ganhos_brutos', 'impostos', 'status', 'observacoes',
+    )
+    filtros = {
+        'status': ('status__in', _lista),
+        'entrada_de': ('data_entrada__gte', _data),
+        'entrada_ate': ('data_entrada__lte', _data),
+        'saida_de': ('data_saida__gte', _data),
+        'saida_ate': ('data_saida__lte', _data),
+        'hospede': ('hospede_principal_id', int),
+        'propriedade': ('propriedade_id', int),
+        'atualizado_desde': ('updated_at__gte', _data_hora),
+    }
+    ordens = ('data_entrada', '-data_entrada', 'data_saida', '-data_saida', 'updated_at', 'id', '-id')
+
+
+class PessoaAPI(RecursoAPI):
+    model = Pessoa
+    campos = {
+        'id': 'id',
+        'nome': 'nome',
+        'cpf': 'cpf',
+        'rg': 'rg',
+        'orgao_emissor': 'orgao_emissor',
+        'endereco': 'endereco',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+    campos_padrao = ('id', 'nome', 'cpf', 'rg')
+    gravaveis = ('nome', 'cpf', 'rg', 'orgao_emissor', 'endereco')
+    filtros = {
+        'cpf': ('cpf', str),
+        'atualizado_desde': ('updated_at__gte', _data_hora),
+    }
+    ordens = ('id', '-id', 'updated_at')
+
+
+class ContatoAPI(RecursoAPI):
+    model = Contato
+    campos = {
+        'id': 'id',
+        'pessoa_id': 'pessoa_id',
+        'tipo': 'tipo',
+        'valor': 'valor',
+        'principal': 'principal',
+        'observacoes': 'observacoes',
+        'updated_at': 'updated_at',
+    }
+    campos_padrao = ('id', 'pessoa_id', 'tipo', 'valor', 'principal')
+    gravaveis = ('pessoa_id', 'tipo', 'valor', 'principal', 'observacoes')
+    filtros = {
+        'pessoa': ('pessoa_id', int),
+        'tipo': ('tipo__in', _lista),
+    }
+    ordens = ('id', '-id')
+
+
+class RecursoView(View):
+    """
+    Coleção (GET lista / POST cria) ou item (GET / PATCH / DELETE) de um
+    recurso. PUT é aceito como sinônimo de PATCH (atualização parcial).
+    """
+
+    recurso_class = None
+    http_method_names = ['get', 'post', 'patch', 'put', 'delete']
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _resposta({'erro': 'Autenticação necessária'}, status=401)
+        self.recurso = self.recurso_class()
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except ErroAPI as e:
+            return _resposta({'erro': e.mensagem}, status=e.status)
+        except ValidationError as e:
+            return _resposta({'erro': 'Dados inválidos', 'campos': e.message_dict}, status=400)
+
+    def _corpo(self, request):
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            raise ErroAPI('JSON inválido')
+
+    def _instancia(self, pk):
+        instancia = self.recurso.get_queryset().filter(pk=pk).first()
+        if instancia is None:
+            raise ErroAPI('Não encontrado', status=404)
+        return instancia
+
+    def get(self, request, pk=None):
+        if pk is None:
+            return _resposta(self.recurso.listar(request))
+        return _resposta(self.recurso.detalhar(request, pk))
+
+    def post(self, request, pk=None):
+        if pk is not None:
+            return self.http_method_not_allowed(request)
+        instancia = self.recurso.aplicar(self.recurso.model(), self._corpo(request))
+        return _resposta(self.recurso.detalhar(request, instancia.pk), status=201)
+
+    def patch(self, request, pk=None):
+        if pk is None:
+            return self.http_method_not_allowed(request)
+        self.recurso.aplicar(self._instancia(pk), self._corpo(request))
+        return _resposta(self.recurso.detalhar(request, pk))
+
+    put = patch
+
+    def delete(self, request, pk=None):
+        if pk is None:
+            return self.http_method_not_allowed(request)
+        try:
+            self._instancia(pk).delete()
+        except ProtectedError:
+            raise ErroAPI('Registro em uso por outros registros', status=409)
+        return HttpResponse(status=204)
+
+
+class TransicaoReservasView(View):
+    """
+    POST {"transicao": "checkin", "ids": [1, 2], "observacoes": "..."}.
+    Responde com as reservas alteradas e as rejeitadas (com o motivo).
+    """
+
+    http_method_names = ['post']
+
+    def post(self, request):
+        from .transicoes import TRANSICOES, executar_transicao
+
+        if not request.user.is_authenticated:
+            return _resposta({'erro': 'Autenticação necessária'}, status=401)
+        try:
+            corpo = json.loads(request.body or b'{}')
+        except ValueError:
+            return _resposta({'erro': 'JSON inválido'}, status=400)
+        if not isinstance(corpo, dict):
+            return _resposta({'erro': 'O corpo deve ser um objeto JSON'}, status=400)
+
+        transicao = corpo.get('transicao')
+        ids = corpo.get('ids')
+        if transicao not in TRANSICOES:
+            return _resposta({'erro': f'Transição inválida. Opções: {", ".join(TRANSICOES)}'}, status=400)
+        if not isinstance(ids, list) or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids):
+            return _resposta({'erro': '"ids" deve ser uma lista de inteiros'}, status=400)
+
+        return _resposta(executar_transicao(
+            transicao, ids, usuario=request.user, observacoes=corpo.get('observacoes')
+        ))
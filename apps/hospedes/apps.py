@@ -1,7 +1,24 @@
 from django.apps import AppConfig
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_migrate
+
+
+def criar_tabela_cache(using=DEFAULT_DB_ALIAS, **kwargs):
+    """Cria a tabela do cache no banco (settings.CACHES); sem efeito com o Redis."""
+    call_command('createcachetable', database=using, verbosity=0)
 
 
 class HospedesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.hospedes'
     verbose_name = 'Gestão de Hóspedes'
+
+    def ready(self):
+        from . import auditoria  # noqa: F401 (conecta os signals do log de alterações)
+        from . import documentos  # noqa: F401 (hash, deduplicação e miniaturas dos uploads)
+        from . import perfil  # noqa: F401 (invalidação das estatísticas do hóspede)
+        from . import operacoes  # noqa: F401 (quadro de operações pré-calculado)
+        from . import analitico  # noqa: F401 (histogramas pré-calculados)
+        from . import arquivo  # noqa: F401 (view do histórico completo, recriada a cada migrate)
+        post_migrate.connect(criar_tabela_cache, sender=self)
@@ -0,0 +1,127 @@
+"""
+Arquivamento de reservas antigas.
+
+Reservas finalizadas ou canceladas com saída anterior ao horizonte
+(ARQUIVO_HORIZONTE_DIAS) saem de Reserva, junto com as linhas de
+PessoaReserva e DocumentoReserva, para as tabelas de arquivo
+(ReservaArquivada, PessoaReservaArquivada, DocumentoReservaArquivado), com os
+ids originais. Cada lote é um INSERT ... SELECT e um DELETE por tabela, na
+mesma transação, sem instanciar modelos nem disparar signals: estatísticas,
+histogramas e log de alterações continuam valendo, já que os totais não mudam.
+
+Dashboard, API e importação trabalham só com as tabelas quentes. Relatórios
+e agregados que precisam do histórico completo leem ReservaHistorica, uma
+view UNION ALL das duas tabelas. A view é removida antes do migrate (o
+SQLite recria tabelas ao alterar colunas) e recriada depois, com as colunas
+atuais de Reserva.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models.signals import post_migrate, pre_migrate
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import (
+    DocumentoReserva, DocumentoReservaArquivado, PessoaReserva, PessoaReservaArquivada,
+    Reserva, ReservaArquivada, ReservaHistorica,
+)
+
+STATUS_ARQUIVAVEIS = ('FINALIZADA', 'CANCELADA')
+BATCH_SIZE = 1000
+
+# Tabela quente -> tabela de arquivo, na ordem de cópia
+TABELAS = [
+    (Reserva, ReservaArquivada, 'pk'),
+    (PessoaReserva, PessoaReservaArquivada, 'reserva_id'),
+    (DocumentoReserva, DocumentoReservaArquivado, 'reserva_id'),
+]
+
+
+def arquivaveis(hoje=None, dias=None):
+    """Reservas encerradas com saída anterior a hoje - `dias`."""
+    hoje = hoje or timezone.localdate()
+    dias = settings.ARQUIVO_HORIZONTE_DIAS if dias is None else dias
+    return Reserva.objects.filter(
+        status__in=STATUS_ARQUIVAVEIS,
+        data_saida__lt=hoje - timedelta(days=dias),
+    )
+
+
+def _copiar(queryset, destino):
+    """INSERT INTO destino (...) SELECT ... das colunas em comum com a origem."""
+    campos = {f.column for f in queryset.model._meta.concrete_fields}
+    colunas = [f.column for f in destino._meta.concrete_fields if f.column in campos]
+    connection = connections[queryset.db]
+    sql, params = queryset.order_by().values_list(*colunas).query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {connection.ops.quote_name(destino._meta.db_table)} '
+            f'({", ".join(map(connection.ops.quote_name, colunas))}) {sql}',
+            params,
+        )
+        return cursor.rowcount
+
+
+def arquivar_reservas(hoje=None, dias=None, batch_size=BATCH_SIZE, dry_run=False):
+    """
+    Move as reservas arquiváveis para as tabelas de arquivo, em lotes de
+    `batch_size` reservas (uma transação por lote). Retorna
+    {'reservas': n, 'pessoas': n, 'documentos': n}.
+    """
+    pendentes = arquivaveis(hoje, dias)
+    if dry_run:
+        pks = pendentes.values('pk')
+        return {
+            'reservas': pendentes.count(),
+            'pessoas': PessoaReserva.objects.filter(reserva_id__in=pks).count(),
+            'documentos': DocumentoReserva.objects.filter(reserva_id__in=pks).count(),
+        }
+
+    contagens = dict.fromkeys(['reservas', 'pessoas', 'documentos'], 0)
+    while True:
+        with transaction.atomic():
+            pks = list(pendentes.select_for_update().order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+            for (origem, destino, campo), chave in zip(TABELAS, contagens):
+                contagens[chave] += _copiar(origem.objects.filter(**{f'{campo}__in': pks}), destino)
+            # Dependentes antes das reservas; DELETE direto, sem coletar objetos nem signals
+            for origem, _, campo in reversed(TABELAS):
+                queryset = origem.objects.filter(**{f'{campo}__in': pks})
+                queryset._raw_delete(queryset.db)
+    return contagens
+
+
+def _sql_view(connection):
+    qn = connection.ops.quote_name
+    colunas = ', '.join(qn(f.column) for f in ReservaHistorica._meta.concrete_fields)
+    return (
+        f'CREATE VIEW {qn(ReservaHistorica._meta.db_table)} AS '
+        f'SELECT {colunas} FROM {qn(Reserva._meta.db_table)} '
+        f'UNION ALL SELECT {colunas} FROM {qn(ReservaArquivada._meta.db_table)}'
+    )
+
+
+@receiver(pre_migrate)
+def remover_view_historico(sender, plan=None, using=DEFAULT_DB_ALIAS, **kwargs):
+    if sender.name != 'apps.hospedes' or not plan:
+        return
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP VIEW IF EXISTS {connection.ops.quote_name(ReservaHistorica._meta.db_table)}')
+
+
+@receiver(post_migrate)
+def criar_view_historico(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    if sender.name != 'apps.hospedes':
+        return
+    connection = connections[using]
+    existentes = set(connection.introspection.table_names(include_views=True))
+    if ReservaHistorica._meta.db_table in existentes:
+        return
+    if {Reserva._meta.db_table, ReservaArquivada._meta.db_table} <= existentes:
+        with connection.cursor() as cursor:
+            cursor.execute(_sql_view(connection))
@@ -0,0 +1,236 @@
+"""
+Pipeline dos arquivos estáticos (comando montar_assets).
+
+Bootstrap e Bootstrap Icons ficam versionados em static/vendor (baixados
+uma vez com `montar_assets --baixar`, nas versões fixadas em VENDOR) e são
+conferidos pelo SHA-256 registrado em vendor.lock.json, também versionado.
+O build (bin/post_compile) não acessa a rede: com ASSETS_BUNDLES ligado,
+arquivo ausente, fora do lock ou com conteúdo diferente interrompe o build.
+Desligado (o padrão enquanto static/vendor não estiver versionado), o build
+só confere as fontes do projeto e os templates, e o vendor vem do CDN.
+Os bundles de BUNDLES juntam vendor e CSS/JS do projeto num arquivo por
+página em static/dist: CSS minificado, com os url() reescritos para o
+diretório do bundle, e sem comentários sourceMappingURL (os .map não são
+versionados). Referências ausentes (fontes dos bundles, url() do CSS,
+{% static %} e bundles usados nos templates) interrompem o build.
+
+O collectstatic (CompressedManifestStaticFilesStorage do WhiteNoise) gera os
+nomes com hash do conteúdo e as variantes .gz/.br, servidas com cache longo.
+Sem ASSETS_BUNDLES, as tags {% bundle_css %}/{% bundle_js %} incluem as
+fontes uma a uma, usando o CDN para vendor ainda não baixado.
+"""
+
+import gzip
+import hashlib
+import json
+import posixpath
+import re
+import urllib.request
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.template.utils import get_app_template_dirs
+
+CDN_BOOTSTRAP = 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist'
+CDN_ICONS = 'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.2/font'
+
+# Caminho em static/ -> URL de origem
+VENDOR = {
+    'vendor/bootstrap/bootstrap.min.css': f'{CDN_BOOTSTRAP}/css/bootstrap.min.css',
+    'vendor/bootstrap/bootstrap.bundle.min.js': f'{CDN_BOOTSTRAP}/js/bootstrap.bundle.min.js',
+    'vendor/bootstrap-icons/bootstrap-icons.min.css': f'{CDN_ICONS}/bootstrap-icons.min.css',
+    'vendor/bootstrap-icons/fonts/bootstrap-icons.woff2': f'{CDN_ICONS}/fonts/bootstrap-icons.woff2',
+    'vendor/bootstrap-icons/fonts/bootstrap-icons.woff': f'{CDN_ICONS}/fonts/bootstrap-icons.woff',
+}
+VENDOR_LOCK = 'vendor/vendor.lock.json'
+
+_BASE_CSS = [
+    'vendor/bootstrap/bootstrap.min.css',
+    'vendor/bootstrap-icons/bootstrap-icons.min.css',
+    'css/base.css',
+]
+
+# Um CSS e um JS por página; a ordem das fontes é a ordem de inclusão
+BUNDLES = {
+    'base.css': _BASE_CSS,
+    'hospedes.css': [*_BASE_CSS, 'css/hospedes/dashboard.css'],
+    'login.css': [*_BASE_CSS, 'css/auth/login.css'],
+    'base.js': ['vendor/bootstrap/bootstrap.bundle.min.js', 'js/base.js'],
+}
+DIST = 'dist'
+
+URL_CSS_RE = re.compile(r'url\(\s*([\'"]?)(.*?)\1\s*\)')
+SOURCE_MAP_RE = re.compile(r'^\s*(?://|/\*)# sourceMappingURL=.*$', re.MULTILINE)
+COMENTARIO_CSS_RE = re.compile(r'/\*(?!!).*?\*/', re.DOTALL)
+ESPACOS_CSS_RE = re.compile(r'\s*([{};,>])\s*')
+TEMPLATE_REF_RE = re.compile(r'{%\s*(static|bundle_css|bundle_js)\s+[\'"]([^\'"]+)[\'"]')
+
+
+class ErroAssets(Exception):
+    """Build interrompido; `faltando` lista as referências não encontradas."""
+
+    def __init__(self, faltando):
+        self.faltando = faltando
+        super().__init__('Referências ausentes:\n' + '\n'.join(f'  - {item}' for item in faltando))
+
+
+def diretorio_static():
+    """Primeiro diretório de STATICFILES_DIRS: recebe vendor/ e dist/."""
+    return Path(settings.STATICFILES_DIRS[0])
+
+
+def caminho_bundle(nome):
+    return f'{DIST}/{nome}'
+
+
+def usar_bundles():
+    return settings.ASSETS_BUNDLES
+
+
+def fontes_para_dev(nome):
+    """URLs das fontes de um bundle, para incluir uma a uma em desenvolvimento."""
+    from django.templatetags.static import static
+
+    return [
+        VENDOR[fonte] if fonte in VENDOR and not finders.find(fonte) else static(fonte)
+        for fonte in BUNDLES[nome]
+    ]
+
+
+def _sha256(dados):
+    return hashlib.sha256(dados).hexdigest()
+
+
+def _ler_lock():
+    caminho = diretorio_static() / VENDOR_LOCK
+    return json.loads(caminho.read_text()) if caminho.exists() else {}
+
+
+def baixar_vendor(forcar=False):
+    """
+    Baixa os arquivos de VENDOR ausentes (ou todos, com `forcar`) e atualiza o
+    lock; arquivos já presentes e ainda sem registro entram no lock como estão.
+    """
+    lock = _ler_lock()
+    original = dict(lock)
+    baixados = []
+    for destino, url in VENDOR.items():
+        caminho = diretorio_static() / destino
+        if caminho.exists() and not forcar:
+            lock.setdefault(destino, _sha256(caminho.read_bytes()))
+            continue
+        with urllib.request.urlopen(url, timeout=30) as resposta:
+            dados = resposta.read()
+        if destino.endswith(('.css', '.js')):
+            dados = SOURCE_MAP_RE.sub('', dados.decode('utf-8')).encode('utf-8')
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        caminho.write_bytes(dados)
+        lock[destino] = _sha256(dados)
+        baixados.append(destino)
+
+    if lock != original:
+        (diretorio_static() / VENDOR_LOCK).write_text(json.dumps(lock, indent=2, sort_keys=True) + '\n')
+    return baixados
+
+
+def verificar_vendor():
+    """Arquivos de VENDOR ausentes ou com conteúdo diferente do registrado no lock."""
+    lock = _ler_lock()
+    problemas = []
+    for destino in VENDOR:
+        caminho = diretorio_static() / destino
+        if not caminho.exists():
+            problemas.append(f'{destino} (rode montar_assets --baixar e versione static/vendor)')
+        elif destino not in lock:
+            problemas.append(f'{destino} (sem registro no {VENDOR_LOCK})')
+        elif _sha256(caminho.read_bytes()) != lock[destino]:
+            problemas.append(f'{destino} (difere do {VENDOR_LOCK})')
+    return problemas
+
+
+def minificar_css(css):
+    """Remove comentários (menos os /*! de licença) e espaços desnecessários."""
+    css = COMENTARIO_CSS_RE.sub('', css)
+    css = re.sub(r'\s+', ' ', css)
+    return ESPACOS_CSS_RE.sub(r'\1', css).replace(';}', '}').strip()
+
+
+def _reescrever_urls(css, fonte, faltando):
+    """Torna os url() relativos a dist/ e confere se os arquivos existem."""
+    origem = posixpath.dirname(fonte)
+
+    def reescrever(match):
+        url = match.group(2)
+        if not url or url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        caminho, sufixo = re.match(r'([^?#]*)(.*)', url).groups()
+        alvo = posixpath.normpath(posixpath.join(origem, caminho))
+        if not finders.find(alvo):
+            faltando.append(f'{fonte}: url({url})')
+        return f'url("{posixpath.relpath(alvo, DIST)}{sufixo}")'
+
+    return URL_CSS_RE.sub(reescrever, css)
+
+
+def montar_bundle(nome, faltando):
+    partes = []
+    for fonte in BUNDLES[nome]:
+        caminho = finders.find(fonte)
+        if not caminho:
+            faltando.append(f'bundle {nome}: {fonte}')
+            continue
+        conteudo = SOURCE_MAP_RE.sub('', Path(caminho).read_text(encoding='utf-8'))
+        if nome.endswith('.css'):
+            conteudo = minificar_css(_reescrever_urls(conteudo, fonte, faltando))
+        partes.append(conteudo.strip())
+    # O ; separa scripts que terminam sem ponto e vírgula
+    return ('\n' if nome.endswith('.css') else '\n;\n').join(partes) + '\n'
+
+
+def verificar_fontes():
+    """Fontes do projeto (fora de VENDOR) usadas pelos bundles que não existem."""
+    return [
+        f'bundle {nome}: {fonte}'
+        for nome, fontes in BUNDLES.items()
+        for fonte in fontes
+        if fonte not in VENDOR and not finders.find(fonte)
+    ]
+
+
+def verificar_templates():
+    """Referências {% static %} e bundles dos templates do projeto que não existem."""
+    base = Path(settings.BASE_DIR)
+    diretorios = [Path(d) for engine in settings.TEMPLATES for d in engine.get('DIRS', [])]
+    diretorios += [Path(d) for d in get_app_template_dirs('templates') if Path(d).is_relative_to(base)]
+    faltando = []
+    for diretorio in diretorios:
+        for template in sorted(diretorio.rglob('*.html')):
+            for tag, valor in TEMPLATE_REF_RE.findall(template.read_text(encoding='utf-8')):
+                if tag == 'static':
+                    existe = valor.startswith(f'{DIST}/') and valor[len(DIST) + 1:] in BUNDLES or finders.find(valor)
+                else:
+                    existe = valor in BUNDLES
+                if not existe:
+                    faltando.append(f'{template.relative_to(base)}: {{% {tag} \'{valor}\' %}}')
+    return faltando
+
+
+def montar_assets():
+    """
+    Confere vendor e templates e grava os bundles em static/dist. Retorna
+    {bundle: (bytes, bytes com gzip)}; levanta ErroAssets se faltar algo.
+    """
+    faltando = verificar_vendor()
+    bundles = {}
+    if not faltando:
+        bundles = {nome: montar_bundle(nome, faltando).encode('utf-8') for nome in BUNDLES}
+    faltando += verificar_templates()
+    if faltando:
+        raise ErroAssets(faltando)
+
+    destino = diretorio_static() / DIST
+    destino.mkdir(exist_ok=True)
+    for nome, dados in bundles.items():
+        (destino / nome).write_bytes(dados)
+    return {nome: (len(dados), len(gzip.compress(dados))) for nome, dados in bundles.items()}
@@ -0,0 +1,142 @@
+"""
+Log de alterações de Reserva e Pessoa com gravação em lote.
+
+Os signals enfileiram os registros no buffer ativo (por requisição, via
+AuditoriaMiddleware, ou por lote de importação) e o buffer grava tudo com um
+único bulk_create ao final. Sem buffer ativo, o registro é gravado na hora.
+Blocos que podem ser revertidos sem abortar o lote (savepoints) usam
+`atomic_auditado`, que descarta do buffer o que foi enfileirado no bloco.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Pessoa, RegistroAlteracao, Reserva
+
+MODELOS_AUDITADOS = (Pessoa, Reserva)
+
+buffer_atual: ContextVar = ContextVar('auditoria_buffer', default=None)
+
+
+class BufferAuditoria:
+    def __init__(self, usuario=None):
+        self.usuario = usuario
+        self.registros = []
+
+    def adicionar(self, registro):
+        self.registros.append(registro)
+
+    def flush(self):
+        """Grava os registros pendentes com um único INSERT."""
+        if not self.registros:
+            return
+        usuario = self.usuario() if callable(self.usuario) else self.usuario
+        if usuario is not None and not getattr(usuario, 'is_authenticated', False):
+            usuario = None
+        for registro in self.registros:
+            if registro.usuario_id is None:
+                registro.usuario = usuario
+        RegistroAlteracao.objects.bulk_create(self.registros)
+        self.registros = []
+
+
+@contextmanager
+def lote_auditoria(usuario=None):
+    """
+    Acumula os registros de alteração gerados no bloco e grava-os ao sair.
+    Se o bloco levantar exceção, os registros são descartados: a alteração
+    foi revertida (ou não terminou) e não deve aparecer no log.
+
+    `usuario` pode ser um usuário ou uma função que o retorna (resolvida só na
+    gravação). Um bloco aninhado (ex.: lote de importação dentro de uma
+    requisição) grava os seus registros ao sair e herda o usuário do externo.
+    """
+    externo = buffer_atual.get()
+    if usuario is None and externo is not None:
+        usuario = externo.usuario
+
+    buffer = BufferAuditoria(usuario)
+    token = buffer_atual.set(buffer)
+    try:
+        yield buffer
+    finally:
+        buffer_atual.reset(token)
+    buffer.flush()
+
+
+@contextmanager
+def atomic_auditado(using=None):
+    """
+    transaction.atomic() que, se o bloco for revertido, descarta os registros
+    enfileirados nele no buffer ativo (que só grava no final do lote).
+    """
+    buffer = buffer_atual.get()
+    inicio = len(buffer.registros) if buffer is not None else 0
+    try:
+        with transaction.atomic(using=using):
+            yield
+    except Exception:
+        if buffer is not None:
+            del buffer.registros[inicio:]
+        raise
+
+
+def registrar(registro):
+    buffer = buffer_atual.get()
+    if buffer is not None:
+        buffer.adicionar(registro)
+    else:
+        registro.save()
+
+
+def registrar_operacao_em_lote(instancias, acao='ALTERACAO'):
+    """
+    Registra as alterações de instâncias gravadas com bulk_create/bulk_update,
+    que não disparam signals. Chame depois da gravação em lote.
+    """
+    for instance in instancias:
+        alteracoes = instance.diff_auditoria()
+        instance._estado_auditoria = instance._estado_auditavel()
+        if not alteracoes and acao == 'ALTERACAO':
+            continue
+        registrar(RegistroAlteracao(
+            modelo=instance._meta.model_name,
+            objeto_id=instance.pk,
+            acao=acao,
+            alteracoes=alteracoes,
+        ))
+
+
+@receiver(post_save)
+def registrar_gravacao(sender, instance, created, raw=False, **kwargs):
+    if sender not in MODELOS_AUDITADOS or raw:
+        return
+
+    alteracoes = instance.diff_auditoria()
+    instance._estado_auditoria = instance._estado_auditavel()
+    if not alteracoes and not created:
+        return
+
+    registrar(RegistroAlteracao(
+        modelo=sender._meta.model_name,
+        objeto_id=instance.pk,
+        acao='CRIACAO' if created else 'ALTERACAO',
+        alteracoes=alteracoes,
+    ))
+
+
+@receiver(post_delete)
+def registrar_exclusao(sender, instance, **kwargs):
+    if sender not in MODELOS_AUDITADOS:
+        return
+
+    registrar(RegistroAlteracao(
+        modelo=sender._meta.model_name,
+        objeto_id=instance.pk,
+        acao='EXCLUSAO',
+        alteracoes={campo: [valor, None] for campo, valor in instance._estado_auditavel().items()},
+    ))
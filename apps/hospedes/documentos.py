@@ -0,0 +1,220 @@
+"""
+Pipeline de upload dos documentos das reservas.
+
+O arquivo enviado é lido em blocos para calcular o SHA-256 e guardado num
+armazenamento endereçado pelo conteúdo (`Blob`, em blobs/ab/cd/<sha256>). Se o
+mesmo conteúdo já foi enviado antes, o documento passa a referenciar o blob
+existente e nada é gravado no storage. Arquivos novos são gravados em blocos
+(`chunks()`), sem carregar o scan inteiro na memória; os que já chegam
+gravados fora de blobs/ (FieldFile.save) passam pelo mesmo caminho e a cópia
+avulsa é apagada. Os signals mantêm a contagem de referências de cada blob;
+o comando `coletar_blobs` remove os que ficaram sem referência.
+
+As miniaturas das imagens são geradas depois do commit, numa thread de
+segundo plano, e o comando `gerar_miniaturas` processa as que ficaram
+pendentes (por exemplo, após um restart do servidor). O Pillow só é
+importado quando um documento é gravado ou uma miniatura é gerada: o módulo
+é carregado no ready() de todo processo, inclusive os de linha de comando.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Blob, DocumentoReserva, DocumentoReservaArquivado, caminho_blob
+
+logger = logging.getLogger(__name__)
+
+MINIATURA_TAMANHO = (320, 320)
+MINIATURA_QUALIDADE = 70
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='miniaturas')
+
+
+def hash_arquivo(arquivo):
+    """Calcula SHA-256 e tamanho de um arquivo (File/UploadedFile) lendo em blocos."""
+    digest = hashlib.sha256()
+    tamanho = 0
+    for chunk in arquivo.chunks():
+        digest.update(chunk)
+        tamanho += len(chunk)
+    arquivo.seek(0)
+    return digest.hexdigest(), tamanho
+
+
+def obter_blob(arquivo, hash_conteudo, tamanho):
+    """
+    Retorna o blob do conteúdo, gravando o arquivo no storage apenas se ele
+    ainda não existir (reaproveitamento sem cópia para conteúdos repetidos).
+    """
+    blob = Blob.objects.filter(hash=hash_conteudo).first()
+    if blob and blob.arquivo.storage.exists(blob.arquivo.name):
+        return blob
+
+    storage = Blob._meta.get_field('arquivo').storage
+    nome = caminho_blob(hash_conteudo, os.path.splitext(arquivo.name)[1])
+    if not storage.exists(nome):
+        nome = storage.save(nome, arquivo)
+    if blob:
+        # Registro existente cujo arquivo sumiu do storage
+        blob.arquivo.name = nome
+        blob.save(update_fields=['arquivo', 'updated_at'])
+        return blob
+    blob, _ = Blob.objects.get_or_create(
+        hash=hash_conteudo,
+        defaults={'arquivo': nome, 'tamanho': tamanho}
+    )
+    return blob
+
+
+def preparar_arquivo(documento):
+    """
+    Calcula o hash de um arquivo recém-enviado e aponta o documento para o
+    blob desse conteúdo (e para a miniatura, se já houver uma).
+    """
+    hash_conteudo, tamanho = hash_arquivo(documento.arquivo)
+    documento.hash_conteudo = hash_conteudo
+    documento.tamanho = tamanho
+
+    documento.blob = obter_blob(documento.arquivo, hash_conteudo, tamanho)
+    documento.arquivo.name = documento.blob.arquivo.name
+    documento.arquivo._committed = True
+    documento.miniatura = DocumentoReserva.objects.filter(
+        hash_conteudo=hash_conteudo
+    ).exclude(miniatura='').values_list('miniatura', flat=True).first() or ''
+
+
+def _ajustar_referencias(blob_id, delta):
+    if blob_id:
+        Blob.objects.filter(pk=blob_id).update(
+            referencias=F('referencias') + delta, updated_at=timezone.now()
+        )
+
+
+def eh_imagem(nome):
+    from PIL import Image
+
+    return os.path.splitext(nome)[1].lower() in Image.registered_extensions()
+
+
+def gerar_miniatura(documento):
+    """
+    Gera a miniatura JPEG de um documento de imagem. Retorna False para
+    arquivos que não são imagens (PDFs, por exemplo).
+    """
+    caminho = documento.miniatura.field.generate_filename(
+        documento, f'{documento.hash_conteudo or documento.pk}.jpg'
+    )
+    storage = documento.miniatura.storage
+    if documento.hash_conteudo and storage.exists(caminho):
+        # Mesmo conteúdo já tem miniatura gravada
+        documento.miniatura.name = caminho
+    else:
+        from PIL import Image, ImageOps, UnidentifiedImageError
+
+        with documento.arquivo.open('rb') as arquivo:
+            try:
+                imagem = Image.open(arquivo)
+                # Decodifica JPEGs grandes já reduzidos, em vez de expandir o scan inteiro
+                imagem.draft('RGB', MINIATURA_TAMANHO)
+                imagem = ImageOps.exif_transpose(imagem)
+                imagem.thumbnail(MINIATURA_TAMANHO)
+            except (UnidentifiedImageError, OSError):
+                return False
+            buffer = io.BytesIO()
+            imagem.convert('RGB').save(buffer, 'JPEG', quality=MINIATURA_QUALIDADE, optimize=True, progressive=True)
+        documento.miniatura.name = storage.save(caminho, ContentFile(buffer.getvalue()))
+
+    # Documentos com o mesmo conteúdo compartilham a miniatura
+    mesmos = DocumentoReserva.objects.filter(pk=documento.pk)
+    if documento.hash_conteudo:
+        mesmos = mesmos | DocumentoReserva.objects.filter(hash_conteudo=documento.hash_conteudo, miniatura='')
+    mesmos.update(miniatura=documento.miniatura.name)
+    return True
+
+
+def _gerar_em_segundo_plano(pk):
+    close_old_connections()
+    try:
+        documento = DocumentoReserva.objects.filter(pk=pk, miniatura='').first()
+        if documento and documento.arquivo:
+            gerar_miniatura(documento)
+    except Exception:
+        logger.exception('Falha ao gerar a miniatura do documento %s', pk)
+    finally:
+        close_old_connections()
+
+
+def agendar_miniatura(documento):
+    """Agenda a geração da miniatura para depois do commit da transação atual."""
+    pk = documento.pk
+    transaction.on_commit(lambda: _executor.submit(_gerar_em_segundo_plano, pk))
+
+
+def _em_uso(nome):
+    return (
+        DocumentoReserva.objects.filter(arquivo=nome).exists()
+        or DocumentoReservaArquivado.objects.filter(arquivo=nome).exists()
+    )
+
+
+def mover_para_blob(documento):
+    """
+    Leva para o armazenamento por conteúdo um arquivo que já chegou gravado
+    no storage (ex.: `documento.arquivo.save(nome, conteudo)`, que grava antes
+    do save do modelo). A cópia avulsa é apagada depois do commit, se nenhum
+    outro documento a usar; sem o arquivo, o documento fica como legado
+    (coletar_blobs --migrar-legados).
+    """
+    avulso = documento.arquivo.name
+    storage = documento.arquivo.storage
+    try:
+        with documento.arquivo.open('rb'):
+            preparar_arquivo(documento)
+    except OSError:
+        logger.warning('Arquivo do documento não encontrado no storage: %s', avulso)
+        return
+    if avulso != documento.arquivo.name:
+        transaction.on_commit(lambda: _em_uso(avulso) or storage.delete(avulso))
+
+
+@receiver(pre_save, sender=DocumentoReserva)
+def documento_pre_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance._blob_anterior, arquivo_anterior = (
+        DocumentoReserva.objects.filter(pk=instance.pk).values_list('blob_id', 'arquivo').first()
+        if instance.pk else None
+    ) or (None, None)
+    if not instance.arquivo:
+        return
+    if not instance.arquivo._committed:
+        preparar_arquivo(instance)
+    elif instance.arquivo.name != arquivo_anterior and not instance.arquivo.name.startswith('blobs/'):
+        mover_para_blob(instance)
+
+
+@receiver(post_save, sender=DocumentoReserva)
+def documento_post_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    anterior = getattr(instance, '_blob_anterior', None)
+    if anterior != instance.blob_id:
+        _ajustar_referencias(instance.blob_id, 1)
+        _ajustar_referencias(anterior, -1)
+    if instance.arquivo and not instance.miniatura and eh_imagem(instance.arquivo.name):
+        agendar_miniatura(instance)
+
+
+@receiver(post_delete, sender=DocumentoReserva)
+def documento_post_delete(sender, instance, **kwargs):
+    _ajustar_referencias(instance.blob_id, -1)
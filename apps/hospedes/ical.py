@@ -0,0 +1,171 @@
+"""
+Geração do feed iCalendar (.ics) das reservas.
+
+Cada reserva vira um VEVENT de dia inteiro (check-in a check-out). Os
+fragmentos VEVENT ficam em cache com chave derivada do `updated_at` da reserva
+e do hóspede, então uma nova geração só monta os eventos que mudaram; o
+restante do feed é lido do cache em blocos e enviado em streaming. O cache
+(settings.CACHES) é compartilhado entre workers e dynos, então um fragmento
+montado por um processo serve para todos.
+
+Com `propriedade`, o feed traz só as reservas daquele anúncio. Os fragmentos
+são os mesmos do feed completo: a chave leva o anúncio da própria reserva,
+então o feed do anúncio reaproveita o que o feed geral já montou.
+"""
+
+from datetime import timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Reserva
+
+PRODID = '-//Gestao Hospede//Reservas//PT-BR'
+CACHE_PREFIX = 'ical:vevent'
+CACHE_TIMEOUT = 60 * 60 * 24 * 30
+BLOCO = 500
+# Reservas encerradas há mais tempo que isso saem do feed
+DIAS_HISTORICO = 30
+
+STATUS_ICAL = {
+    'PENDENTE': 'TENTATIVE',
+    'CANCELADA': 'CANCELLED',
+}
+
+CAMPOS_EVENTO = [
+    'pk', 'codigo_confirmacao', 'data_entrada', 'data_saida', 'status',
+    'num_adultos', 'num_criancas', 'updated_at', 'hospede_principal__nome',
+]
+
+
+def escapar_texto(valor):
+    """Escapa um valor TEXT conforme a RFC 5545."""
+    return (
+        str(valor)
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def dobrar_linha(linha):
+    """Quebra linhas com mais de 75 octetos (RFC 5545, seção 3.1)."""
+    dados = linha.encode('utf-8')
+    if len(dados) <= 75:
+        return linha + '\r\n'
+
+    partes = []
+    limite = 75
+    while dados:
+        corte = min(limite, len(dados))
+        # Não separa um caractere UTF-8 multibyte
+        while corte < len(dados) and (dados[corte] & 0xC0) == 0x80:
+            corte -= 1
+        partes.append(dados[:corte].decode('utf-8'))
+        dados = dados[corte:]
+        limite = 74  # o espaço inicial da continuação ocupa um octeto
+    return '\r\n '.join(partes) + '\r\n'
+
+
+def feed_queryset(propriedade_id=None):
+    hoje = timezone.localdate()
+    queryset = Reserva.objects.filter(data_saida__gte=hoje - timedelta(days=DIAS_HISTORICO))
+    if propriedade_id:
+        queryset = queryset.filter(propriedade_id=propriedade_id)
+    return queryset
+
+
+def feed_etag(queryset=None, propriedade_id=None):
+    """ETag barato: anúncio, quantidade de reservas e as últimas alterações de reserva/hóspede."""
+    queryset = feed_queryset(propriedade_id) if queryset is None else queryset
+    resumo = queryset.aggregate(
+        total=Count('pk'),
+        reserva=Max('updated_at'),
+        hospede=Max('hospede_principal__updated_at'),
+    )
+    marcas = [
+        str(propriedade_id or 'todas'),
+        str(timezone.localdate()),
+        str(resumo['total']),
+        *(f'{resumo[campo].timestamp():.6f}' if resumo[campo] else '0' for campo in ('reserva', 'hospede')),
+    ]
+    return '-'.join(marcas)
+
+
+def _chave_cache(pk, propriedade_id, reserva_atualizada, hospede_atualizado):
+    return (
+        f'{CACHE_PREFIX}:{propriedade_id or 0}:{pk}:'
+        f'{reserva_atualizada.timestamp():.6f}:{hospede_atualizado.timestamp():.6f}'
+    )
+
+
+def gerar_vevent(evento):
+    """Monta o VEVENT de uma reserva a partir de um dicionário de `CAMPOS_EVENTO`."""
+    status_display = dict(Reserva.STATUS_CHOICES).get(evento['status'], evento['status'])
+    codigo = evento['codigo_confirmacao'] or '-'
+    hospedes = f"{evento['num_adultos']} adulto(s)"
+    if evento['num_criancas']:
+        hospedes += f", {evento['num_criancas']} criança(s)"
+
+    linhas = [
+        'BEGIN:VEVENT',
+        f"UID:reserva-{evento['pk']}@gestao-hospede",
+        f"DTSTAMP:{evento['updated_at'].astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')}",
+        f"DTSTART;VALUE=DATE:{evento['data_entrada'].strftime('%Y%m%d')}",
+        f"DTEND;VALUE=DATE:{evento['data_saida'].strftime('%Y%m%d')}",
+        f"SUMMARY:{escapar_texto(evento['hospede_principal__nome'])} ({escapar_texto(status_display)})",
+        f"DESCRIPTION:{escapar_texto('Código: ' + codigo)}\\n{escapar_texto(hospedes)}",
+        f"STATUS:{STATUS_ICAL.get(evento['status'], 'CONFIRMED')}",
+        'TRANSP:OPAQUE',
+        'END:VEVENT',
+    ]
+    return ''.join(dobrar_linha(linha) for linha in linhas)
+
+
+def _fragmentos(chaves, banco=None):
+    """Retorna os VEVENTs de um bloco, gerando e guardando em cache apenas os ausentes."""
+    em_cache = cache.get_many([chave for _, chave in chaves])
+    faltantes = {pk: chave for pk, chave in chaves if chave not in em_cache}
+
+    if faltantes:
+        novos = {}
+        for evento in Reserva.objects.db_manager(banco).filter(pk__in=faltantes).values(*CAMPOS_EVENTO):
+            novos[faltantes[evento['pk']]] = gerar_vevent(evento)
+        cache.set_many(novos, CACHE_TIMEOUT)
+        em_cache.update(novos)
+
+    return [em_cache[chave] for _, chave in chaves if chave in em_cache]
+
+
+def iter_calendario(queryset=None, nome='Reservas'):
+    """
+    Gera o conteúdo do .ics em partes, próprio para StreamingHttpResponse.
+    Os eventos são lidos do mesmo banco do queryset (ex.: a réplica).
+    """
+    queryset = feed_queryset() if queryset is None else queryset
+    yield ''.join(dobrar_linha(linha) for linha in [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escapar_texto(nome)}',
+    ])
+
+    # Só as marcas de versão são lidas de todas as reservas; o resto vem do cache
+    marcas = list(queryset.order_by('data_entrada', 'pk').values_list(
+        'pk', 'propriedade_id', 'updated_at', 'hospede_principal__updated_at'
+    ))
+    bloco = []
+    for pk, propriedade_id, reserva_atualizada, hospede_atualizado in marcas:
+        bloco.append((pk, _chave_cache(pk, propriedade_id, reserva_atualizada, hospede_atualizado)))
+        if len(bloco) == BLOCO:
+            yield ''.join(_fragmentos(bloco, queryset.db))
+            bloco = []
+    if bloco:
+        yield ''.join(_fragmentos(bloco, queryset.db))
+
+    yield 'END:VCALENDAR\r\n'
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.hospedes.arquivo import BATCH_SIZE, arquivar_reservas
+
+
+class Command(BaseCommand):
+    help = (
+        'Move as reservas finalizadas/canceladas com saída anterior ao horizonte '
+        '(e seus hóspedes e documentos) para as tabelas de arquivo. Agende junto '
+        'com reconciliar_status; é idempotente.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=settings.ARQUIVO_HORIZONTE_DIAS,
+            help='Horizonte em dias após a saída (padrão: ARQUIVO_HORIZONTE_DIAS)',
+        )
+        parser.add_argument('--lote', type=int, default=BATCH_SIZE, help='Reservas por transação')
+        parser.add_argument('--dry-run', action='store_true', help='Apenas conta o que seria arquivado')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        contagens = arquivar_reservas(dias=options['dias'], batch_size=options['lote'], dry_run=dry_run)
+
+        prefixo = '[dry-run] ' if dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefixo}{contagens['reservas']} reserva(s), {contagens['pessoas']} pessoa(s) "
+            f"e {contagens['documentos']} documento(s) arquivados."
+        ))
@@ -0,0 +1,94 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import random
+import re
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.hospedes.services import AirbnbCSVParser, ReservationImporter, chunked
+
+
+class Command(BaseCommand):
+    help = (
+        'Micro-benchmark da conversão das linhas do CSV do Airbnb: '
+        'conversão célula a célula vs. AirbnbCSVParser (não acessa o banco).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000, help='Linhas sintéticas geradas')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def _gerar_linhas(self, total, seed):
+        rng = random.Random(seed)
+        inicio = date(2022, 1, 1)
+        linhas = []
+        for i in range(total):
+            entrada = inicio + timedelta(days=rng.randrange(1000))
+            noites = rng.randint(1, 10)
+            linhas.append({
+                'Código de confirmação': f'HM{i:08d}',
+                'Status': 'Confirmada',
+                'Nome do hóspede': f'Hóspede {i}',
+                'Entrar em contato': f'+55 79 9{rng.randrange(10**8):08d}',
+                'Nº de adultos': str(rng.randint(1, 4)),
+                'Nº de crianças': str(rng.randint(0, 2)),
+                'Nº de bebês': '0',
+                'Data de início': entrada.strftime('%d/%m/%Y'),
+                'Data de término': (entrada + timedelta(days=noites)).strftime('%d/%m/%Y'),
+                'Nº de noites': str(noites),
+                'Reservado': (entrada - timedelta(days=rng.randrange(90))).strftime('%d/%m/%Y'),
+                'Anúncio': 'Pousada Atalaia',
+                'Ganhos': f'R${rng.randint(150, 3000)},{rng.randrange(100):02d}',
+            })
+        return linhas
+
+    @staticmethod
+    def _parse_date(value):
+        for fmt in ('%d/%m/%Y', '%Y-%m-%d'):
+            try:
+                return datetime.strptime(value, fmt).date()
+            except ValueError:
+                continue
+        return None
+
+    @staticmethod
+    def _parse_decimal(value):
+        return Decimal(value.replace('R$', '').replace('.', '').replace(',', '.').strip())
+
+    @staticmethod
+    def _parse_phone(value):
+        return re.sub(r'[^0-9+]', '', value) if value else ''
+
+    def _celula_a_celula(self, linhas):
+        # Equivalente ao caminho anterior: cada célula convertida isoladamente
+        for row in linhas:
+            self._parse_date(row['Reservado'])
+            self._parse_date(row['Data de início'])
+            self._parse_date(row['Data de término'])
+            self._parse_decimal(row['Ganhos'])
+            self._parse_phone(row.get('Entrar em contato', ''))
+            int(row.get('Nº de noites', 0) or 0)
+            int(row.get('Nº de adultos', 1) or 1)
+            int(row.get('Nº de crianças', 0) or 0) + int(row.get('Nº de bebês', 0) or 0)
+
+    def _por_coluna(self, linhas):
+        parser = AirbnbCSVParser()
+        for lote in chunked(linhas, ReservationImporter.BATCH_SIZE):
+            parser.parse_rows(lote)
+
+    def _medir(self, func, linhas):
+        inicio = time.perf_counter()
+        func(linhas)
+        return len(linhas) / (time.perf_counter() - inicio)
+
+    def handle(self, *args, **options):
+        linhas = self._gerar_linhas(options['rows'], options['seed'])
+
+        antes = self._medir(self._celula_a_celula, linhas)
+        depois = self._medir(self._por_coluna, linhas)
+
+        self.stdout.write(f'Linhas: {len(linhas)}')
+        self.stdout.write(f'Célula a célula: {antes:,.0f} linhas/s')
+        self.stdout.write(f'Por coluna:      {depois:,.0f} linhas/s')
+        self.stdout.write(self.style.SUCCESS(f'Ganho: {depois / antes:.1f}x'))
@@ -0,0 +1,156 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from urllib.request import HTTPRedirectHandler, Request, build_opener
+from urllib.error import HTTPError, URLError
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+User = get_user_model()
+
+
+class SemRedirecionamento(HTTPRedirectHandler):
+    """Não segue redirecionamentos: um 302 para o login é falha, não a página de login com 200."""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Teste de carga do dashboard contra um servidor em execução. Com '
+        '--comparar, sobe o gunicorn (gunicorn.conf.py) em WSGI e em ASGI '
+        '(ASYNC_VIEWS=True) numa porta livre e compara a vazão das duas variantes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/', help='URL do dashboard')
+        parser.add_argument('--requests', type=int, default=200, help='Total de requisições')
+        parser.add_argument('--concurrency', type=int, default=10, help='Requisições simultâneas')
+        parser.add_argument(
+            '--username',
+            default='+5579998830295',
+            help='Usuário autenticado nas requisições (padrão: usuário de teste)',
+        )
+        parser.add_argument(
+            '--comparar',
+            action='store_true',
+            help='Sobe o gunicorn em WSGI e em ASGI e mede os dois (usa só o caminho de --url)',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=2, help='Workers do gunicorn com --comparar (WEB_CONCURRENCY)',
+        )
+
+    def _session_cookie(self, username):
+        """Cria uma sessão autenticada no banco e retorna o cookie correspondente."""
+        try:
+            user = User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f'Usuário não encontrado: {username}')
+
+        client = Client()
+        client.force_login(user)
+        session_id = client.cookies[settings.SESSION_COOKIE_NAME].value
+        return f'{settings.SESSION_COOKIE_NAME}={session_id}'
+
+    def _request(self, opener, url, cookie):
+        """
+        Retorna (status, latência). Respostas de erro e 3xx trazem o código
+        HTTP; falhas de conexão, a descrição do erro. Só 200 conta como sucesso.
+        """
+        inicio = time.perf_counter()
+        try:
+            with opener.open(Request(url, headers={'Cookie': cookie})) as response:
+                response.read()
+                status = response.status
+        except HTTPError as e:
+            e.read()
+            status = e.code
+        except (URLError, OSError) as e:
+            status = str(getattr(e, 'reason', e))
+        return status, time.perf_counter() - inicio
+
+    @contextmanager
+    def _servidor(self, asgi, caminho, workers):
+        """Gunicorn com o gunicorn.conf.py do projeto numa porta livre; retorna a URL."""
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            porta = sock.getsockname()[1]
+        env = {**os.environ, 'PORT': str(porta), 'ASYNC_VIEWS': str(asgi), 'WEB_CONCURRENCY': str(workers)}
+        processo = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--log-level', 'warning', '--access-logfile', os.devnull],
+            cwd=settings.BASE_DIR, env=env,
+        )
+        try:
+            limite = time.monotonic() + 30
+            while True:
+                if processo.poll() is not None:
+                    raise CommandError(f'O gunicorn ({"ASGI" if asgi else "WSGI"}) terminou ao iniciar')
+                try:
+                    socket.create_connection(('127.0.0.1', porta), timeout=1).close()
+                    break
+                except OSError:
+                    if time.monotonic() > limite:
+                        raise CommandError(f'O gunicorn não abriu a porta {porta} em 30 s')
+                    time.sleep(0.2)
+            yield f'http://127.0.0.1:{porta}{caminho}'
+        finally:
+            processo.terminate()
+            processo.wait()
+
+    def _medir(self, url, cookie, total, concorrencia):
+        """Aquece o servidor e mede; retorna (vazão, p50, p95, falhas por status)."""
+        opener = build_opener(SemRedirecionamento)
+        status, _ = self._request(opener, url, cookie)
+        if status != 200:
+            raise CommandError(f'O dashboard em {url} não respondeu 200 ({status}); confira a URL e o login')
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+            resultados = list(executor.map(lambda _: self._request(opener, url, cookie), range(total)))
+        duracao = time.perf_counter() - inicio
+
+        latencias = sorted(latencia for _, latencia in resultados)
+        falhas = Counter(status for status, _ in resultados if status != 200)
+        p95 = latencias[int(len(latencias) * 0.95) - 1]
+        return total / duracao, statistics.median(latencias), p95, falhas
+
+    def _relatorio(self, titulo, total, concorrencia, medicao):
+        vazao, p50, p95, falhas = medicao
+        self.stdout.write(titulo)
+        self.stdout.write(f'Requisições: {total} (concorrência {concorrencia}, falhas {sum(falhas.values())})')
+        for status, quantidade in falhas.most_common():
+            self.stdout.write(self.style.WARNING(f'- {status}: {quantidade}'))
+        self.stdout.write(self.style.SUCCESS(f'Vazão: {vazao:.1f} req/s'))
+        self.stdout.write(f'Latência p50: {p50 * 1000:.1f} ms | p95: {p95 * 1000:.1f} ms')
+
+    def handle(self, *args, **options):
+        url = options['url']
+        total = options['requests']
+        concorrencia = options['concurrency']
+        cookie = self._session_cookie(options['username'])
+
+        if not options['comparar']:
+            self._relatorio(f'URL: {url}', total, concorrencia, self._medir(url, cookie, total, concorrencia))
+            return
+
+        partes = urlsplit(url)
+        caminho = partes.path + (f'?{partes.query}' if partes.query else '')
+        medicoes = {}
+        for nome, asgi in (('WSGI', False), ('ASGI', True)):
+            with self._servidor(asgi, caminho, options['workers']) as url_servidor:
+                medicoes[nome] = self._medir(url_servidor, cookie, total, concorrencia)
+            self._relatorio(f'{nome} ({url_servidor})', total, concorrencia, medicoes[nome])
+        self.stdout.write(self.style.SUCCESS(
+            f'ASGI/WSGI: {medicoes["ASGI"][0] / medicoes["WSGI"][0]:.2f}x a vazão'
+        ))
@@ -0,0 +1,143 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.hospedes.documentos import hash_arquivo, obter_blob
+from apps.hospedes.models import Blob, DocumentoReserva, DocumentoReservaArquivado
+
+
+def referencias_reais():
+    """Documentos que usam o blob, somando os de reservas arquivadas."""
+    arquivados = (
+        DocumentoReservaArquivado.objects.filter(blob=OuterRef('pk'))
+        .order_by().values('blob').annotate(total=Count('pk')).values('total')
+    )
+    return Count('documentos') + Coalesce(Subquery(arquivados), Value(0))
+
+
+class Command(BaseCommand):
+    help = (
+        'Coleta de lixo do armazenamento de documentos: confere a contagem de '
+        'referências dos blobs e remove blobs e arquivos sem referência.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horas',
+            type=int,
+            default=24,
+            help='Só remove o que está sem referência há mais tempo que isso (padrão: 24)',
+        )
+        parser.add_argument(
+            '--migrar-legados',
+            action='store_true',
+            help='Move para o armazenamento por conteúdo os documentos enviados antes dele',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Apenas informa o que seria removido')
+
+    def _migrar_legados(self, dry_run):
+        legados = DocumentoReserva.objects.filter(blob__isnull=True).exclude(arquivo='').order_by('pk')
+        migrados = 0
+        for documento in legados.iterator():
+            if dry_run:
+                migrados += 1
+                continue
+            antigo = documento.arquivo.name
+            try:
+                with documento.arquivo.open('rb'):
+                    hash_conteudo, tamanho = hash_arquivo(documento.arquivo)
+                    blob = obter_blob(documento.arquivo, hash_conteudo, tamanho)
+            except OSError as e:
+                self.stdout.write(self.style.WARNING(f'- Documento {documento.pk}: {e}'))
+                continue
+            with transaction.atomic():
+                DocumentoReserva.objects.filter(pk=documento.pk).update(
+                    blob=blob, arquivo=blob.arquivo.name, hash_conteudo=hash_conteudo, tamanho=tamanho
+                )
+                Blob.objects.filter(pk=blob.pk).update(referencias=F('referencias') + 1)
+            em_uso = (
+                DocumentoReserva.objects.filter(arquivo=antigo).exists()
+                or DocumentoReservaArquivado.objects.filter(arquivo=antigo).exists()
+            )
+            if antigo != blob.arquivo.name and not em_uso:
+                documento.arquivo.storage.delete(antigo)
+            migrados += 1
+        return migrados
+
+    def _recontar(self, dry_run):
+        """Corrige contadores divergentes das referências reais."""
+        divergentes = Blob.objects.annotate(reais=referencias_reais()).exclude(referencias=F('reais'))
+        corrigidos = 0
+        for blob_id, reais in divergentes.values_list('pk', 'reais'):
+            if not dry_run:
+                Blob.objects.filter(pk=blob_id).update(referencias=reais, updated_at=timezone.now())
+            corrigidos += 1
+        return corrigidos
+
+    def _remover_blobs(self, limite, dry_run):
+        removiveis = Blob.objects.annotate(reais=referencias_reais()).filter(
+            referencias=0, reais=0, updated_at__lt=limite
+        )
+        removidos = liberados = 0
+        for blob in removiveis:
+            liberados += blob.tamanho
+            removidos += 1
+            if dry_run:
+                continue
+            storage = blob.arquivo.storage
+            with transaction.atomic():
+                # Confere de novo dentro da transação: um upload pode ter voltado a usar o blob
+                if Blob.objects.filter(pk=blob.pk, referencias=0).delete()[0]:
+                    transaction.on_commit(lambda nome=blob.arquivo.name: storage.delete(nome))
+                    miniatura = DocumentoReserva._meta.get_field('miniatura').generate_filename(
+                        None, f'{blob.hash}.jpg'
+                    )
+                    transaction.on_commit(lambda nome=miniatura: storage.delete(nome))
+        return removidos, liberados
+
+    def _arquivos_orfaos(self, storage, pasta='blobs'):
+        """Arquivos em blobs/ sem registro (ex.: upload interrompido antes do commit)."""
+        diretorios, arquivos = storage.listdir(pasta)
+        for nome in arquivos:
+            yield f'{pasta}/{nome}'
+        for diretorio in diretorios:
+            yield from self._arquivos_orfaos(storage, f'{pasta}/{diretorio}')
+
+    def _remover_orfaos(self, limite, dry_run):
+        storage = Blob._meta.get_field('arquivo').storage
+        if not storage.exists('blobs'):
+            return 0, 0
+        conhecidos = set(Blob.objects.values_list('arquivo', flat=True))
+        removidos = liberados = 0
+        for nome in self._arquivos_orfaos(storage):
+            if nome in conhecidos or storage.get_modified_time(nome) >= limite:
+                continue
+            liberados += storage.size(nome)
+            removidos += 1
+            if not dry_run:
+                storage.delete(nome)
+        return removidos, liberados
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        limite = timezone.now() - timedelta(hours=options['horas'])
+
+        if options['migrar_legados']:
+            migrados = self._migrar_legados(dry_run)
+            self.stdout.write(f'Documentos legados migrados: {migrados}')
+
+        corrigidos = self._recontar(dry_run)
+        blobs, bytes_blobs = self._remover_blobs(limite, dry_run)
+        orfaos, bytes_orfaos = self._remover_orfaos(limite, dry_run)
+
+        prefixo = '[dry-run] ' if dry_run else ''
+        self.stdout.write(f'{prefixo}Contadores corrigidos: {corrigidos}')
+        self.stdout.write(f'{prefixo}Blobs sem referência removidos: {blobs}')
+        self.stdout.write(f'{prefixo}Arquivos órfãos removidos: {orfaos}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefixo}Espaço liberado: {(bytes_blobs + bytes_orfaos) / 1024 / 1024:.1f} MB'
+        ))
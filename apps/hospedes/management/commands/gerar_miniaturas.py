@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from apps.hospedes.documentos import eh_imagem, gerar_miniatura, hash_arquivo
+from apps.hospedes.models import DocumentoReserva
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera as miniaturas pendentes dos documentos e calcula o hash dos '
+        'documentos enviados antes do pipeline de upload.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help='Máximo de documentos processados')
+
+    def handle(self, *args, **options):
+        pendentes = DocumentoReserva.objects.exclude(arquivo='').filter(miniatura='').order_by('pk')
+        if options['limit']:
+            pendentes = pendentes[:options['limit']]
+
+        geradas = sem_imagem = erros = 0
+        for documento in pendentes.iterator():
+            try:
+                if not documento.hash_conteudo:
+                    with documento.arquivo.open('rb'):
+                        documento.hash_conteudo, documento.tamanho = hash_arquivo(documento.arquivo)
+                    DocumentoReserva.objects.filter(pk=documento.pk).update(
+                        hash_conteudo=documento.hash_conteudo, tamanho=documento.tamanho
+                    )
+                if eh_imagem(documento.arquivo.name) and gerar_miniatura(documento):
+                    geradas += 1
+                else:
+                    sem_imagem += 1
+            except OSError as e:
+                erros += 1
+                self.stdout.write(self.style.WARNING(f'- Documento {documento.pk}: {e}'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{geradas} miniatura(s) gerada(s), {sem_imagem} documento(s) sem imagem, {erros} erro(s).'
+        ))
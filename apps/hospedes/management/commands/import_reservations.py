@@ -0,0 +1,89 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.hospedes.services import PLATFORM_PARSERS, ReservationImporter
+from pathlib import Path
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa dados de reservas a partir dos CSVs exportados por uma plataforma. '
+        'Aceita vários arquivos ou diretórios; nesse caso os arquivos são convertidos '
+        'em paralelo e gravados numa única etapa em lote.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='+',
+            type=str,
+            help='Arquivos CSV ou diretórios contendo arquivos .csv',
+        )
+        parser.add_argument(
+            '--platform',
+            default='airbnb',
+            choices=sorted(PLATFORM_PARSERS),
+            help='Plataforma de origem do arquivo (padrão: airbnb)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Processos usados na conversão de vários arquivos (padrão: núcleos da máquina)',
+        )
+
+    def _expandir(self, paths):
+        arquivos = []
+        for path in map(Path, paths):
+            if path.is_dir():
+                arquivos.extend(sorted(str(p) for p in path.glob('*.csv')))
+            elif path.exists():
+                arquivos.append(str(path))
+            else:
+                raise CommandError(f'Arquivo não encontrado: {path}')
+        if not arquivos:
+            raise CommandError('Nenhum arquivo CSV encontrado.')
+        return arquivos
+
+    def handle(self, *args, **options):
+        arquivos = self._expandir(options['paths'])
+
+        try:
+            importer = ReservationImporter(platform=options['platform'])
+            if len(arquivos) == 1:
+                # Um único arquivo usa o caminho em lotes, que pode ser retomado
+                result = importer.import_csv(arquivos[0])
+            else:
+                result = importer.import_files(arquivos, workers=options['workers'])
+                if importer.arquivos_repetidos:
+                    self.stdout.write(f'{importer.arquivos_repetidos} arquivo(s) já importado(s) ignorado(s).')
+                if result['conflicts']:
+                    self.stdout.write(
+                        f'{result["conflicts"]} código(s) com versões diferentes entre arquivos '
+                        '(prevaleceu o arquivo mais recente).'
+                    )
+            
+            if result['duplicate_file']:
+                self.stdout.write(
+                    self.style.WARNING('Arquivo já importado anteriormente. Nada a fazer.')
+                )
+                return
+
+            if result['success']:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f'{result["imported"]} registros importados '
+                        f'({result["created"]} novos, {result["updated"]} atualizados), '
+                        f'{result["skipped"]} sem alterações.'
+                    )
+                )
+            
+            if result['errors']:
+                self.stdout.write(
+                    self.style.WARNING(
+                        'Alguns registros não puderam ser importados:'
+                    )
+                )
+                for error in result['errors']:
+                    self.stdout.write(self.style.WARNING(f'- {error}'))
+                    
+        except Exception as e:
+            raise CommandError(f'Erro durante a importação: {str(e)}')
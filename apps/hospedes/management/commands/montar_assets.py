@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.hospedes.assets import (
+    ErroAssets, baixar_vendor, montar_assets, usar_bundles, verificar_fontes, verificar_templates,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Monta os bundles de CSS/JS em static/dist (vendor + arquivos do projeto, '
+        'CSS minificado) e falha se alguma referência estiver ausente. Rode antes '
+        'do collectstatic, que gera os nomes com hash e as variantes .gz/.br.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--baixar', action='store_true',
+            help='Baixa os arquivos de vendor ausentes (Bootstrap/Bootstrap Icons) antes de montar',
+        )
+        parser.add_argument('--forcar', action='store_true', help='Com --baixar, baixa todos de novo')
+
+    def handle(self, *args, **options):
+        if options['baixar']:
+            try:
+                baixados = baixar_vendor(forcar=options['forcar'])
+            except OSError as e:
+                raise CommandError(f'Falha ao baixar os arquivos de vendor: {e}')
+            for destino in baixados:
+                self.stdout.write(f'Baixado: {destino}')
+
+        if not usar_bundles():
+            # Sem bundles os templates incluem as fontes uma a uma (vendor pelo CDN)
+            faltando = verificar_fontes() + verificar_templates()
+            if faltando:
+                raise CommandError(str(ErroAssets(faltando)))
+            self.stdout.write(self.style.WARNING(
+                'ASSETS_BUNDLES desativado: bundles não montados; fontes e templates conferidos.'
+            ))
+            return
+
+        try:
+            tamanhos = montar_assets()
+        except ErroAssets as e:
+            raise CommandError(str(e))
+
+        for nome, (tamanho, comprimido) in tamanhos.items():
+            self.stdout.write(f'dist/{nome}: {tamanho / 1024:.1f} KiB ({comprimido / 1024:.1f} KiB gzip)')
+        self.stdout.write(self.style.SUCCESS(f'{len(tamanhos)} bundle(s) montado(s).'))
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.hospedes.models import QuadroOperacoes
+from apps.hospedes.operacoes import DIAS_PADRAO, janela, montar_quadros
+
+
+class Command(BaseCommand):
+    help = (
+        'Pré-calcula o quadro de operações (chegadas, saídas e trocas) dos '
+        'próximos dias. Agende para rodar à meia-noite (cron/Heroku Scheduler).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=DIAS_PADRAO, help='Dias a partir de hoje')
+        parser.add_argument(
+            '--manter', type=int, default=7,
+            help='Dias passados cujos quadros são mantidos (os mais antigos são removidos)'
+        )
+
+    def handle(self, *args, **options):
+        hoje = timezone.localdate()
+        with transaction.atomic():
+            quadros = montar_quadros(janela(hoje, options['dias']))
+            removidos, _ = QuadroOperacoes.objects.filter(
+                data__lt=hoje - timedelta(days=options['manter'])
+            ).delete()
+
+        chegadas = sum(len(quadro['chegadas']) for quadro in quadros.values())
+        saidas = sum(len(quadro['saidas']) for quadro in quadros.values())
+        self.stdout.write(f'Quadros montados: {len(quadros)} ({hoje:%d/%m/%Y} em diante)')
+        self.stdout.write(self.style.SUCCESS(
+            f'{chegadas} chegada(s), {saidas} saída(s); {removidos} quadro(s) antigo(s) removido(s).'
+        ))
@@ -0,0 +1,86 @@
+from django.core.management.base import BaseCommand, CommandError
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+IMPORT_TIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(.+)$')
+
+SETUP_SCRIPT = (
+    'import importlib, os, sys, django\n'
+    'os.environ["DJANGO_SETTINGS_MODULE"] = sys.argv[1]\n'
+    'django.setup()\n'
+    'for module in sys.argv[2:]:\n'
+    '    importlib.import_module(module)\n'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera um relatório do tempo de importação na inicialização do Django '
+        '(python -X importtime) para um perfil de settings.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--settings-module',
+            default=os.environ.get('DJANGO_SETTINGS_MODULE', 'core.settings'),
+            help='Módulo de settings a ser medido (ex.: core.settings_lean)',
+        )
+        parser.add_argument(
+            '--import',
+            dest='modules',
+            action='append',
+            default=[],
+            help='Módulo extra importado após o setup (pode ser repetido)',
+        )
+        parser.add_argument('--limit', type=int, default=20, help='Quantidade de módulos no relatório')
+        parser.add_argument('--runs', type=int, default=3, help='Execuções para medir o tempo total')
+
+    def _run(self, settings_module, modules, importtime=False):
+        cmd = [sys.executable]
+        if importtime:
+            cmd += ['-X', 'importtime']
+        cmd += ['-c', SETUP_SCRIPT, settings_module, *modules]
+
+        inicio = time.perf_counter()
+        result = subprocess.run(cmd, capture_output=True, text=True, cwd=os.getcwd())
+        duracao = time.perf_counter() - inicio
+
+        if result.returncode != 0:
+            raise CommandError(f'Falha ao inicializar {settings_module}:\n{result.stderr}')
+        return duracao, result.stderr
+
+    def handle(self, *args, **options):
+        settings_module = options['settings_module']
+        modules = options['modules']
+
+        tempos = [self._run(settings_module, modules)[0] for _ in range(max(options['runs'], 1))]
+        _, stderr = self._run(settings_module, modules, importtime=True)
+
+        imports = []
+        for line in stderr.splitlines():
+            match = IMPORT_TIME_RE.match(line)
+            if match:
+                self_us, cumulative_us, indent, name = match.groups()
+                imports.append((name.strip(), int(self_us), int(cumulative_us), len(indent)))
+
+        top_level = [i for i in imports if i[3] == 1]
+        total_us = sum(i[2] for i in top_level)
+
+        self.stdout.write(f'Settings: {settings_module}')
+        self.stdout.write(f'Módulos importados: {len(imports)}')
+        self.stdout.write(f'Tempo de importação: {total_us / 1000:.1f} ms')
+        self.stdout.write(self.style.SUCCESS(
+            f'Inicialização (mediana de {len(tempos)}): {statistics.median(tempos) * 1000:.1f} ms'
+        ))
+
+        self.stdout.write(f'\nTop {options["limit"]} importações de primeiro nível (acumulado):')
+        for name, _, cumulative_us, _ in sorted(top_level, key=lambda i: -i[2])[:options['limit']]:
+            self.stdout.write(f'  {cumulative_us / 1000:8.1f} ms  {name}')
+
+        self.stdout.write(f'\nTop {options["limit"]} módulos por tempo próprio:')
+        for name, self_us, _, _ in sorted(imports, key=lambda i: -i[1])[:options['limit']]:
+            self.stdout.write(f'  {self_us / 1000:8.1f} ms  {name}')
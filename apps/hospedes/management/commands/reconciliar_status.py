@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from apps.hospedes.transicoes import reconciliar_status
+
+
+class Command(BaseCommand):
+    help = (
+        'Grava o status calculado das reservas (check-out vencido → finalizada, '
+        'pendente do Airbnb → confirmada) com UPDATEs em conjunto. Agende para '
+        'rodar todas as noites (cron/Heroku Scheduler); é idempotente.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Apenas conta as reservas desatualizadas')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        contagens = reconciliar_status(dry_run=dry_run)
+
+        prefixo = '[dry-run] ' if dry_run else ''
+        for status, total in contagens.items():
+            self.stdout.write(f'{prefixo}→ {status}: {total}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefixo}{sum(contagens.values())} reserva(s) reconciliada(s).'
+        ))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.hospedes.analitico import calcular_histogramas
+from apps.hospedes.models import HistogramaReservas
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula os histogramas de antecedência, estadia e grupo a partir '
+        'das reservas (corrige divergências ou aplica novas faixas).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Apenas informa as divergências')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        novos = calcular_histogramas()
+        # Histogramas zerados pelos deltas equivalem a não ter a linha
+        atuais = {
+            (h['metrica'], h['plataforma_id'], h['temporada']): h['contagens']
+            for h in HistogramaReservas.objects.values('metrica', 'plataforma_id', 'temporada', 'contagens')
+            if any(h['contagens'])
+        }
+        divergentes = sum(
+            1 for h in novos
+            if atuais.pop((h.metrica, h.plataforma_id, h.temporada), None) != h.contagens
+        ) + len(atuais)
+
+        if divergentes and not dry_run:
+            with transaction.atomic():
+                HistogramaReservas.objects.all().delete()
+                HistogramaReservas.objects.bulk_create(novos)
+
+        prefixo = '[dry-run] ' if dry_run else ''
+        self.stdout.write(f'{prefixo}Histogramas calculados: {len(novos)}')
+        self.stdout.write(self.style.SUCCESS(f'{prefixo}{divergentes} divergente(s).'))
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.hospedes.models import PessoaStats, ReservaHistorica
+from apps.hospedes.perfil import CAMPOS_PESSOA_STATS, calcular_pessoa_stats
+from apps.hospedes.services import chunked
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula a tabela PessoaStats a partir das reservas e corrige '
+        'divergências da atualização incremental.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Hóspedes por lote')
+        parser.add_argument('--dry-run', action='store_true', help='Apenas informa as divergências')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        pessoa_ids = sorted(set(ReservaHistorica.objects.values_list('hospede_principal_id', flat=True).order_by()))
+
+        criadas = corrigidas = 0
+        validos = set()
+        for lote in chunked(pessoa_ids, options['batch_size']):
+            stats = calcular_pessoa_stats(lote)
+            atuais = {
+                linha['pessoa_id']: linha
+                for linha in PessoaStats.objects.filter(pessoa_id__in=lote).values('pessoa_id', *CAMPOS_PESSOA_STATS)
+            }
+            divergentes = []
+            for linha in stats:
+                validos.add(linha.pessoa_id)
+                atual = atuais.get(linha.pessoa_id)
+                if atual is None:
+                    criadas += 1
+                elif any(atual[campo] != getattr(linha, campo) for campo in CAMPOS_PESSOA_STATS):
+                    corrigidas += 1
+                else:
+                    continue
+                divergentes.append(linha)
+
+            if divergentes and not dry_run:
+                with transaction.atomic():
+                    PessoaStats.objects.bulk_create(
+                        divergentes,
+                        update_conflicts=True,
+                        unique_fields=['pessoa'],
+                        update_fields=[*CAMPOS_PESSOA_STATS, 'updated_at'],
+                    )
+
+        # Hóspedes sem reservas válidas não têm linha
+        sobrando = PessoaStats.objects.exclude(pessoa_id__in=validos)
+        removidas = sobrando.count()
+        if removidas and not dry_run:
+            sobrando.delete()
+
+        prefixo = '[dry-run] ' if dry_run else ''
+        self.stdout.write(f'{prefixo}Hóspedes verificados: {len(pessoa_ids)}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefixo}{criadas} criada(s), {corrigidas} corrigida(s), {removidas} removida(s).'
+        ))
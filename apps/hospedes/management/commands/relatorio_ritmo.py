@@ -0,0 +1,49 @@
+from datetime import date
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.hospedes.models import ReservaHistorica
+from apps.hospedes.relatorios import MESES_PADRAO, relatorio_ritmo
+from apps.hospedes.replica import leitura_replica
+
+
+class Command(BaseCommand):
+    help = (
+        'Ritmo de reservas (pacing): receita em carteira por mês futuro contra '
+        'o mesmo mês do ano anterior na mesma antecedência.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meses', type=int, default=MESES_PADRAO, help='Meses a partir do corrente')
+        parser.add_argument('--data', help='Data base AAAA-MM-DD (padrão: hoje)')
+        parser.add_argument('--propriedade', help='Nome do anúncio (padrão: todos)')
+
+    def handle(self, *args, **options):
+        try:
+            hoje = date.fromisoformat(options['data']) if options['data'] else None
+        except ValueError:
+            raise CommandError('Data inválida, use AAAA-MM-DD.')
+
+        queryset = ReservaHistorica.objects.all()
+        if options['propriedade']:
+            queryset = queryset.filter(propriedade__nome=options['propriedade'])
+
+        inicio = time.perf_counter()
+        with leitura_replica():
+            relatorio = relatorio_ritmo(hoje=hoje, meses=options['meses'], queryset=queryset)
+        duracao = time.perf_counter() - inicio
+
+        self.stdout.write(
+            f"Data base: {relatorio['data_base']:%d/%m/%Y} "
+            f"(ano anterior: {relatorio['data_base_ano_anterior']:%d/%m/%Y})"
+        )
+        self.stdout.write(f"{'Mês':<8} {'Reservas':>8} {'Receita':>12} {'Ano ant.':>12} {'Var.':>7} {'Projeção':>12}")
+        for linha in relatorio['meses']:
+            variacao = f"{linha['variacao']:+.1f}%" if linha['variacao'] is not None else '-'
+            projecao = f"{linha['projecao']:,.2f}" if linha['projecao'] is not None else '-'
+            self.stdout.write(
+                f"{linha['mes']:%m/%Y}  {linha['reservas']:>8} {linha['receita']:>12,.2f} "
+                f"{linha['receita_ano_anterior']:>12,.2f} {variacao:>7} {projecao:>12}"
+            )
+        self.stdout.write(self.style.SUCCESS(f'Calculado em {duracao * 1000:.1f} ms'))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.hospedes.models import Propriedade
+from apps.hospedes.services import AirbnbICalImporter
+import os
+
+
+class Command(BaseCommand):
+    help = 'Sincroniza as reservas com um arquivo de calendário (.ics) exportado pelo Airbnb'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ics_file', type=str, help='Caminho para o arquivo .ics')
+        parser.add_argument(
+            '--no-cancel',
+            action='store_true',
+            help='Não cancela reservas futuras do anúncio ausentes do calendário',
+        )
+        parser.add_argument(
+            '--propriedade',
+            help='Nome do anúncio do calendário (o Airbnb exporta um .ics por anúncio)',
+        )
+
+    def handle(self, *args, **options):
+        ics_file = options['ics_file']
+
+        if not os.path.exists(ics_file):
+            raise CommandError(f'Arquivo não encontrado: {ics_file}')
+
+        if not options['propriedade'] and not options['no_cancel']:
+            raise CommandError('Informe --propriedade para cancelar as reservas ausentes do calendário (ou use --no-cancel)')
+
+        propriedade = None
+        if options['propriedade']:
+            propriedade, _ = Propriedade.objects.get_or_create(nome=options['propriedade'])
+
+        importer = AirbnbICalImporter(cancelar_ausentes=not options['no_cancel'], propriedade=propriedade)
+        result = importer.sync(ics_file)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{result["created"]} criadas, {result["updated"]} atualizadas, '
+                f'{result["cancelled"]} canceladas, {result["skipped"]} sem alterações.'
+            )
+        )
+        for error in result['errors']:
+            self.stdout.write(self.style.WARNING(f'- {error}'))
@@ -0,0 +1,35 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from .auditoria import BufferAuditoria, buffer_atual, lote_auditoria
+
+
+class AuditoriaMiddleware:
+    """Agrupa os registros de alteração de cada requisição em um único bulk_create."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _usuario(self, request):
+        return lambda: getattr(request, 'user', None)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        with lote_auditoria(self._usuario(request)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        # A gravação do buffer acessa o banco, então roda fora do event loop
+        buffer = BufferAuditoria(self._usuario(request))
+        token = buffer_atual.set(buffer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            buffer_atual.reset(token)
+        await sync_to_async(buffer.flush)()
+        return response
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.4 on 2026-10-19 11:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospedes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reserva',
+            name='hash_importacao',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, verbose_name='Hash da Importação'),
+        ),
+        migrations.CreateModel(
+            name='ImportacaoArquivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('fingerprint', models.CharField(max_length=64, unique=True, verbose_name='Hash do Arquivo')),
+                ('nome_arquivo', models.CharField(max_length=255, verbose_name='Nome do Arquivo')),
+                ('status', models.CharField(choices=[('EM_ANDAMENTO', 'Em andamento'), ('CONCLUIDA', 'Concluída')], default='EM_ANDAMENTO', max_length=15, verbose_name='Status')),
+                ('linhas_processadas', models.PositiveIntegerField(default=0, verbose_name='Linhas Processadas')),
+                ('criadas', models.PositiveIntegerField(default=0, verbose_name='Criadas')),
+                ('atualizadas', models.PositiveIntegerField(default=0, verbose_name='Atualizadas')),
+                ('ignoradas', models.PositiveIntegerField(default=0, verbose_name='Sem Alterações')),
+                ('concluida_em', models.DateTimeField(blank=True, null=True, verbose_name='Concluída em')),
+                ('plataforma', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='hospedes.plataforma')),
+            ],
+            options={
+                'verbose_name': 'Importação de Arquivo',
+                'verbose_name_plural': 'Importações de Arquivos',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.4 on 2026-10-19 11:56
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospedes', '0002_importacao_arquivo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistroAlteracao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(max_length=30, verbose_name='Modelo')),
+                ('objeto_id', models.BigIntegerField(verbose_name='ID do Objeto')),
+                ('acao', models.CharField(choices=[('CRIACAO', 'Criação'), ('ALTERACAO', 'Alteração'), ('EXCLUSAO', 'Exclusão')], max_length=10, verbose_name='Ação')),
+                ('alteracoes', models.JSONField(default=dict, verbose_name='Alterações')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Criado em')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='alteracoes_registradas', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Registro de Alteração',
+                'verbose_name_plural': 'Registros de Alterações',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['modelo', 'objeto_id', 'created_at'], name='hospedes_alteracao_timeline')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-19 11:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospedes', '0003_registro_alteracao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reserva',
+            name='uid_ical',
+            field=models.CharField(blank=True, editable=False, max_length=255, null=True, unique=True, verbose_name='UID do iCal'),
+        ),
+    ]
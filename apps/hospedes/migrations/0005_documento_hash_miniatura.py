@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospedes', '0004_reserva_uid_ical'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentoreserva',
+            name='hash_conteudo',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, verbose_name='Hash do Conteúdo'),
+        ),
+        migrations.AddField(
+            model_name='documentoreserva',
+            name='miniatura',
+            field=models.ImageField(blank=True, editable=False, upload_to='documentos/miniaturas/', verbose_name='Miniatura'),
+        ),
+        migrations.AddField(
+            model_name='documentoreserva',
+            name='tamanho',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True, verbose_name='Tamanho (bytes)'),
+        ),
+    ]
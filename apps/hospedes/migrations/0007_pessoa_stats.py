@@ -0,0 +1,32 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospedes', '0006_blob_store'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PessoaStats',
+            fields=[
+                ('pessoa', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='hospedes.pessoa')),
+                ('estadias', models.PositiveIntegerField(default=0, verbose_name='Estadias')),
+                ('noites', models.PositiveIntegerField(default=0, verbose_name='Noites')),
+                ('receita_centavos', models.BigIntegerField(default=0, verbose_name='Receita (centavos)')),
+                ('primeira_estadia', models.DateField(blank=True, null=True, verbose_name='Primeira Estadia')),
+                ('ultima_estadia', models.DateField(blank=True, null=True, verbose_name='Última Estadia')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Resumo do Hóspede',
+                'verbose_name_plural': 'Resumos dos Hóspedes',
+                'ordering': ['-receita_centavos'],
+                'indexes': [models.Index(fields=['-receita_centavos'], name='hospedes_stats_receita'), models.Index(fields=['ultima_estadia', 'estadias'], name='hospedes_stats_ultima')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospedes', '0007_pessoa_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pessoa',
+            index=models.Index(fields=['updated_at', 'id'], name='hospedes_pessoa_atualizada'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['data_entrada', 'id'], name='hospedes_reserva_entrada'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['data_saida', 'id'], name='hospedes_reserva_saida'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['status', 'data_entrada'], name='hospedes_reserva_status'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['updated_at', 'id'], name='hospedes_reserva_atualizada'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospedes', '0008_indices_api'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuadroOperacoes',
+            fields=[
+                ('data', models.DateField(primary_key=True, serialize=False, verbose_name='Data')),
+                ('dados', models.JSONField(default=dict, verbose_name='Dados')),
+                ('gerado_em', models.DateTimeField(auto_now=True, verbose_name='Gerado em')),
+            ],
+            options={
+                'verbose_name': 'Quadro de Operações',
+                'verbose_name_plural': 'Quadros de Operações',
+                'ordering': ['data'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospedes', '0009_quadro_operacoes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistogramaReservas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metrica', models.CharField(choices=[('ANTECEDENCIA', 'Antecedência (dias)'), ('ESTADIA', 'Duração da estadia (noites)'), ('GRUPO', 'Tamanho do grupo (hóspedes)')], max_length=15, verbose_name='Métrica')),
+                ('temporada', models.CharField(choices=[('ALTA', 'Alta temporada'), ('BAIXA', 'Baixa temporada')], max_length=10, verbose_name='Temporada')),
+                ('contagens', models.JSONField(default=list, verbose_name='Contagens por faixa')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('plataforma', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='histogramas', to='hospedes.plataforma')),
+            ],
+            options={
+                'verbose_name': 'Histograma de Reservas',
+                'verbose_name_plural': 'Histogramas de Reservas',
+                'ordering': ['metrica', 'plataforma', 'temporada'],
+                'constraints': [models.UniqueConstraint(fields=('metrica', 'plataforma', 'temporada'), name='hospedes_histograma_unico')],
+            },
+        ),
+    ]
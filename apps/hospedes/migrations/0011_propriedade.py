@@ -0,0 +1,54 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def limpar_quadros(apps, schema_editor):
+    # Os quadros gravados não têm o anúncio das reservas; são remontados ao serem abertos
+    apps.get_model('hospedes', 'QuadroOperacoes').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospedes', '0010_histograma_reservas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Propriedade',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('nome', models.CharField(max_length=255, unique=True, verbose_name='Nome')),
+                ('ativo', models.BooleanField(default=True, verbose_name='Ativo')),
+            ],
+            options={
+                'verbose_name': 'Propriedade',
+                'verbose_name_plural': 'Propriedades',
+                'ordering': ['nome'],
+            },
+        ),
+        migrations.AddField(
+            model_name='reserva',
+            name='propriedade',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='reservas', to='hospedes.propriedade'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['propriedade', 'data_entrada', 'id'], name='hospedes_reserva_prop_entrada'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['propriedade', 'data_saida', 'id'], name='hospedes_reserva_prop_saida'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['propriedade', 'status', 'data_entrada'], name='hospedes_reserva_prop_status'),
+        ),
+        migrations.RunPython(limpar_quadros, migrations.RunPython.noop),
+    ]
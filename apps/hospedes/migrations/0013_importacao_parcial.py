@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-19 12:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospedes', '0012_arquivo_reservas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importacaoarquivo',
+            name='erros',
+            field=models.PositiveIntegerField(default=0, verbose_name='Erros'),
+        ),
+        migrations.AlterField(
+            model_name='importacaoarquivo',
+            name='status',
+            field=models.CharField(choices=[('EM_ANDAMENTO', 'Em andamento'), ('PARCIAL', 'Concluída com erros'), ('CONCLUIDA', 'Concluída')], default='EM_ANDAMENTO', max_length=15, verbose_name='Status'),
+        ),
+    ]
@@ -1,9 +1,12 @@
 from django.db import models
+from django.db.models import F, Sum
+from django.db.models.functions import Cast, Now, Round
 from django.core.validators import MinValueValidator
 from djmoney.models.fields import MoneyField
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from datetime import datetime, time, timedelta
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
 import re
 from django.conf import settings
 from django.db.models.signals import post_save
@@ -15,6 +18,37 @@ def validate_cpf(value):
         if len(cpf) != 11:
             raise ValidationError('CPF deve conter 11 dígitos.')
 
+
+def em_centavos(expressao):
+    """Converte uma expressão monetária (2 casas decimais) em centavos inteiros no banco."""
+    return Cast(Round(expressao * 100), models.BigIntegerField())
+
+
+def centavos_para_decimal(centavos):
+    """Converte centavos inteiros em Decimal com 2 casas, para exibição."""
+    return Decimal(centavos or 0).scaleb(-2)
+
+
+# valor_bruto + taxa_servico + taxa_limpeza - impostos, somado linha a linha em centavos
+RECEITA_LIQUIDA_CENTAVOS = (
+    em_centavos(F('valor_bruto'))
+    + em_centavos(F('taxa_servico'))
+    + em_centavos(F('taxa_limpeza'))
+    - em_centavos(F('impostos'))
+)
+
+
+class ReservaQuerySet(models.QuerySet):
+    """
+    Agregados financeiros calculados em centavos inteiros direto no banco,
+    sem montar objetos Money; o Money fica para a exibição de uma reserva.
+    """
+
+    def receita_liquida_centavos(self):
+        """Soma em centavos de valor_bruto + taxa_servico + taxa_limpeza - impostos."""
+        return self.aggregate(total=Sum(RECEITA_LIQUIDA_CENTAVOS))['total'] or 0
+
+
 class BaseModel(models.Model):
     created_at = models.DateTimeField('Criado em', auto_now_add=True)
     updated_at = models.DateTimeField('Atualizado em', auto_now=True)
@@ -22,7 +56,85 @@ class BaseModel(models.Model):
     class Meta:
         abstract = True
 
-class Pessoa(BaseModel):
+
+def _valor_auditavel(value):
+    """Normaliza um valor de campo para comparação e gravação em JSON."""
+    if hasattr(value, 'amount'):  # Money
+        value = value.amount
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class AuditoriaMixin(models.Model):
+    """
+    Guarda o estado carregado do banco para registrar diffs campo a campo.
+
+    O from_db só guarda a tupla de valores lidos; o estado normalizado
+    (`_estado_auditoria`) é montado na primeira vez que alguém o usa, em geral
+    ao gravar. Leituras que não gravam (dashboard, API, exportações) não pagam
+    a cópia. Os registros são gerados pelos signals em apps.hospedes.auditoria.
+    """
+    AUDITORIA_IGNORAR = {'created_at', 'updated_at'}
+    
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def _campos_auditados(cls):
+        return [f for f in cls._meta.concrete_fields if f.name not in cls.AUDITORIA_IGNORAR]
+
+    def _estado_auditavel(self):
+        return {
+            f.attname: _valor_auditavel(self.__dict__[f.attname])
+            for f in self._campos_auditados()
+            if f.attname in self.__dict__
+        }
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._valores_carregados = (field_names, values)
+        return instance
+
+    @property
+    def _estado_auditoria(self):
+        """Estado do último carregamento/gravação ({} para objetos novos)."""
+        estado = self.__dict__.get('_estado_auditoria_salvo')
+        if estado is None:
+            carregados = self.__dict__.pop('_valores_carregados', None)
+            if carregados is None:
+                return {}
+            auditados = {f.attname for f in self._campos_auditados()}
+            estado = {nome: _valor_auditavel(valor) for nome, valor in zip(*carregados) if nome in auditados}
+            self.__dict__['_estado_auditoria_salvo'] = estado
+        return estado
+
+    @_estado_auditoria.setter
+    def _estado_auditoria(self, estado):
+        self.__dict__.pop('_valores_carregados', None)
+        self.__dict__['_estado_auditoria_salvo'] = estado
+
+    def diff_auditoria(self):
+        """Retorna {campo: [antes, depois]} desde o último carregamento/gravação."""
+        anterior = getattr(self, '_estado_auditoria', {})
+        atual = self._estado_auditavel()
+        return {
+            campo: [anterior.get(campo), valor]
+            for campo, valor in atual.items()
+            if anterior.get(campo) != valor
+        }
+
+    def historico(self):
+        """Linha do tempo das alterações deste objeto (mais recentes primeiro)."""
+        return RegistroAlteracao.objects.filter(
+            modelo=self._meta.model_name,
+            objeto_id=self.pk
+        ).order_by('-created_at', '-id')
+
+class Pessoa(AuditoriaMixin, BaseModel):
     nome = models.CharField('Nome', max_length=200)
     cpf = models.CharField('CPF', max_length=14, validators=[validate_cpf], blank=True, null=True, unique=True)
     rg = models.CharField('RG', max_length=20, blank=True, null=True)
@@ -33,6 +145,9 @@ class Pessoa(BaseModel):
         verbose_name = 'Pessoa'
         verbose_name_plural = 'Pessoas'
         ordering = ['nome']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='hospedes_pessoa_atualizada'),
+        ]
     
     def __str__(self):
         return self.nome
@@ -93,7 +208,22 @@ class Plataforma(BaseModel):
     def __str__(self):
         return self.nome
 
-class Reserva(BaseModel):
+class Propriedade(BaseModel):
+    """Anúncio/acomodação; preenchido pela coluna Anúncio na importação."""
+    nome = models.CharField('Nome', max_length=255, unique=True)
+    ativo = models.BooleanField('Ativo', default=True)
+    
+    class Meta:
+        verbose_name = 'Propriedade'
+        verbose_name_plural = 'Propriedades'
+        ordering = ['nome']
+    
+    def __str__(self):
+        return self.nome
+
+class Reserva(AuditoriaMixin, BaseModel):
+    AUDITORIA_IGNORAR = AuditoriaMixin.AUDITORIA_IGNORAR | {'hash_importacao', 'uid_ical'}
+    
     STATUS_CHOICES = [
         ('PENDENTE', 'Pendente'),
         ('CONFIRMADA', 'Confirmada'),
@@ -105,7 +235,17 @@ class Reserva(BaseModel):
     
     hospede_principal = models.ForeignKey(Pessoa, on_delete=models.PROTECT, related_name='reservas')
     plataforma = models.ForeignKey(Plataforma, on_delete=models.PROTECT)
+    # Sem índice próprio: coberto pelos índices compostos (propriedade, ...) do Meta
+    propriedade = models.ForeignKey(
+        Propriedade,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='reservas',
+        db_index=False
+    )
     codigo_confirmacao = models.CharField('Código de Confirmação', max_length=50, unique=True, blank=True, null=True)
+    uid_ical = models.CharField('UID do iCal', max_length=255, unique=True, blank=True, null=True, editable=False)
     data_reserva = models.DateField('Data da Reserva')
     data_entrada = models.DateField('Data de Entrada')
     data_saida = models.DateField('Data de Saída')
@@ -143,13 +283,29 @@ class Reserva(BaseModel):
     observacoes_checkin = models.TextField('Observações do Check-in', blank=True, null=True)
     observacoes_checkout = models.TextField('Observações do Check-out', blank=True, null=True)
     
+    # Hash dos campos normalizados da última importação (evita regravar linhas iguais)
+    hash_importacao = models.CharField('Hash da Importação', max_length=64, blank=True, null=True, editable=False)
+    
     created_at = models.DateTimeField('Criado em', auto_now_add=True)
     updated_at = models.DateTimeField('Atualizado em', auto_now=True)
     
+    objects = ReservaQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Reserva'
         verbose_name_plural = 'Reservas'
         ordering = ['-data_entrada']
+        # Filtros por período/status e paginação por cursor (valor, id) da API
+        indexes = [
+            models.Index(fields=['data_entrada', 'id'], name='hospedes_reserva_entrada'),
+            models.Index(fields=['data_saida', 'id'], name='hospedes_reserva_saida'),
+            models.Index(fields=['status', 'data_entrada'], name='hospedes_reserva_status'),
+            models.Index(fields=['updated_at', 'id'], name='hospedes_reserva_atualizada'),
+            # Dashboards e relatórios por anúncio: o custo não cresce com o portfólio
+            models.Index(fields=['propriedade', 'data_entrada', 'id'], name='hospedes_reserva_prop_entrada'),
+            models.Index(fields=['propriedade', 'data_saida', 'id'], name='hospedes_reserva_prop_saida'),
+            models.Index(fields=['propriedade', 'status', 'data_entrada'], name='hospedes_reserva_prop_status'),
+        ]
 
     def __str__(self):
         return f'{self.codigo_confirmacao} - {self.hospede_principal.nome}'
@@ -228,27 +384,50 @@ class Reserva(BaseModel):
         """Retorna o horário padrão de check-out (12:00)"""
         return time(hour=12, minute=0)
 
-    def realizar_checkin(self, user, observacoes=None):
-        """Realiza o check-in da reserva."""
-        hoje = timezone.now().date()
-        
+    def erro_checkin(self, hoje):
+        """Motivo pelo qual o check-in não pode ser feito em `hoje` (None se pode)."""
         # Só permite check-in se estiver confirmada
         if self.status != 'CONFIRMADA':
-            raise ValidationError('Só é possível realizar check-in em reservas confirmadas.')
+            return 'Só é possível realizar check-in em reservas confirmadas.'
             
         # Não permite check-in muito antecipado
         if (self.data_entrada - hoje).days > 1:
-            raise ValidationError('Não é possível realizar check-in com mais de 1 dia de antecedência.')
-            
-        # Se for hoje, usa hora atual, senão usa hora padrão
+            return 'Não é possível realizar check-in com mais de 1 dia de antecedência.'
+        return None
+        
+    def momento_checkin(self, hoje, agora):
+        """Se for hoje, usa a hora atual, senão usa a hora padrão."""
         if hoje == self.data_entrada:
-            self.data_checkin = timezone.now()
-        else:
-            self.data_checkin = datetime.combine(
-                self.data_entrada,
-                self.horario_checkin_padrao
-            ).replace(tzinfo=timezone.get_current_timezone())
+            return agora
+        return datetime.combine(
+            self.data_entrada,
+            self.horario_checkin_padrao
+        ).replace(tzinfo=timezone.get_current_timezone())
+        
+    def erro_checkout(self, hoje):
+        """Motivo pelo qual o check-out não pode ser feito (None se pode)."""
+        # Só permite checkout se já fez checkin
+        if self.status != 'CHECKIN':
+            return 'Só é possível realizar check-out após o check-in.'
+        return None
+        
+    def momento_checkout(self, hoje, agora):
+        """Se for hoje, usa a hora atual, senão usa a hora padrão."""
+        if hoje == self.data_saida:
+            return agora
+        return datetime.combine(
+            self.data_saida,
+            self.horario_checkout_padrao
+        ).replace(tzinfo=timezone.get_current_timezone())
+
+    def realizar_checkin(self, user, observacoes=None):
+        """Realiza o check-in da reserva."""
+        hoje = timezone.now().date()
+        erro = self.erro_checkin(hoje)
+        if erro:
+            raise ValidationError(erro)
             
+        self.data_checkin = self.momento_checkin(hoje, timezone.now())
         self.checkin_por = user
         self.observacoes_checkin = observacoes
         self.status = 'CHECKIN'
@@ -257,20 +436,11 @@ class Reserva(BaseModel):
     def realizar_checkout(self, user, observacoes=None):
         """Realiza o check-out da reserva."""
         hoje = timezone.now().date()
-        
-        # Só permite checkout se já fez checkin
-        if self.status != 'CHECKIN':
-            raise ValidationError('Só é possível realizar check-out após o check-in.')
-            
-        # Se for hoje, usa hora atual, senão usa hora padrão
-        if hoje == self.data_saida:
-            self.data_checkout = timezone.now()
-        else:
-            self.data_checkout = datetime.combine(
-                self.data_saida,
-                self.horario_checkout_padrao
-            ).replace(tzinfo=timezone.get_current_timezone())
+        erro = self.erro_checkout(hoje)
+        if erro:
+            raise ValidationError(erro)
             
+        self.data_checkout = self.momento_checkout(hoje, timezone.now())
         self.checkout_por = user
         self.observacoes_checkout = observacoes
         self.status = 'CHECKOUT'
@@ -278,7 +448,12 @@ class Reserva(BaseModel):
 
     @property
     def status_atual(self):
-        """Retorna o status atual baseado nas datas."""
+        """
+        Retorna o status atual baseado nas datas.
+
+        As mesmas regras são gravadas em conjunto todas as noites pelo comando
+        reconciliar_status (apps.hospedes.transicoes.REGRAS_RECONCILIACAO).
+        """
         hoje = timezone.now().date()
         
         # Se foi cancelada, mantém cancelada
@@ -295,8 +470,13 @@ class Reserva(BaseModel):
             
         return self.status
 
-    def save(self, *args, **kwargs):
-        """Sobrescreve o método save para atualizar o status automaticamente."""
+    def preparar_para_gravacao(self):
+        """
+        Atualiza status e noites a partir das datas.
+
+        Chamado pelo save() e pelos importadores antes de bulk_create/bulk_update,
+        que não passam pelo save().
+        """
         if not self.codigo_confirmacao and self.plataforma.nome == 'Airbnb':
             self.status = 'CONFIRMADA'
         
@@ -309,7 +489,10 @@ class Reserva(BaseModel):
         if self.data_entrada and self.data_saida:
             delta = self.data_saida - self.data_entrada
             self.noites = delta.days
-            
+
+    def save(self, *args, **kwargs):
+        """Sobrescreve o método save para atualizar o status automaticamente."""
+        self.preparar_para_gravacao()
         super().save(*args, **kwargs)
 
     def clean(self):
@@ -321,6 +504,114 @@ class Reserva(BaseModel):
             if self.data_entrada < self.data_reserva:
                 raise ValidationError('A data de entrada não pode ser anterior à data da reserva.')
 
+def caminho_blob(hash_conteudo, extensao=''):
+    """Caminho de um blob no storage: blobs/ab/cd/<sha256><extensão>."""
+    return f'blobs/{hash_conteudo[:2]}/{hash_conteudo[2:4]}/{hash_conteudo}{extensao.lower()}'
+
+
+class PessoaStats(models.Model):
+    """
+    Resumo por hóspede (reservas como hóspede principal, sem as canceladas),
+    mantido junto com as gravações de Reserva e recalculado pelo comando
+    reconstruir_pessoa_stats. Permite ranking e segmentação por índice.
+    """
+    pessoa = models.OneToOneField(Pessoa, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    estadias = models.PositiveIntegerField('Estadias', default=0)
+    noites = models.PositiveIntegerField('Noites', default=0)
+    receita_centavos = models.BigIntegerField('Receita (centavos)', default=0)
+    primeira_estadia = models.DateField('Primeira Estadia', null=True, blank=True)
+    ultima_estadia = models.DateField('Última Estadia', null=True, blank=True)
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Resumo do Hóspede'
+        verbose_name_plural = 'Resumos dos Hóspedes'
+        ordering = ['-receita_centavos']
+        indexes = [
+            models.Index(fields=['-receita_centavos'], name='hospedes_stats_receita'),
+            models.Index(fields=['ultima_estadia', 'estadias'], name='hospedes_stats_ultima'),
+        ]
+    
+    def __str__(self):
+        return f'{self.pessoa_id}: {self.estadias} estadia(s)'
+    
+    @property
+    def receita(self):
+        return centavos_para_decimal(self.receita_centavos)
+
+
+class HistogramaReservas(models.Model):
+    """
+    Histograma pré-calculado de uma métrica das reservas (sem as canceladas)
+    por plataforma e temporada: `contagens[i]` é o número de reservas na
+    faixa i (limites em apps.hospedes.analitico.FAIXAS). Mantido junto com as
+    gravações de Reserva e recalculado pelo comando reconstruir_histogramas.
+    """
+    METRICA_CHOICES = [
+        ('ANTECEDENCIA', 'Antecedência (dias)'),
+        ('ESTADIA', 'Duração da estadia (noites)'),
+        ('GRUPO', 'Tamanho do grupo (hóspedes)'),
+    ]
+    TEMPORADA_CHOICES = [
+        ('ALTA', 'Alta temporada'),
+        ('BAIXA', 'Baixa temporada'),
+    ]
+    
+    metrica = models.CharField('Métrica', max_length=15, choices=METRICA_CHOICES)
+    plataforma = models.ForeignKey(Plataforma, on_delete=models.CASCADE, related_name='histogramas')
+    temporada = models.CharField('Temporada', max_length=10, choices=TEMPORADA_CHOICES)
+    contagens = models.JSONField('Contagens por faixa', default=list)
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Histograma de Reservas'
+        verbose_name_plural = 'Histogramas de Reservas'
+        ordering = ['metrica', 'plataforma', 'temporada']
+        constraints = [
+            models.UniqueConstraint(fields=['metrica', 'plataforma', 'temporada'], name='hospedes_histograma_unico'),
+        ]
+    
+    def __str__(self):
+        return f'{self.get_metrica_display()} - {self.plataforma} ({self.get_temporada_display()})'
+
+
+class QuadroOperacoes(models.Model):
+    """
+    Quadro de operações de um dia (chegadas, saídas e trocas), pré-calculado
+    pelo comando montar_quadro_operacoes e remontado a cada gravação de
+    Reserva que afeta o dia. A página lê uma única linha.
+    """
+    data = models.DateField('Data', primary_key=True)
+    dados = models.JSONField('Dados', default=dict)
+    gerado_em = models.DateTimeField('Gerado em', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Quadro de Operações'
+        verbose_name_plural = 'Quadros de Operações'
+        ordering = ['data']
+    
+    def __str__(self):
+        return f'Operações de {self.data:%d/%m/%Y}'
+
+class Blob(BaseModel):
+    """
+    Conteúdo de arquivo gravado uma única vez no storage, endereçado pelo
+    SHA-256. `referencias` conta os documentos que apontam para o blob; blobs
+    sem referências são removidos pelo comando coletar_blobs.
+    """
+    hash = models.CharField('SHA-256', max_length=64, unique=True)
+    arquivo = models.FileField('Arquivo', upload_to='blobs/')
+    tamanho = models.PositiveBigIntegerField('Tamanho (bytes)')
+    referencias = models.PositiveIntegerField('Referências', default=0)
+    
+    class Meta:
+        verbose_name = 'Blob'
+        verbose_name_plural = 'Blobs'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f'{self.hash[:12]} ({self.referencias} ref.)'
+
 class DocumentoReserva(BaseModel):
     TIPO_CHOICES = [
         ('RG', 'RG'),
@@ -333,6 +624,19 @@ class DocumentoReserva(BaseModel):
     pessoa = models.ForeignKey(Pessoa, on_delete=models.CASCADE, related_name='documentos')
     tipo_documento = models.CharField('Tipo de Documento', max_length=20, choices=TIPO_CHOICES)
     arquivo = models.FileField('Arquivo', upload_to='documentos/%Y/%m/')
+    blob = models.ForeignKey(
+        Blob,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='documentos'
+    )
+    hash_conteudo = models.CharField('Hash do Conteúdo', max_length=64, blank=True, db_index=True, editable=False)
+    tamanho = models.PositiveBigIntegerField('Tamanho (bytes)', null=True, blank=True, editable=False)
+    miniatura = models.ImageField(
+        'Miniatura', upload_to='documentos/miniaturas/', blank=True, editable=False
+    )
     observacoes = models.TextField('Observações', blank=True, null=True)
     
     class Meta:
@@ -365,3 +669,188 @@ class PessoaReserva(BaseModel):
     
     def __str__(self):
         return f'{self.pessoa.nome} - {self.get_tipo_envolvimento_display()}'
+
+
+class ReservaHistoricoBase(models.Model):
+    """
+    Colunas de Reserva (mesmos nomes e tipos), com o id original. Base da
+    tabela de arquivo e da view com o histórico completo.
+    """
+    STATUS_CHOICES = Reserva.STATUS_CHOICES
+
+    id = models.BigIntegerField('ID', primary_key=True)
+    hospede_principal = models.ForeignKey(Pessoa, on_delete=models.PROTECT, related_name='+')
+    plataforma = models.ForeignKey(Plataforma, on_delete=models.PROTECT, related_name='+')
+    propriedade = models.ForeignKey(Propriedade, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    codigo_confirmacao = models.CharField('Código de Confirmação', max_length=50, blank=True, null=True, db_index=True)
+    uid_ical = models.CharField('UID do iCal', max_length=255, blank=True, null=True)
+    data_reserva = models.DateField('Data da Reserva')
+    data_entrada = models.DateField('Data de Entrada')
+    data_saida = models.DateField('Data de Saída')
+    noites = models.IntegerField('Noites', default=0)
+    num_adultos = models.IntegerField('Número de Adultos', default=1)
+    num_criancas = models.IntegerField('Número de Crianças', default=0)
+    valor_bruto = MoneyField('Valor Bruto', max_digits=10, decimal_places=2, default_currency='BRL')
+    taxa_servico = MoneyField('Taxa de Serviço', max_digits=10, decimal_places=2, default_currency='BRL', default=0)
+    taxa_limpeza = MoneyField('Taxa de Limpeza', max_digits=10, decimal_places=2, default_currency='BRL', default=0)
+    ganhos_brutos = MoneyField('Ganhos Brutos', max_digits=10, decimal_places=2, default_currency='BRL')
+    impostos = MoneyField('Impostos', max_digits=10, decimal_places=2, default_currency='BRL', default=0)
+    status = models.CharField('Status', max_length=15, choices=STATUS_CHOICES)
+    observacoes = models.TextField('Observações', blank=True, null=True)
+    data_checkin = models.DateTimeField('Data/Hora do Check-in', null=True, blank=True)
+    data_checkout = models.DateTimeField('Data/Hora do Check-out', null=True, blank=True)
+    checkin_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.PROTECT, null=True, blank=True, related_name='+'
+    )
+    checkout_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.PROTECT, null=True, blank=True, related_name='+'
+    )
+    observacoes_checkin = models.TextField('Observações do Check-in', blank=True, null=True)
+    observacoes_checkout = models.TextField('Observações do Check-out', blank=True, null=True)
+    hash_importacao = models.CharField('Hash da Importação', max_length=64, blank=True, null=True)
+    created_at = models.DateTimeField('Criado em')
+    updated_at = models.DateTimeField('Atualizado em')
+
+    objects = ReservaQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+        ordering = ['-data_entrada']
+
+    def __str__(self):
+        return f'{self.codigo_confirmacao} ({self.data_entrada:%d/%m/%Y})'
+
+
+class ReservaArquivada(ReservaHistoricoBase):
+    """
+    Reserva encerrada há mais que o horizonte de arquivamento, movida de
+    Reserva pelo comando arquivar_reservas (apps.hospedes.arquivo).
+    """
+    arquivada_em = models.DateTimeField('Arquivada em', db_default=Now())
+
+    class Meta(ReservaHistoricoBase.Meta):
+        verbose_name = 'Reserva Arquivada'
+        verbose_name_plural = 'Reservas Arquivadas'
+        indexes = [
+            models.Index(fields=['data_entrada', 'id'], name='hospedes_arquivo_entrada'),
+            models.Index(fields=['propriedade', 'data_entrada', 'id'], name='hospedes_arquivo_prop_entrada'),
+        ]
+
+
+class ReservaHistorica(ReservaHistoricoBase):
+    """
+    View (UNION ALL) de Reserva e ReservaArquivada, somente leitura, para
+    relatórios e agregados que precisam do histórico completo. A view é
+    recriada após cada migrate (apps.hospedes.arquivo), acompanhando as
+    colunas de Reserva.
+    """
+
+    class Meta(ReservaHistoricoBase.Meta):
+        managed = False
+        db_table = 'hospedes_reserva_historico'
+        verbose_name = 'Reserva (histórico completo)'
+        verbose_name_plural = 'Reservas (histórico completo)'
+
+
+class PessoaReservaArquivada(models.Model):
+    """PessoaReserva de uma reserva arquivada (id original)."""
+    id = models.BigIntegerField('ID', primary_key=True)
+    reserva = models.ForeignKey(ReservaArquivada, on_delete=models.CASCADE, related_name='pessoas')
+    pessoa = models.ForeignKey(Pessoa, on_delete=models.CASCADE, related_name='+')
+    tipo_envolvimento = models.CharField('Tipo de Envolvimento', max_length=25, choices=PessoaReserva.TIPO_CHOICES)
+    observacoes = models.TextField('Observações', blank=True, null=True)
+    created_at = models.DateTimeField('Criado em')
+    updated_at = models.DateTimeField('Atualizado em')
+
+    class Meta:
+        verbose_name = 'Pessoa na Reserva Arquivada'
+        verbose_name_plural = 'Pessoas nas Reservas Arquivadas'
+        ordering = ['tipo_envolvimento']
+
+
+class DocumentoReservaArquivado(models.Model):
+    """
+    DocumentoReserva de uma reserva arquivada (id original). Continua
+    contando nas referências do blob, então o arquivo não é coletado.
+    """
+    id = models.BigIntegerField('ID', primary_key=True)
+    reserva = models.ForeignKey(ReservaArquivada, on_delete=models.CASCADE, related_name='documentos')
+    pessoa = models.ForeignKey(Pessoa, on_delete=models.CASCADE, related_name='+')
+    tipo_documento = models.CharField('Tipo de Documento', max_length=20, choices=DocumentoReserva.TIPO_CHOICES)
+    arquivo = models.FileField('Arquivo', upload_to='documentos/%Y/%m/')
+    blob = models.ForeignKey(Blob, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    hash_conteudo = models.CharField('Hash do Conteúdo', max_length=64, blank=True)
+    tamanho = models.PositiveBigIntegerField('Tamanho (bytes)', null=True, blank=True)
+    miniatura = models.ImageField('Miniatura', upload_to='documentos/miniaturas/', blank=True)
+    observacoes = models.TextField('Observações', blank=True, null=True)
+    created_at = models.DateTimeField('Criado em')
+    updated_at = models.DateTimeField('Atualizado em')
+
+    class Meta:
+        verbose_name = 'Documento Arquivado'
+        verbose_name_plural = 'Documentos Arquivados'
+        ordering = ['tipo_documento']
+
+
+class ImportacaoArquivo(BaseModel):
+    """
+    Controle de importação de um arquivo, identificado pelo hash do conteúdo e
+    da plataforma. Só arquivos CONCLUIDA (sem erros) deixam de ser
+    reprocessados; os PARCIAL podem ser importados de novo após a correção.
+    """
+    STATUS_CHOICES = [
+        ('EM_ANDAMENTO', 'Em andamento'),
+        ('PARCIAL', 'Concluída com erros'),
+        ('CONCLUIDA', 'Concluída'),
+    ]
+    
+    fingerprint = models.CharField('Hash do Arquivo', max_length=64, unique=True)
+    nome_arquivo = models.CharField('Nome do Arquivo', max_length=255)
+    plataforma = models.ForeignKey(Plataforma, on_delete=models.PROTECT)
+    status = models.CharField('Status', max_length=15, choices=STATUS_CHOICES, default='EM_ANDAMENTO')
+    linhas_processadas = models.PositiveIntegerField('Linhas Processadas', default=0)
+    criadas = models.PositiveIntegerField('Criadas', default=0)
+    atualizadas = models.PositiveIntegerField('Atualizadas', default=0)
+    ignoradas = models.PositiveIntegerField('Sem Alterações', default=0)
+    erros = models.PositiveIntegerField('Erros', default=0)
+    concluida_em = models.DateTimeField('Concluída em', null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Importação de Arquivo'
+        verbose_name_plural = 'Importações de Arquivos'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f'{self.nome_arquivo} ({self.get_status_display()})'
+
+class RegistroAlteracao(models.Model):
+    """Log de alterações (somente inserção) de Reserva e Pessoa."""
+    ACAO_CHOICES = [
+        ('CRIACAO', 'Criação'),
+        ('ALTERACAO', 'Alteração'),
+        ('EXCLUSAO', 'Exclusão'),
+    ]
+    
+    modelo = models.CharField('Modelo', max_length=30)
+    objeto_id = models.BigIntegerField('ID do Objeto')
+    acao = models.CharField('Ação', max_length=10, choices=ACAO_CHOICES)
+    alteracoes = models.JSONField('Alterações', default=dict)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='alteracoes_registradas'
+    )
+    created_at = models.DateTimeField('Criado em', default=timezone.now)
+    
+    class Meta:
+        verbose_name = 'Registro de Alteração'
+        verbose_name_plural = 'Registros de Alterações'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['modelo', 'objeto_id', 'created_at'], name='hospedes_alteracao_timeline'),
+        ]
+    
+    def __str__(self):
+        return f'{self.modelo} #{self.objeto_id} - {self.get_acao_display()}'
@@ -0,0 +1,229 @@
+"""
+Quadro de operações: chegadas, saídas e trocas (saída e chegada no mesmo dia)
+de cada dia, com o estado de check-in/check-out das reservas.
+
+Troca é o anúncio com saída e chegada no mesmo dia.
+
+Os quadros de vários dias saem de uma única consulta indexada (data de
+entrada ou de saída nos dias pedidos) e ficam gravados em QuadroOperacoes, de
+modo que a página lê uma linha só; o filtro por anúncio é aplicado sobre o
+quadro do dia. O comando montar_quadro_operacoes pré-calcula os próximos dias
+à meia-noite; gravações de Reserva (save, check-in/check-out e gravações em
+lote) remontam na mesma transação os quadros já gravados dos dias afetados.
+Os nomes de hóspede, anúncio e plataforma são copiados para o quadro, então
+renomear um deles também remonta os quadros gravados em que ele aparece.
+"""
+
+from datetime import date, datetime, timedelta
+
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Pessoa, Plataforma, Propriedade, QuadroOperacoes, Reserva
+from .signals import reservas_gravadas_em_lote
+
+DIAS_PADRAO = 14
+
+# Modelos cujo nome vai para o quadro -> campo de Reserva que aponta para eles
+NOMES_NO_QUADRO = {Pessoa: 'hospede_principal', Propriedade: 'propriedade', Plataforma: 'plataforma'}
+
+CAMPOS_QUADRO = [
+    'pk', 'codigo_confirmacao', 'hospede_principal_id', 'hospede_principal__nome',
+    'plataforma__nome', 'propriedade_id', 'propriedade__nome', 'num_adultos', 'num_criancas',
+    'data_entrada', 'data_saida', 'noites', 'status', 'data_checkin', 'data_checkout',
+]
+
+
+def janela(inicio=None, dias=DIAS_PADRAO):
+    """Lista de datas a partir de `inicio` (hoje, por padrão)."""
+    inicio = inicio or timezone.localdate()
+    return [inicio + timedelta(days=i) for i in range(dias)]
+
+
+def _momento(valor):
+    return timezone.localtime(valor).isoformat() if valor else None
+
+
+def _item(linha):
+    return {
+        'id': linha['pk'],
+        'codigo': linha['codigo_confirmacao'],
+        'hospede': linha['hospede_principal__nome'],
+        'hospede_id': linha['hospede_principal_id'],
+        'plataforma': linha['plataforma__nome'],
+        'propriedade_id': linha['propriedade_id'],
+        'propriedade': linha['propriedade__nome'],
+        'adultos': linha['num_adultos'],
+        'criancas': linha['num_criancas'],
+        'entrada': linha['data_entrada'].isoformat(),
+        'saida': linha['data_saida'].isoformat(),
+        'noites': linha['noites'],
+        'status': linha['status'],
+        'checkin': _momento(linha['data_checkin']),
+        'checkout': _momento(linha['data_checkout']),
+    }
+
+
+def resumir(quadro):
+    """
+    Marca as trocas (anúncio com saída e chegada no dia) e calcula os totais
+    do quadro. Reservas sem anúncio são pareadas pelo dia.
+    """
+    chegadas, saidas = quadro['chegadas'], quadro['saidas']
+    trocas = (
+        {item['propriedade_id'] for item in chegadas if item['propriedade_id']}
+        & {item['propriedade_id'] for item in saidas if item['propriedade_id']}
+    )
+    for item in chegadas + saidas:
+        item['troca'] = item['propriedade_id'] in trocas
+    sem_anuncio = min(
+        sum(1 for item in chegadas if not item['propriedade_id']),
+        sum(1 for item in saidas if not item['propriedade_id']),
+    )
+    quadro['trocas'] = len(trocas) + sem_anuncio
+    quadro['checkins_feitos'] = sum(1 for item in chegadas if item['checkin'])
+    quadro['checkouts_feitos'] = sum(1 for item in saidas if item['checkout'])
+    return quadro
+
+
+def filtrar_quadro(dados, propriedade_id):
+    """Quadro de um só anúncio, a partir do quadro gravado do dia."""
+    return resumir({
+        lista: [item for item in dados[lista] if item['propriedade_id'] == propriedade_id]
+        for lista in ('chegadas', 'saidas')
+    })
+
+
+def calcular_quadros(dias):
+    """
+    Quadros (não gravados) dos dias informados, numa única consulta pelos
+    índices de data_entrada e data_saida.
+    """
+    dias = sorted(set(dias))
+    quadros = {dia: {'chegadas': [], 'saidas': []} for dia in dias}
+    linhas = Reserva.objects.filter(
+        Q(data_entrada__in=dias) | Q(data_saida__in=dias)
+    ).exclude(status='CANCELADA').values(*CAMPOS_QUADRO).order_by('hospede_principal__nome', 'pk')
+
+    for linha in linhas:
+        item = _item(linha)
+        if linha['data_entrada'] in quadros:
+            quadros[linha['data_entrada']]['chegadas'].append(item)
+        if linha['data_saida'] in quadros:
+            quadros[linha['data_saida']]['saidas'].append(item)
+
+    for quadro in quadros.values():
+        resumir(quadro)
+    return quadros
+
+
+def montar_quadros(dias):
+    """Calcula e grava os quadros dos dias informados."""
+    quadros = calcular_quadros(dias)
+    QuadroOperacoes.objects.bulk_create(
+        [QuadroOperacoes(data=dia, dados=dados) for dia, dados in quadros.items()],
+        update_conflicts=True,
+        unique_fields=['data'],
+        update_fields=['dados', 'gerado_em'],
+    )
+    return quadros
+
+
+def remontar_quadros(dias):
+    """Remonta só os quadros já gravados; os demais são montados ao serem abertos."""
+    dias = {dia for dia in dias if dia}
+    if not dias:
+        return
+    existentes = list(QuadroOperacoes.objects.filter(data__in=dias).values_list('data', flat=True))
+    if existentes:
+        montar_quadros(existentes)
+
+
+def dias_com(**filtro):
+    """Dias com quadro gravado em que aparece alguma reserva do filtro."""
+    gravados = list(QuadroOperacoes.objects.order_by().values_list('data', flat=True))
+    if not gravados:
+        return set()
+    datas = Reserva.objects.filter(**filtro).filter(
+        Q(data_entrada__in=gravados) | Q(data_saida__in=gravados)
+    ).order_by().values_list('data_entrada', 'data_saida')
+    return {dia for par in datas for dia in par} & set(gravados)
+
+
+def quadro_do_dia(dia):
+    """
+    Quadro gravado de um dia (montado na hora se ainda não existe), com os
+    horários de check-in/check-out convertidos para datetime.
+    """
+    quadro = QuadroOperacoes.objects.filter(data=dia).first()
+    if quadro is None:
+        montar_quadros([dia])
+        quadro = QuadroOperacoes.objects.get(data=dia)
+
+    for item in quadro.dados['chegadas'] + quadro.dados['saidas']:
+        for campo in ('checkin', 'checkout'):
+            if item[campo]:
+                item[campo] = datetime.fromisoformat(item[campo])
+    return quadro
+
+
+def _datas(estado):
+    return {
+        date.fromisoformat(estado[campo])
+        for campo in ('data_entrada', 'data_saida')
+        if estado.get(campo)
+    }
+
+
+def dias_das_reservas(reservas):
+    """
+    Datas de entrada e saída (atuais e anteriores) de reservas gravadas em
+    lote. Chame antes de registrar_operacao_em_lote, que renova o snapshot.
+    """
+    dias = set()
+    for reserva in reservas:
+        dias.update({reserva.data_entrada, reserva.data_saida})
+        dias.update(_datas(getattr(reserva, '_estado_auditoria', {})))
+    return dias
+
+
+@receiver(pre_save, sender=Reserva)
+def guardar_datas_anteriores(sender, instance, raw=False, **kwargs):
+    # Snapshot do log de alterações: datas antes desta gravação
+    instance._datas_anteriores = _datas(getattr(instance, '_estado_auditoria', {}))
+
+
+@receiver(post_save, sender=Reserva)
+@receiver(post_delete, sender=Reserva)
+def atualizar_quadros_reserva(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    remontar_quadros(
+        {instance.data_entrada, instance.data_saida} | getattr(instance, '_datas_anteriores', set())
+    )
+
+
+@receiver(reservas_gravadas_em_lote)
+def atualizar_quadros_lote(sender, reservas, **kwargs):
+    remontar_quadros(dias_das_reservas(reservas))
+
+
+@receiver(pre_save)
+def guardar_nome_anterior(sender, instance, raw=False, **kwargs):
+    if sender not in NOMES_NO_QUADRO or raw or instance.pk is None:
+        return
+    # Pessoa tem o snapshot do log de alterações; os demais são lidos do banco
+    estado = getattr(instance, '_estado_auditoria', {})
+    instance._nome_anterior = estado['nome'] if 'nome' in estado else (
+        sender.objects.filter(pk=instance.pk).values_list('nome', flat=True).first()
+    )
+
+
+@receiver(post_save)
+def atualizar_quadros_nome(sender, instance, created, raw=False, **kwargs):
+    if sender not in NOMES_NO_QUADRO or raw or created:
+        return
+    if instance.nome != getattr(instance, '_nome_anterior', instance.nome):
+        remontar_quadros(dias_com(**{NOMES_NO_QUADRO[sender]: instance.pk}))
@@ -0,0 +1,423 @@
+"""
+Perfil do hóspede: histórico de estadias, contatos, documentos e relacionamentos.
+
+O perfil é montado com um número fixo de consultas, independente do tamanho
+do histórico (pessoa + prefetches, reservas e estatísticas). As estatísticas
+consolidadas (estadias, noites, receita, visitas) ficam no cache
+compartilhado (settings.CACHES) por pessoa e são invalidadas, para todos os
+workers, quando uma reserva do hóspede muda (save/delete ou gravação em
+lote); `invalidar_stats()` sem argumentos invalida todas de uma vez trocando
+a geração das chaves. A data entra na chave, já que última e próxima visita
+dependem do dia.
+
+A tabela PessoaStats (ranking e segmentação de hóspedes) é atualizada na
+mesma transação das gravações de Reserva aplicando só a diferença, como os
+histogramas: tira a contribuição anterior da reserva (snapshot do log de
+alterações) e soma a atual, com incrementos F() nos contadores e totais e
+mín./máx. nas datas. Só quando a primeira ou a última estadia sai (ou o
+estado anterior não foi carregado por inteiro) o hóspede é recalculado a
+partir das reservas; reconstruir_pessoa_stats recalcula todos. As duas
+incluem as reservas arquivadas (ReservaHistorica).
+"""
+
+from collections import Counter
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Count, F, Max, Min, Prefetch, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+
+from .models import (
+    DocumentoReserva, Pessoa, PessoaStats, RelacionamentoPessoas, Reserva, ReservaHistorica,
+    RECEITA_LIQUIDA_CENTAVOS, _valor_auditavel, centavos_para_decimal
+)
+from .signals import reservas_gravadas_em_lote
+
+CACHE_PREFIX = 'perfil:stats'
+CACHE_TIMEOUT = 60 * 60 * 24
+CHAVE_GERACAO = f'{CACHE_PREFIX}:geracao'
+
+
+def _geracao():
+    return cache.get_or_set(CHAVE_GERACAO, 1, None)
+
+
+def _chave(pessoa_id, geracao):
+    return f'{CACHE_PREFIX}:{geracao}:{timezone.localdate():%Y%m%d}:{pessoa_id}'
+
+
+def _stats_vazias():
+    return {
+        'estadias': 0,
+        'noites': 0,
+        'receita': centavos_para_decimal(0),
+        'cancelamentos': 0,
+        'primeira_visita': None,
+        'ultima_visita': None,
+        'proxima_visita': None,
+    }
+
+
+def calcular_stats(pessoa_ids):
+    """Estatísticas de vários hóspedes numa única consulta agrupada."""
+    hoje = timezone.localdate()
+    validas = ~Q(status='CANCELADA')
+    linhas = ReservaHistorica.objects.filter(hospede_principal_id__in=pessoa_ids).values(
+        'hospede_principal_id'
+    ).order_by().annotate(
+        estadias=Count('pk', filter=validas),
+        noites=Sum('noites', filter=validas),
+        receita_centavos=Sum(RECEITA_LIQUIDA_CENTAVOS, filter=validas),
+        cancelamentos=Count('pk', filter=Q(status='CANCELADA')),
+        primeira_visita=Min('data_entrada', filter=validas),
+        ultima_visita=Max('data_entrada', filter=validas & Q(data_entrada__lte=hoje)),
+        proxima_visita=Min('data_entrada', filter=validas & Q(data_entrada__gt=hoje)),
+    )
+
+    stats = {pessoa_id: _stats_vazias() for pessoa_id in pessoa_ids}
+    for linha in linhas:
+        pessoa_id = linha.pop('hospede_principal_id')
+        linha['receita'] = centavos_para_decimal(linha.pop('receita_centavos'))
+        linha['noites'] = linha['noites'] or 0
+        stats[pessoa_id] = linha
+    return stats
+
+
+def stats_pessoas(pessoa_ids):
+    """Estatísticas por hóspede, lidas do cache; só as ausentes são calculadas."""
+    pessoa_ids = list(pessoa_ids)
+    geracao = _geracao()
+    chaves = {pessoa_id: _chave(pessoa_id, geracao) for pessoa_id in pessoa_ids}
+    em_cache = cache.get_many(list(chaves.values()))
+
+    resultado = {pessoa_id: em_cache[chave] for pessoa_id, chave in chaves.items() if chave in em_cache}
+    faltantes = [pessoa_id for pessoa_id in pessoa_ids if pessoa_id not in resultado]
+    if faltantes:
+        novas = calcular_stats(faltantes)
+        cache.set_many({chaves[pessoa_id]: valor for pessoa_id, valor in novas.items()}, CACHE_TIMEOUT)
+        resultado.update(novas)
+    return resultado
+
+
+def invalidar_stats(pessoa_ids=None):
+    """Invalida as estatísticas dos hóspedes informados, ou de todos (gravações em lote)."""
+    if pessoa_ids is None:
+        try:
+            cache.incr(CHAVE_GERACAO)
+        except ValueError:
+            cache.set(CHAVE_GERACAO, 2, None)
+        return
+    geracao = _geracao()
+    cache.delete_many([_chave(pessoa_id, geracao) for pessoa_id in pessoa_ids if pessoa_id])
+
+
+CAMPOS_PESSOA_STATS = ['estadias', 'noites', 'receita_centavos', 'primeira_estadia', 'ultima_estadia']
+
+
+def calcular_pessoa_stats(pessoa_ids):
+    """Linhas de PessoaStats (não gravadas) dos hóspedes informados, numa consulta agrupada."""
+    linhas = ReservaHistorica.objects.filter(
+        hospede_principal_id__in=pessoa_ids
+    ).exclude(status='CANCELADA').values('hospede_principal_id').order_by().annotate(
+        estadias=Count('pk'),
+        noites=Sum('noites'),
+        receita_centavos=Sum(RECEITA_LIQUIDA_CENTAVOS),
+        primeira_estadia=Min('data_entrada'),
+        ultima_estadia=Max('data_entrada'),
+    )
+    return [
+        PessoaStats(pessoa_id=linha.pop('hospede_principal_id'), **{
+            **linha, 'noites': linha['noites'] or 0, 'receita_centavos': linha['receita_centavos'] or 0
+        })
+        for linha in linhas
+    ]
+
+
+def atualizar_pessoa_stats(pessoa_ids):
+    """
+    Recalcula do zero o PessoaStats dos hóspedes informados. Hóspedes sem
+    reservas válidas ficam sem linha.
+    """
+    pessoa_ids = {pessoa_id for pessoa_id in pessoa_ids if pessoa_id}
+    if not pessoa_ids:
+        return
+    stats = calcular_pessoa_stats(pessoa_ids)
+    PessoaStats.objects.filter(pessoa_id__in=pessoa_ids - {linha.pessoa_id for linha in stats}).delete()
+    PessoaStats.objects.bulk_create(
+        stats,
+        update_conflicts=True,
+        unique_fields=['pessoa'],
+        update_fields=[*CAMPOS_PESSOA_STATS, 'updated_at'],
+    )
+
+
+# Campos da reserva que entram no PessoaStats (nomes do snapshot do log de alterações)
+CAMPOS_CONTRIBUICAO = [
+    'status', 'hospede_principal_id', 'data_entrada', 'noites',
+    'valor_bruto', 'taxa_servico', 'taxa_limpeza', 'impostos',
+]
+
+
+def _centavos(valor):
+    return int((Decimal(str(valor or 0)) * 100).quantize(Decimal(1), ROUND_HALF_UP))
+
+
+def _estado_stats(reserva):
+    """Valores atuais de CAMPOS_CONTRIBUICAO já carregados (sem buscar campos adiados)."""
+    return {
+        campo: _valor_auditavel(reserva.__dict__[campo])
+        for campo in CAMPOS_CONTRIBUICAO
+        if campo in reserva.__dict__
+    }
+
+
+def _estado_anterior(reserva):
+    # Snapshot do log de alterações: valores do banco antes desta gravação
+    estado = getattr(reserva, '_estado_auditoria', {})
+    return {campo: estado[campo] for campo in CAMPOS_CONTRIBUICAO if campo in estado}
+
+
+def somar_contribuicao(deltas, estado, sinal):
+    """
+    Soma (sinal 1) ou tira (sinal -1) de `deltas` a contribuição de uma
+    reserva no estado informado; canceladas e reservas sem hóspede não contam.
+    """
+    if not estado['hospede_principal_id'] or estado['status'] == 'CANCELADA':
+        return
+    delta = deltas.setdefault(estado['hospede_principal_id'], {
+        'estadias': 0, 'noites': 0, 'receita_centavos': 0, 'datas': Counter(),
+    })
+    delta['estadias'] += sinal
+    delta['noites'] += sinal * (estado['noites'] or 0)
+    delta['receita_centavos'] += sinal * (
+        _centavos(estado['valor_bruto']) + _centavos(estado['taxa_servico'])
+        + _centavos(estado['taxa_limpeza']) - _centavos(estado['impostos'])
+    )
+    entrada = estado['data_entrada']
+    delta['datas'][date.fromisoformat(entrada) if isinstance(entrada, str) else entrada] += sinal
+
+
+def registrar_mudanca(deltas, recalcular, anterior, atual):
+    """
+    Acumula a diferença entre dois estados de uma reserva ({} = não existe).
+    Estados parciais (campos adiados com .only()) mandam o hóspede para o
+    recálculo completo, a menos que nada do que foi carregado tenha mudado.
+    """
+    completo_ou_vazio = [not estado or len(estado) == len(CAMPOS_CONTRIBUICAO) for estado in (anterior, atual)]
+    if all(completo_ou_vazio):
+        if anterior:
+            somar_contribuicao(deltas, anterior, -1)
+        if atual:
+            somar_contribuicao(deltas, atual, 1)
+    elif not anterior or not atual or any(anterior.get(campo) != valor for campo, valor in atual.items()):
+        recalcular.update({anterior.get('hospede_principal_id'), atual.get('hospede_principal_id')})
+
+
+def _data(valor):
+    return Value(valor, output_field=models.DateField())
+
+
+def aplicar_deltas_stats(deltas, recalcular=()):
+    """
+    Aplica ao PessoaStats os deltas de registrar_mudanca: um UPDATE com F()
+    por hóspede afetado, INSERT para quem ainda não tinha linha. Hóspedes que
+    perderam a primeira ou a última estadia (ou ficaram sem estadias) e os de
+    `recalcular` são recalculados a partir das reservas.
+    """
+    recalcular = {pessoa_id for pessoa_id in recalcular if pessoa_id}
+    agora = timezone.now()
+    novos, removidas = [], {}
+    for pessoa_id, delta in deltas.items():
+        if pessoa_id in recalcular:
+            continue
+        adicionadas = [dia for dia, n in delta['datas'].items() if n > 0]
+        saidas = {dia for dia, n in delta['datas'].items() if n < 0}
+        if saidas:
+            removidas[pessoa_id] = saidas
+        if not (adicionadas or saidas or delta['noites'] or delta['receita_centavos']):
+            continue
+
+        valores = {'updated_at': agora}
+        for campo in ('estadias', 'noites', 'receita_centavos'):
+            if delta[campo]:
+                valores[campo] = F(campo) + delta[campo]
+                if delta[campo] < 0 and campo != 'receita_centavos':
+                    valores[campo] = Greatest(valores[campo], Value(0))
+        if adicionadas:
+            primeira, ultima = _data(min(adicionadas)), _data(max(adicionadas))
+            valores['primeira_estadia'] = Least(Coalesce('primeira_estadia', primeira), primeira)
+            valores['ultima_estadia'] = Greatest(Coalesce('ultima_estadia', ultima), ultima)
+
+        if PessoaStats.objects.filter(pessoa_id=pessoa_id).update(**valores):
+            continue
+        if delta['estadias'] > 0 and not saidas:
+            novos.append(PessoaStats(
+                pessoa_id=pessoa_id, estadias=delta['estadias'], noites=delta['noites'],
+                receita_centavos=delta['receita_centavos'],
+                primeira_estadia=min(adicionadas), ultima_estadia=max(adicionadas),
+            ))
+        else:
+            # Tirar de quem não tem linha: a tabela divergiu, recalcula
+            recalcular.add(pessoa_id)
+
+    PessoaStats.objects.bulk_create(novos)
+    if removidas:
+        linhas = PessoaStats.objects.filter(pessoa_id__in=removidas).values_list(
+            'pessoa_id', 'estadias', 'primeira_estadia', 'ultima_estadia'
+        )
+        for pessoa_id, estadias, primeira, ultima in linhas:
+            if not estadias or removidas[pessoa_id] & {primeira, ultima}:
+                recalcular.add(pessoa_id)
+    atualizar_pessoa_stats(recalcular)
+
+
+def pessoas_das_reservas(reservas):
+    """
+    Hóspedes (atual e anterior) de reservas gravadas em lote. Chame antes de
+    registrar_operacao_em_lote, que renova o snapshot com o hóspede anterior.
+    """
+    pessoa_ids = set()
+    for reserva in reservas:
+        pessoa_ids.add(reserva.hospede_principal_id)
+        pessoa_ids.add(getattr(reserva, '_estado_auditoria', {}).get('hospede_principal_id'))
+    return pessoa_ids
+
+
+def perfil_pessoa(pk):
+    """
+    Carrega o perfil completo de um hóspede com consultas em número fixo:
+    pessoa, contatos, documentos, relacionamentos (2), reservas e estatísticas
+    (esta última só quando não está em cache).
+    """
+    pessoa = get_object_or_404(
+        Pessoa.objects.prefetch_related(
+            'contatos',
+            Prefetch(
+                'documentos',
+                queryset=DocumentoReserva.objects.select_related('reserva').only(
+                    'pessoa_id', 'tipo_documento', 'arquivo', 'miniatura', 'created_at',
+                    'reserva__codigo_confirmacao', 'reserva__data_entrada'
+                ).order_by('-created_at')
+            ),
+            Prefetch(
+                'relacionamentos_origem',
+                queryset=RelacionamentoPessoas.objects.select_related('pessoa_destino')
+            ),
+            Prefetch(
+                'relacionamentos_destino',
+                queryset=RelacionamentoPessoas.objects.select_related('pessoa_origem')
+            ),
+        ),
+        pk=pk
+    )
+    # Estadias como hóspede principal ou envolvido na reserva (PessoaReserva)
+    reservas = list(
+        Reserva.objects.filter(
+            Q(hospede_principal_id=pk) | Q(pessoas__pessoa_id=pk)
+        ).distinct().select_related('plataforma').order_by('-data_entrada')
+    )
+    return {
+        'pessoa': pessoa,
+        'reservas': reservas,
+        'stats': stats_pessoas([pessoa.pk])[pessoa.pk],
+    }
+
+
+def perfil_para_dict(perfil):
+    """Serializa o perfil para a API JSON."""
+    pessoa = perfil['pessoa']
+    stats = perfil['stats']
+    return {
+        'id': pessoa.pk,
+        'nome': pessoa.nome,
+        'cpf': pessoa.cpf,
+        'rg': pessoa.rg,
+        'stats': {
+            **stats,
+            'receita': str(stats['receita']),
+            **{
+                campo: stats[campo].isoformat() if stats[campo] else None
+                for campo in ('primeira_visita', 'ultima_visita', 'proxima_visita')
+            },
+        },
+        'contatos': [
+            {'tipo': contato.tipo, 'valor': contato.valor, 'principal': contato.principal}
+            for contato in pessoa.contatos.all()
+        ],
+        'reservas': [
+            {
+                'id': reserva.pk,
+                'codigo_confirmacao': reserva.codigo_confirmacao,
+                'plataforma': reserva.plataforma.nome,
+                'data_entrada': reserva.data_entrada.isoformat(),
+                'data_saida': reserva.data_saida.isoformat(),
+                'noites': reserva.noites,
+                'status': reserva.status,
+                'valor_bruto': str(reserva.valor_bruto.amount),
+                'hospede_principal': reserva.hospede_principal_id == pessoa.pk,
+            }
+            for reserva in perfil['reservas']
+        ],
+        'documentos': [
+            {
+                'tipo': documento.tipo_documento,
+                'reserva': documento.reserva.codigo_confirmacao,
+                'arquivo': documento.arquivo.url if documento.arquivo else None,
+                'miniatura': documento.miniatura.url if documento.miniatura else None,
+            }
+            for documento in pessoa.documentos.all()
+        ],
+        'relacionamentos': [
+            {'tipo': rel.tipo_relacionamento, 'pessoa_id': rel.pessoa_destino_id, 'nome': rel.pessoa_destino.nome}
+            for rel in pessoa.relacionamentos_origem.all()
+        ] + [
+            {'tipo': rel.tipo_relacionamento, 'pessoa_id': rel.pessoa_origem_id, 'nome': rel.pessoa_origem.nome}
+            for rel in pessoa.relacionamentos_destino.all()
+        ],
+    }
+
+
+@receiver(pre_save, sender=Reserva)
+def guardar_estado_anterior(sender, instance, raw=False, **kwargs):
+    instance._stats_anterior = _estado_anterior(instance)
+
+
+@receiver(post_save, sender=Reserva)
+def atualizar_stats_reserva(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    anterior = getattr(instance, '_stats_anterior', {})
+    deltas, recalcular = {}, set()
+    if not created and not anterior:
+        # Gravação de um objeto que não veio do banco: não há como saber o que mudou
+        recalcular.add(instance.hospede_principal_id)
+    else:
+        registrar_mudanca(deltas, recalcular, anterior, _estado_stats(instance))
+    aplicar_deltas_stats(deltas, recalcular)
+    pessoa_ids = {instance.hospede_principal_id, anterior.get('hospede_principal_id')}
+    transaction.on_commit(lambda: invalidar_stats(pessoa_ids))
+
+
+@receiver(post_delete, sender=Reserva)
+def remover_dos_stats(sender, instance, **kwargs):
+    deltas, recalcular = {}, set()
+    registrar_mudanca(deltas, recalcular, _estado_anterior(instance) or _estado_stats(instance), {})
+    aplicar_deltas_stats(deltas, recalcular)
+    pessoa_ids = {instance.hospede_principal_id}
+    transaction.on_commit(lambda: invalidar_stats(pessoa_ids))
+
+
+@receiver(reservas_gravadas_em_lote)
+def atualizar_stats_lote(sender, reservas, **kwargs):
+    deltas, recalcular = {}, set()
+    for reserva in reservas:
+        registrar_mudanca(deltas, recalcular, _estado_anterior(reserva), _estado_stats(reserva))
+    aplicar_deltas_stats(deltas, recalcular)
+    pessoa_ids = pessoas_das_reservas(reservas)
+    transaction.on_commit(lambda: invalidar_stats(pessoa_ids))
@@ -0,0 +1,112 @@
+"""
+Relatório de ritmo de reservas (pacing): para cada mês futuro, a receita já
+reservada até hoje comparada com a do mesmo mês do ano anterior na mesma
+antecedência (reservas feitas até a mesma data, um ano antes).
+
+O histórico necessário vem de um único values_list ordenado por data de
+entrada (índice hospedes_reserva_entrada) e vira colunas compactas
+(array.array): mês de entrada, data da reserva (ordinal) e receita líquida em
+centavos. Como as colunas estão ordenadas por mês, cada mês é uma fatia
+localizada por bisect, e as somas são feitas coluna a coluna (map/compress/sum
+em C), sem instanciar modelos nem iterar objeto a objeto. As reservas
+arquivadas entram pela view ReservaHistorica.
+"""
+
+from array import array
+from bisect import bisect_left
+from datetime import date
+from itertools import compress
+
+from django.utils import timezone
+
+from .models import RECEITA_LIQUIDA_CENTAVOS, ReservaHistorica, centavos_para_decimal
+
+MESES_PADRAO = 12
+
+
+def _indice_mes(data):
+    return data.year * 12 + data.month - 1
+
+
+def _primeiro_dia(indice):
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def _um_ano_antes(data):
+    try:
+        return data.replace(year=data.year - 1)
+    except ValueError:  # 29/02
+        return data.replace(year=data.year - 1, day=28)
+
+
+def carregar_colunas(inicio, fim, queryset=None):
+    """
+    Colunas compactas das reservas válidas com entrada em [inicio, fim):
+    mês de entrada (ordenado), data da reserva (ordinal) e receita em centavos.
+    """
+    queryset = ReservaHistorica.objects.all() if queryset is None else queryset
+    linhas = queryset.filter(
+        data_entrada__gte=inicio, data_entrada__lt=fim
+    ).exclude(status='CANCELADA').annotate(
+        receita_centavos=RECEITA_LIQUIDA_CENTAVOS
+    ).order_by('data_entrada').values_list('data_entrada', 'data_reserva', 'receita_centavos')
+
+    entradas, reservas, receitas = zip(*linhas) if linhas else ((), (), ())
+    return (
+        array('l', map(_indice_mes, entradas)),
+        array('l', map(date.toordinal, reservas)),
+        array('q', (receita or 0 for receita in receitas)),
+    )
+
+
+def _somar_mes(colunas, indice, limite=None):
+    """Reservas e receita (centavos) do mês `indice`, reservadas até o ordinal `limite`."""
+    meses, reservas, receitas = colunas
+    inicio, fim = bisect_left(meses, indice), bisect_left(meses, indice + 1)
+    if limite is None:
+        return fim - inicio, sum(receitas[inicio:fim])
+    seletor = list(map(limite.__ge__, reservas[inicio:fim]))
+    return sum(seletor), sum(compress(receitas[inicio:fim], seletor))
+
+
+def relatorio_ritmo(hoje=None, meses=MESES_PADRAO, queryset=None):
+    """
+    Ritmo de reservas dos próximos `meses` (a partir do mês corrente).
+
+    Para cada mês: reservas e receita em carteira hoje, as do mesmo mês do ano
+    anterior com a mesma antecedência, o total final do ano anterior e a
+    projeção (total final do ano anterior × ritmo atual).
+    """
+    hoje = hoje or timezone.localdate()
+    hoje_ano_anterior = _um_ano_antes(hoje)
+    primeiro = _indice_mes(hoje)
+
+    colunas = carregar_colunas(
+        _primeiro_dia(primeiro - 12), _primeiro_dia(primeiro + meses), queryset
+    )
+    limite_atual = hoje.toordinal()
+    limite_anterior = hoje_ano_anterior.toordinal()
+
+    linhas = []
+    for indice in range(primeiro, primeiro + meses):
+        reservas, receita = _somar_mes(colunas, indice, limite_atual)
+        reservas_ant, receita_ant = _somar_mes(colunas, indice - 12, limite_anterior)
+        _, receita_final_ant = _somar_mes(colunas, indice - 12)
+
+        ritmo = receita / receita_ant if receita_ant else None
+        linhas.append({
+            'mes': _primeiro_dia(indice),
+            'reservas': reservas,
+            'receita': centavos_para_decimal(receita),
+            'reservas_ano_anterior': reservas_ant,
+            'receita_ano_anterior': centavos_para_decimal(receita_ant),
+            'receita_final_ano_anterior': centavos_para_decimal(receita_final_ant),
+            'variacao': round((ritmo - 1) * 100, 1) if ritmo is not None else None,
+            'projecao': centavos_para_decimal(round(receita_final_ant * ritmo)) if ritmo is not None else None,
+        })
+
+    return {
+        'data_base': hoje,
+        'data_base_ano_anterior': hoje_ano_anterior,
+        'meses': linhas,
+    }
@@ -0,0 +1,172 @@
+"""
+Leituras numa réplica do banco (opcional, REPLICA_DATABASE_URL).
+
+Só as leituras feitas dentro de `leitura_replica()` (ou de views decoradas
+com `usar_replica`) vão para a réplica: dashboard, feed iCalendar e os
+relatórios/histogramas. Escritas, transações, autenticação e sessões ficam
+sempre no banco principal.
+
+Como a réplica pode estar alguns segundos atrás, quem acabou de gravar
+continua lendo do principal (read-your-writes): o roteador marca a
+requisição em db_for_write e o ReplicaMiddleware grava um cookie que mantém
+as leituras desse navegador no principal por REPLICA_JANELA_ESCRITA
+segundos.
+
+Para testar localmente, aponte a réplica para outro arquivo SQLite (copiado
+do principal) ou outro banco PostgreSQL:
+
+    REPLICA_DATABASE_URL=sqlite:///replica.sqlite3 python manage.py runserver
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = 'replica'
+COOKIE_ESCRITA = 'replica_primaria_ate'
+
+# Só os modelos do app vão para a réplica; auth e sessões ficam no principal
+APPS_REPLICADOS = {'hospedes'}
+
+_usar_replica = ContextVar('usar_replica', default=False)
+
+
+class EstadoRequisicao:
+    """
+    Estado da requisição: se lê do principal (escrita recente) e se gravou.
+    É mutável para que escritas feitas em threads de sync_to_async (que
+    recebem uma cópia do contexto) fiquem visíveis para o middleware.
+    """
+
+    def __init__(self, primaria=False):
+        self.primaria = primaria
+        self.escreveu = False
+
+
+estado_atual = ContextVar('estado_replica', default=None)
+
+
+def replica_configurada():
+    return REPLICA in connections.databases
+
+
+@contextmanager
+def leitura_replica():
+    """Envia para a réplica as leituras do bloco (se houver réplica configurada)."""
+    token = _usar_replica.set(True)
+    try:
+        yield
+    finally:
+        _usar_replica.reset(token)
+
+
+def _renderizar(response):
+    # TemplateResponse renderiza depois da view; as consultas do template também vão para a réplica
+    if hasattr(response, 'render') and not response.is_rendered:
+        response.render()
+    return response
+
+
+def usar_replica(view):
+    """Decorator de views (síncronas ou assíncronas) que leem da réplica."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def _view(*args, **kwargs):
+            with leitura_replica():
+                return _renderizar(await view(*args, **kwargs))
+    else:
+        @wraps(view)
+        def _view(*args, **kwargs):
+            with leitura_replica():
+                return _renderizar(view(*args, **kwargs))
+    return _view
+
+
+def fixar_banco(queryset):
+    """
+    Fixa no queryset o banco escolhido agora. Necessário em respostas em
+    streaming, que são avaliadas depois que a view (e o bloco) terminou.
+    """
+    return queryset.using(queryset.db)
+
+
+class RoteadorReplica:
+    """Leituras marcadas vão para a réplica; todo o resto usa o banco principal."""
+
+    def db_for_read(self, model, **hints):
+        if not _usar_replica.get() or model._meta.app_label not in APPS_REPLICADOS:
+            return None
+        if not replica_configurada() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        estado = estado_atual.get()
+        if estado is not None and (estado.primaria or estado.escreveu):
+            return DEFAULT_DB_ALIAS
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        # Sessões e o cache no banco não afetam o que é lido da réplica
+        estado = estado_atual.get()
+        if estado is not None and model._meta.app_label in APPS_REPLICADOS:
+            estado.escreveu = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica e principal têm os mesmos dados
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+class ReplicaMiddleware:
+    """
+    Mantém no banco principal as leituras de quem gravou há menos de
+    REPLICA_JANELA_ESCRITA segundos (cookie renovado a cada escrita).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _estado(self, request):
+        try:
+            primaria_ate = float(request.COOKIES.get(COOKIE_ESCRITA, 0))
+        except ValueError:
+            primaria_ate = 0
+        return EstadoRequisicao(primaria=primaria_ate > time.time())
+
+    def _marcar(self, request, estado, response):
+        if estado.escreveu:
+            janela = settings.REPLICA_JANELA_ESCRITA
+            response.set_cookie(
+                COOKIE_ESCRITA, f'{time.time() + janela:.0f}',
+                max_age=janela, httponly=True, samesite='Lax', secure=request.is_secure(),
+            )
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        estado = self._estado(request)
+        token = estado_atual.set(estado)
+        try:
+            return self._marcar(request, estado, self.get_response(request))
+        finally:
+            estado_atual.reset(token)
+
+    async def __acall__(self, request):
+        estado = self._estado(request)
+        token = estado_atual.set(estado)
+        try:
+            return self._marcar(request, estado, await self.get_response(request))
+        finally:
+            estado_atual.reset(token)
@@ -1,18 +1,243 @@
 import csv
-from datetime import datetime
-from decimal import Decimal
-from typing import Optional, Dict, List
+import hashlib
+import io
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice, repeat
+from typing import Optional, Dict, Iterable, Iterator, List, Union
 import re
-from django.db import transaction
+import django
+from django.db import connections, models, transaction
+from django.db.models import F
+from django.utils import timezone
 from djmoney.money import Money
 
-from .models import Pessoa, Reserva, Plataforma, Contato
+from .auditoria import atomic_auditado, lote_auditoria, registrar_operacao_em_lote
+from .models import Pessoa, Reserva, ReservaArquivada, Plataforma, Propriedade, Contato, ImportacaoArquivo
+from .signals import reservas_gravadas_em_lote
 
+PHONE_CLEAN_RE = re.compile(r'[^0-9+]')
+DATE_FORMATS = ('%d/%m/%Y', '%Y-%m-%d')
+# Remove símbolo da moeda, separador de milhar e espaços; vírgula vira ponto decimal
+DECIMAL_TRANSLATION = str.maketrans({'R': None, '$': None, '.': None, ',': '.', ' ': None, '\xa0': None})
 
-class AirbnbCSVImporter:
+
+def file_fingerprint(file_path: str, platform: str, chunk_size: int = 64 * 1024) -> str:
+    """
+    Calcula o SHA-256 da plataforma e do conteúdo de um arquivo, lendo em
+    blocos: o mesmo arquivo importado como outra plataforma é outra importação.
+    """
+    digest = hashlib.sha256(f'{platform}\x1f'.encode('utf-8'))
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[List]:
+    """Divide um iterável em listas de até `size` itens."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class ColumnParser:
+    """
+    Conversor orientado a colunas para os CSVs de reservas.
+
+    Em vez de converter célula a célula, cada lote de linhas é convertido
+    coluna a coluna: o formato de data é detectado uma vez por arquivo, datas e
+    valores repetidos são memoizados e os padrões são pré-compilados.
+    Valores inválidos viram None para que o importador registre o erro.
+    """
+
+    def __init__(self, date_formats=DATE_FORMATS, decimal_translation=DECIMAL_TRANSLATION):
+        self.date_formats = tuple(date_formats)
+        self.decimal_translation = decimal_translation
+        self.date_format: Optional[str] = None
+        self._date_cache: Dict[str, Optional[date]] = {}
+        self._decimal_cache: Dict[str, Optional[Decimal]] = {}
+
+    def detect_date_format(self, values: Iterable[str]) -> Optional[str]:
+        """Define o formato de data a partir do primeiro valor preenchido."""
+        for value in values:
+            value = (value or '').strip()
+            if not value:
+                continue
+            for fmt in self.date_formats:
+                try:
+                    datetime.strptime(value, fmt)
+                except ValueError:
+                    continue
+                self.date_format = fmt
+                return fmt
+        return None
+
+    def _parse_date(self, value: str) -> Optional[date]:
+        formats = (self.date_format,) if self.date_format else ()
+        # Mantém os demais formatos como fallback para arquivos mistos
+        formats += tuple(fmt for fmt in self.date_formats if fmt != self.date_format)
+        for fmt in formats:
+            try:
+                return datetime.strptime(value, fmt).date()
+            except ValueError:
+                continue
+        return None
+
+    def parse_dates(self, values: List[str]) -> List[Optional[date]]:
+        if self.date_format is None:
+            self.detect_date_format(values)
+        cache = self._date_cache
+        result = []
+        for value in values:
+            value = (value or '').strip()
+            if value not in cache:
+                cache[value] = self._parse_date(value) if value else None
+            result.append(cache[value])
+        return result
+
+    def parse_decimals(self, values: List[str]) -> List[Optional[Decimal]]:
+        cache = self._decimal_cache
+        result = []
+        for value in values:
+            value = value or ''
+            if value not in cache:
+                try:
+                    cache[value] = Decimal(value.translate(self.decimal_translation))
+                except InvalidOperation:
+                    cache[value] = None
+            result.append(cache[value])
+        return result
+
+    def parse_ints(self, values: List[str], default: int) -> List[Optional[int]]:
+        result = []
+        for value in values:
+            if not value:
+                result.append(default)
+                continue
+            try:
+                result.append(int(value))
+            except ValueError:
+                result.append(None)
+        return result
+
+    def parse_phones(self, values: List[str]) -> List[str]:
+        sub = PHONE_CLEAN_RE.sub
+        return [sub('', value) if value else '' for value in values]
+
+
+# Registro de parsers por plataforma: chave usada em --platform -> classe
+PLATFORM_PARSERS: Dict[str, type] = {}
+
+
+def register_platform(cls):
+    """Registra um PlatformCSVParser pela sua `key`."""
+    PLATFORM_PARSERS[cls.key] = cls
+    return cls
+
+
+def get_platform_parser(key: str) -> 'PlatformCSVParser':
+    try:
+        return PLATFORM_PARSERS[key]()
+    except KeyError:
+        raise ValueError(
+            f'Plataforma desconhecida: {key}. Opções: {", ".join(sorted(PLATFORM_PARSERS))}'
+        )
+
+
+class PlatformCSVParser:
+    """
+    Converte as linhas do CSV de uma plataforma em registros canônicos.
+
+    Cada plataforma informa o mapeamento de cabeçalhos (`colunas`: campo
+    canônico -> coluna do CSV), o mapeamento de status e, se necessário,
+    sobrescreve `finalizar` para ajustes específicos. Um registro canônico tem
+    os campos: codigo, nome, telefone, anuncio, data_reserva, data_entrada,
+    data_saida, noites, num_adultos, num_criancas, valor e status. Linhas
+    inválidas viram {'erro': mensagem}.
+    """
+
+    key = ''
+    plataforma = ''
+    colunas: Dict[str, str] = {}
+    status_map: Dict[str, str] = {}
+    status_padrao = 'PENDENTE'
+    obrigatorios = ('codigo', 'nome', 'data_entrada', 'data_saida')
+    campos_data = ('data_reserva', 'data_entrada', 'data_saida')
+    # campo canônico (ou auxiliar) -> valor padrão quando vazio
+    campos_inteiros = {'noites': 0, 'num_adultos': 1, 'num_criancas': 0}
+    date_formats = DATE_FORMATS
+    decimal_translation = DECIMAL_TRANSLATION
+
+    def __init__(self):
+        self.columns = ColumnParser(self.date_formats, self.decimal_translation)
+
+    def map_status(self, status: Optional[str]) -> str:
+        return self.status_map.get((status or '').strip(), self.status_padrao)
+
+    def _coluna(self, rows: List[Dict], campo: str) -> List[Optional[str]]:
+        cabecalho = self.colunas.get(campo)
+        if cabecalho is None:
+            return [None] * len(rows)
+        return [row.get(cabecalho) for row in rows]
+
+    def finalizar(self, row: Dict, registro: Dict) -> Dict:
+        """Ajustes específicos da plataforma sobre o registro já convertido."""
+        return registro
+
+    def parse_rows(self, rows: List[Dict]) -> List[Dict]:
+        """Converte um lote de linhas, coluna a coluna."""
+        datas = {campo: self.columns.parse_dates(self._coluna(rows, campo)) for campo in self.campos_data}
+        valores = self.columns.parse_decimals(self._coluna(rows, 'valor'))
+        inteiros = {
+            campo: self.columns.parse_ints(self._coluna(rows, campo), padrao)
+            for campo, padrao in self.campos_inteiros.items()
+        }
+        telefones = self.columns.parse_phones(self._coluna(rows, 'telefone'))
+        anuncios = [(anuncio or '').strip() for anuncio in self._coluna(rows, 'anuncio')]
+
+        registros = []
+        for i, row in enumerate(rows):
+            faltando = next(
+                (self.colunas[campo] for campo in self.obrigatorios if not row.get(self.colunas[campo])),
+                None
+            )
+            if faltando:
+                registros.append({'erro': f'Campo obrigatório não encontrado: {faltando}'})
+                continue
+
+            codigo = row[self.colunas['codigo']].strip()
+            if not all(datas[campo][i] for campo in self.campos_data):
+                registros.append({'erro': f'Data inválida para reserva {codigo}'})
+                continue
+            if valores[i] is None:
+                registros.append({'erro': f'Valor inválido para reserva {codigo}'})
+                continue
+            if any(inteiros[campo][i] is None for campo in inteiros):
+                registros.append({'erro': f'Número inválido para reserva {codigo}'})
+                continue
+
+            registro = {
+                'codigo': codigo,
+                'nome': row[self.colunas['nome']].strip(),
+                'telefone': telefones[i],
+                'anuncio': anuncios[i],
+                'valor': valores[i],
+                'status': self.map_status(row.get(self.colunas.get('status', ''))),
+                **{campo: datas[campo][i] for campo in self.campos_data},
+                **{campo: inteiros[campo][i] for campo in inteiros},
+            }
+            registros.append(self.finalizar(row, registro))
+        return registros
+
+
+@register_platform
+class AirbnbCSVParser(PlatformCSVParser):
     """
-    Classe responsável por importar dados do Airbnb via CSV.
-    Formato novo do CSV:
+    CSV de reservas do Airbnb:
     - Código de confirmação
     - Status
     - Nome do hóspede
@@ -27,136 +252,716 @@ class AirbnbCSVImporter:
     - Anúncio
     - Ganhos
     """
-    
-    def __init__(self):
+
+    key = 'airbnb'
+    plataforma = 'Airbnb'
+    colunas = {
+        'codigo': 'Código de confirmação',
+        'status': 'Status',
+        'nome': 'Nome do hóspede',
+        'telefone': 'Entrar em contato',
+        'num_adultos': 'Nº de adultos',
+        'num_criancas': 'Nº de crianças',
+        'num_bebes': 'Nº de bebês',
+        'data_entrada': 'Data de início',
+        'data_saida': 'Data de término',
+        'noites': 'Nº de noites',
+        'data_reserva': 'Reservado',
+        'anuncio': 'Anúncio',
+        'valor': 'Ganhos',
+    }
+    status_map = {
+        'Confirmada': 'CONFIRMADA',
+        'Estadia em andamento': 'CHECKIN',
+        'Aguardando avaliação do hóspede': 'CHECKOUT',
+        'Hóspede anterior': 'FINALIZADA',
+        'Cancelada': 'CANCELADA',
+    }
+    campos_inteiros = {'noites': 0, 'num_adultos': 1, 'num_criancas': 0, 'num_bebes': 0}
+
+    def finalizar(self, row: Dict, registro: Dict) -> Dict:
+        # Bebês contam como crianças no sistema
+        registro['num_criancas'] += registro.pop('num_bebes')
+        return registro
+
+
+@register_platform
+class BookingCSVParser(PlatformCSVParser):
+    """Exportação de reservas da extranet do Booking.com (cabeçalhos em inglês)."""
+
+    key = 'booking'
+    plataforma = 'Booking.com'
+    colunas = {
+        'codigo': 'Book number',
+        'nome': 'Guest name(s)',
+        'telefone': 'Phone number',
+        'data_entrada': 'Check-in',
+        'data_saida': 'Check-out',
+        'data_reserva': 'Booked on',
+        'status': 'Status',
+        'num_adultos': 'Adults',
+        'num_criancas': 'Children',
+        'noites': 'Duration (nights)',
+        'valor': 'Price',
+        'anuncio': 'Property name',
+    }
+    status_map = {
+        'ok': 'CONFIRMADA',
+        'cancelled_by_guest': 'CANCELADA',
+        'cancelled_by_hotel': 'CANCELADA',
+        'no_show': 'CANCELADA',
+    }
+    date_formats = ('%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%d/%m/%Y')
+    # Valores no formato "1234.56 BRL": ponto já é o separador decimal
+    decimal_translation = str.maketrans({
+        **{letra: None for letra in 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'},
+        ',': None, ' ': None, '\xa0': None,
+    })
+
+
+def record_fingerprint(platform: str, registro: Dict) -> str:
+    """Hash dos campos normalizados de um registro, usado para pular linhas sem alteração."""
+    campos = [platform, *(f'{campo}={registro[campo]}' for campo in sorted(registro))]
+    return hashlib.sha256('\x1f'.join(campos).encode('utf-8')).hexdigest()
+
+
+def parse_csv_file(file_path: str, platform: str = 'airbnb') -> Dict:
+    """
+    Converte um CSV inteiro em registros canônicos, sem acessar o banco.
+
+    Executado nos processos do pool de importação de vários arquivos; o
+    resultado (registros já com hash, erros e total de linhas) volta ao
+    processo principal, que faz a gravação.
+    """
+    parser = get_platform_parser(platform)
+    nome_arquivo = os.path.basename(file_path)
+    registros: Dict[str, Dict] = {}
+    erros: List[str] = []
+    linhas = 0
+    with open(file_path, 'r', encoding='utf-8-sig') as file:
+        for batch in chunked(csv.DictReader(file), ReservationImporter.BATCH_SIZE):
+            linhas += len(batch)
+            for registro in parser.parse_rows(batch):
+                if 'erro' in registro:
+                    erros.append(f'{nome_arquivo}: {registro["erro"]}')
+                    continue
+                registro['hash'] = record_fingerprint(platform, registro)
+                registros[registro['codigo']] = registro
+    return {
+        'arquivo': file_path,
+        'fingerprint': file_fingerprint(file_path, platform),
+        'linhas': linhas,
+        'registros': list(registros.values()),
+        'erros': erros,
+    }
+
+
+class ReservationImporter:
+    """
+    Motor de importação de CSV compartilhado por todas as plataformas.
+
+    O parser da plataforma converte cada lote de linhas em registros
+    canônicos; o motor faz a deduplicação por código de confirmação, pula
+    linhas inalteradas (hash), grava pessoas, contatos e reservas com
+    bulk_create/bulk_update e coleta os erros. O arquivo é identificado pelo
+    hash da plataforma e do conteúdo para não ser reprocessado e para retomar
+    importações interrompidas a partir do último lote confirmado.
+    """
+
+    BATCH_SIZE = 1000
+    CAMPOS_GRAVADOS = [
+        'hospede_principal', 'plataforma', 'propriedade', 'data_reserva', 'data_entrada', 'data_saida',
+        'noites', 'num_adultos', 'num_criancas', 'valor_bruto', 'ganhos_brutos',
+        'status', 'hash_importacao', 'updated_at',
+    ]
+
+    def __init__(self, platform: str = 'airbnb'):
+        self.parser = get_platform_parser(platform)
         self.plataforma, _ = Plataforma.objects.get_or_create(
-            nome='Airbnb',
+            nome=self.parser.plataforma,
             defaults={'ativo': True}
         )
         self.erros: List[str] = []
-        self.sucessos: List[str] = []
-        
-    def parse_date(self, date_str: str) -> Optional[datetime]:
-        """Converte string de data do CSV para objeto datetime."""
-        if not date_str:
-            return None
-            
+        self.criadas = 0
+        self.atualizadas = 0
+        self.ignoradas = 0
+        self.arquivo_repetido = False
+        self.arquivos_repetidos = 0
+        self.conflitos = 0
+
+    def row_fingerprint(self, registro: Dict) -> str:
+        return record_fingerprint(self.parser.key, registro)
+
+    def _registros_do_lote(self, rows: List[Dict]) -> Dict[str, Dict]:
+        """Converte o lote, coleta erros e deduplica por código (a última linha prevalece)."""
+        registros: Dict[str, Dict] = {}
+        for registro in self.parser.parse_rows(rows):
+            if 'erro' in registro:
+                self.erros.append(registro['erro'])
+                continue
+            registro['hash'] = self.row_fingerprint(registro)
+            registros[registro['codigo']] = registro
+        return registros
+
+    def _gravar(self, registros: List[Dict]) -> None:
+        """Grava pessoas, contatos e reservas de um conjunto de registros em lote."""
+        agora = timezone.now()
+
+        # Pessoas (por nome, como no cadastro manual)
+        nomes = sorted({registro['nome'] for registro in registros})
+        pessoas: Dict[str, Pessoa] = {}
+        for pessoa in Pessoa.objects.filter(nome__in=nomes).order_by('pk'):
+            pessoas.setdefault(pessoa.nome, pessoa)
+        novas_pessoas = Pessoa.objects.bulk_create([Pessoa(nome=nome) for nome in nomes if nome not in pessoas])
+        pessoas.update({pessoa.nome: pessoa for pessoa in novas_pessoas})
+        registrar_operacao_em_lote(novas_pessoas, acao='CRIACAO')
+
+        # Contatos de WhatsApp
+        contatos = {
+            (pessoas[registro['nome']].pk, registro['telefone'])
+            for registro in registros if registro['telefone']
+        }
+        if contatos:
+            existentes = set(Contato.objects.filter(
+                pessoa_id__in={pessoa_id for pessoa_id, _ in contatos},
+                tipo='WHATSAPP',
+                valor__in={valor for _, valor in contatos},
+            ).values_list('pessoa_id', 'valor'))
+            Contato.objects.bulk_create([
+                Contato(pessoa_id=pessoa_id, tipo='WHATSAPP', valor=valor, principal=True)
+                for pessoa_id, valor in sorted(contatos - existentes)
+            ])
+
+        # Propriedades (coluna Anúncio)
+        anuncios = sorted({registro['anuncio'] for registro in registros if registro['anuncio']})
+        propriedades = {propriedade.nome: propriedade for propriedade in Propriedade.objects.filter(nome__in=anuncios)}
+        propriedades.update({
+            propriedade.nome: propriedade
+            for propriedade in Propriedade.objects.bulk_create(
+                [Propriedade(nome=nome) for nome in anuncios if nome not in propriedades]
+            )
+        })
+
+        # Reservas
+        existentes = Reserva.objects.in_bulk(
+            [registro['codigo'] for registro in registros], field_name='codigo_confirmacao'
+        )
+        novas, alteradas = [], []
+        for registro in registros:
+            reserva = existentes.get(registro['codigo']) or Reserva(codigo_confirmacao=registro['codigo'])
+            valor = Money(registro['valor'], 'BRL')
+            reserva.hospede_principal = pessoas[registro['nome']]
+            reserva.plataforma = self.plataforma
+            reserva.propriedade = propriedades.get(registro['anuncio'])
+            reserva.data_reserva = registro['data_reserva']
+            reserva.data_entrada = registro['data_entrada']
+            reserva.data_saida = registro['data_saida']
+            reserva.noites = registro['noites']
+            reserva.num_adultos = registro['num_adultos']
+            reserva.num_criancas = registro['num_criancas']
+            reserva.valor_bruto = valor
+            reserva.ganhos_brutos = valor
+            reserva.status = registro['status']
+            reserva.hash_importacao = registro['hash']
+            reserva.updated_at = agora
+            reserva.preparar_para_gravacao()
+            (alteradas if reserva.pk else novas).append(reserva)
+
+        Reserva.objects.bulk_create(novas)
+        Reserva.objects.bulk_update(alteradas, self.CAMPOS_GRAVADOS)
+        reservas_gravadas_em_lote.send(sender=Reserva, reservas=novas + alteradas)
+        registrar_operacao_em_lote(novas, acao='CRIACAO')
+        registrar_operacao_em_lote(alteradas)
+        self.criadas += len(novas)
+        self.atualizadas += len(alteradas)
+
+    def _gravar_com_fallback(self, registros: List[Dict]) -> List[str]:
+        """
+        Tenta gravar o lote inteiro; se falhar, grava registro a registro para
+        isolar o erro. Retorna os códigos que não puderam ser gravados. O log
+        de alterações e os contadores das tentativas revertidas são descartados.
+        """
+        contadores = self.criadas, self.atualizadas
         try:
-            # Formato DD/MM/YYYY
-            return datetime.strptime(date_str.strip(), '%d/%m/%Y').date()
-        except (ValueError, TypeError):
+            with atomic_auditado():
+                self._gravar(registros)
+            return []
+        except Exception:
+            self.criadas, self.atualizadas = contadores
+
+        falhas = []
+        for registro in registros:
+            contadores = self.criadas, self.atualizadas
             try:
-                # Formato YYYY-MM-DD
-                return datetime.strptime(date_str.strip(), '%Y-%m-%d').date()
-            except (ValueError, TypeError):
-                return None
-    
-    def parse_decimal(self, value_str: str) -> Decimal:
-        """Converte string de valor para Decimal."""
+                with atomic_auditado():
+                    self._gravar([registro])
+            except Exception as e:
+                self.criadas, self.atualizadas = contadores
+                self.erros.append(f'Erro ao processar reserva {registro["codigo"]}: {str(e)}')
+                falhas.append(registro['codigo'])
+        return falhas
+
+    def _hashes_gravados(self, codigos: List[str]) -> Dict[str, str]:
+        return dict(
+            Reserva.objects.filter(codigo_confirmacao__in=codigos).values_list(
+                'codigo_confirmacao', 'hash_importacao'
+            )
+        )
+
+    def _codigos_arquivados(self, codigos: List[str]) -> set:
+        if not codigos:
+            return set()
+        return set(
+            ReservaArquivada.objects.filter(codigo_confirmacao__in=codigos).values_list(
+                'codigo_confirmacao', flat=True
+            )
+        )
+
+    def process_batch(self, rows: List[Dict], importacao: ImportacaoArquivo) -> None:
+        """
+        Processa um lote de linhas e registra o progresso na mesma transação.
+
+        Registros cujo hash coincide com o gravado na reserva são pulados sem
+        escrita no banco, assim como os de reservas já arquivadas (que não
+        voltam para a tabela de reservas). Se a importação for interrompida,
+        ela é retomada a partir do último lote confirmado.
+        """
+        erros = len(self.erros)
+        registros = self._registros_do_lote(rows)
+        hashes_gravados = self._hashes_gravados(list(registros))
+        arquivados = self._codigos_arquivados([codigo for codigo in registros if codigo not in hashes_gravados])
+        alterados = [
+            registro for codigo, registro in registros.items()
+            if codigo not in arquivados and hashes_gravados.get(codigo) != registro['hash']
+        ]
+
+        criadas, atualizadas = self.criadas, self.atualizadas
+        ignoradas = len(registros) - len(alterados)
+        self.ignoradas += ignoradas
+        # O log de alterações do lote é gravado com um único INSERT, na mesma transação
+        with transaction.atomic(), lote_auditoria():
+            if alterados:
+                self._gravar_com_fallback(alterados)
+
+            ImportacaoArquivo.objects.filter(pk=importacao.pk).update(
+                linhas_processadas=F('linhas_processadas') + len(rows),
+                criadas=F('criadas') + (self.criadas - criadas),
+                atualizadas=F('atualizadas') + (self.atualizadas - atualizadas),
+                ignoradas=F('ignoradas') + ignoradas,
+                erros=F('erros') + (len(self.erros) - erros),
+            )
+
+    def import_csv(self, file_path: str, nome_arquivo: Optional[str] = None) -> Dict:
+        """
+        Importa CSV de reservas, convertendo as linhas em lotes coluna a coluna.
+
+        Um arquivo já importado sem erros não é processado de novo, e uma
+        importação interrompida continua do último lote confirmado. Um arquivo
+        importado com erros (PARCIAL) é reprocessado do início: as linhas já
+        gravadas são puladas pelo hash.
+        """
         try:
-            # Remove o símbolo da moeda e converte para decimal
-            clean_value = value_str.replace('R$', '').replace('.', '').replace(',', '.').strip()
-            return Decimal(clean_value)
-        except (ValueError, TypeError, AttributeError):
-            return Decimal('0')
-    
-    def parse_phone(self, phone_str: str) -> str:
-        """Limpa e formata o número de telefone."""
-        if not phone_str:
-            return ""
-        return re.sub(r'[^0-9+]', '', phone_str)
-
-    def map_status(self, status: str) -> str:
-        """Mapeia o status do Airbnb para o status do sistema."""
-        status_map = {
-            'Confirmada': 'CONFIRMADA',
-            'Estadia em andamento': 'CHECKIN',
-            'Aguardando avaliação do hóspede': 'CHECKOUT',
-            'Hóspede anterior': 'FINALIZADA',
-            'Cancelada': 'CANCELADA'
-        }
-        return status_map.get(status, 'PENDENTE')
+            importacao, _ = ImportacaoArquivo.objects.get_or_create(
+                fingerprint=file_fingerprint(file_path, self.parser.key),
+                defaults={
+                    'nome_arquivo': nome_arquivo or os.path.basename(file_path),
+                    'plataforma': self.plataforma,
+                }
+            )
+            if importacao.status == 'CONCLUIDA':
+                self.arquivo_repetido = True
+                return self.get_result()
+            if importacao.status == 'PARCIAL':
+                importacao.status = 'EM_ANDAMENTO'
+                importacao.linhas_processadas = importacao.criadas = importacao.atualizadas = 0
+                importacao.ignoradas = importacao.erros = 0
+                importacao.concluida_em = None
+                importacao.save()
+
+            with open(file_path, 'r', encoding='utf-8-sig') as file:
+                reader = csv.DictReader(file)
+                # Retoma após as linhas dos lotes já confirmados
+                rows = islice(reader, importacao.linhas_processadas, None)
+                for batch in chunked(rows, self.BATCH_SIZE):
+                    self.process_batch(batch, importacao)
+
+            importacao.refresh_from_db(fields=['erros'])
+            importacao.status = 'PARCIAL' if importacao.erros else 'CONCLUIDA'
+            importacao.concluida_em = timezone.now()
+            importacao.save(update_fields=['status', 'concluida_em', 'updated_at'])
+        except Exception as e:
+            self.erros.append(str(e))
+        
+        return self.get_result()
+
+    def import_files(self, file_paths: List[str], workers: Optional[int] = None) -> Dict:
+        """
+        Importa vários CSVs: a conversão roda em paralelo num pool de processos
+        e a gravação acontece numa única etapa em lote, numa só transação.
+
+        Quando o mesmo código de confirmação aparece em mais de um arquivo,
+        prevalece o registro do arquivo modificado por último (a exportação
+        mais recente). Arquivos já importados sem erros são ignorados, e
+        reservas já arquivadas são puladas, como em process_batch. Cada arquivo
+        fica CONCLUIDA ou, se algum registro dele falhou, PARCIAL.
+        """
+        arquivos: Dict[str, str] = {}
+        for path in file_paths:
+            arquivos.setdefault(file_fingerprint(path, self.parser.key), path)
+        concluidos = set(ImportacaoArquivo.objects.filter(
+            fingerprint__in=list(arquivos), status='CONCLUIDA'
+        ).values_list('fingerprint', flat=True))
+        self.arquivos_repetidos = len(concluidos)
+        pendentes = sorted(
+            (path for fingerprint, path in arquivos.items() if fingerprint not in concluidos),
+            key=os.path.getmtime
+        )
+        if not pendentes:
+            self.arquivo_repetido = True
+            return self.get_result()
 
-    def process_reservation(self, row: Dict) -> None:
-        """Processa uma linha do CSV."""
         try:
-            with transaction.atomic():
-                # Verifica campos obrigatórios
-                required_fields = [
-                    'Código de confirmação', 'Nome do hóspede', 
-                    'Data de início', 'Data de término'
-                ]
-                for field in required_fields:
-                    if not row.get(field):
-                        self.erros.append(f'Campo obrigatório não encontrado: {field}')
-                        return
-
-                # Cria ou obtém a pessoa
-                pessoa, created = Pessoa.objects.get_or_create(
-                    nome=row['Nome do hóspede'].strip()
-                )
-
-                # Adiciona contato se disponível
-                if telefone := self.parse_phone(row.get('Entrar em contato', '')):
-                    Contato.objects.get_or_create(
-                        pessoa=pessoa,
-                        tipo='WHATSAPP',
-                        valor=telefone,
-                        defaults={'principal': True}
-                    )
-                
-                # Processa as datas
-                data_reserva = self.parse_date(row['Reservado'])
-                data_entrada = self.parse_date(row['Data de início'])
-                data_saida = self.parse_date(row['Data de término'])
-                
-                if not all([data_reserva, data_entrada, data_saida]):
-                    self.erros.append(f'Data inválida para reserva {row["Código de confirmação"]}')
-                    return
-
-                # Processa valores financeiros
-                valor_bruto = Money(self.parse_decimal(row['Ganhos']), 'BRL')
-                
-                # Cria ou atualiza a reserva
-                reserva, created = Reserva.objects.update_or_create(
-                    codigo_confirmacao=row['Código de confirmação'],
-                    defaults={
-                        'hospede_principal': pessoa,
-                        'plataforma': self.plataforma,
-                        'data_reserva': data_reserva,
-                        'data_entrada': data_entrada,
-                        'data_saida': data_saida,
-                        'noites': int(row.get('Nº de noites', 0) or 0),
-                        'num_adultos': int(row.get('Nº de adultos', 1) or 1),
-                        'num_criancas': int(row.get('Nº de crianças', 0) or 0) + int(row.get('Nº de bebês', 0) or 0),
-                        'valor_bruto': valor_bruto,
-                        'ganhos_brutos': valor_bruto,
-                        'status': self.map_status(row['Status'])
-                    }
-                )
-
-                action = 'criada' if created else 'atualizada'
-                self.sucessos.append(f'Reserva {row["Código de confirmação"]} {action} com sucesso')
-                    
+            if len(pendentes) == 1 or workers == 1:
+                resultados = [parse_csv_file(path, self.parser.key) for path in pendentes]
+            else:
+                # Conexões abertas não podem ser herdadas pelos processos filhos
+                connections.close_all()
+                with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as executor:
+                    resultados = list(executor.map(parse_csv_file, pendentes, repeat(self.parser.key)))
         except Exception as e:
-            self.erros.append(f'Erro ao processar reserva: {str(e)}')
+            self.erros.append(str(e))
+            return self.get_result()
 
-    def import_csv(self, file_path: str) -> Dict:
-        """Importa CSV de reservas."""
+        # Mescla por código de confirmação, na ordem de modificação dos arquivos
+        registros: Dict[str, Dict] = {}
+        origem: Dict[str, str] = {}
+        for resultado in resultados:
+            self.erros.extend(resultado['erros'])
+            for registro in resultado['registros']:
+                anterior = registros.get(registro['codigo'])
+                if anterior and anterior['hash'] != registro['hash']:
+                    self.conflitos += 1
+                registros[registro['codigo']] = registro
+                origem[registro['codigo']] = resultado['fingerprint']
+
+        contagem = {resultado['fingerprint']: Counter(erros=len(resultado['erros'])) for resultado in resultados}
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    self.process_reservation(row)
+            with transaction.atomic(), lote_auditoria():
+                for lote in chunked(list(registros.values()), self.BATCH_SIZE):
+                    hashes_gravados = self._hashes_gravados([registro['codigo'] for registro in lote])
+                    arquivados = self._codigos_arquivados(
+                        [registro['codigo'] for registro in lote if registro['codigo'] not in hashes_gravados]
+                    )
+                    alterados = []
+                    for registro in lote:
+                        if registro['codigo'] in arquivados or hashes_gravados.get(registro['codigo']) == registro['hash']:
+                            contagem[origem[registro['codigo']]]['ignoradas'] += 1
+                            continue
+                        alterados.append(registro)
+                    self.ignoradas += len(lote) - len(alterados)
+                    falhas = set(self._gravar_com_fallback(alterados)) if alterados else set()
+                    for registro in alterados:
+                        if registro['codigo'] in falhas:
+                            chave = 'erros'
+                        else:
+                            chave = 'atualizadas' if registro['codigo'] in hashes_gravados else 'criadas'
+                        contagem[origem[registro['codigo']]][chave] += 1
+
+                agora = timezone.now()
+                for resultado in resultados:
+                    ImportacaoArquivo.objects.update_or_create(
+                        fingerprint=resultado['fingerprint'],
+                        defaults={
+                            'nome_arquivo': os.path.basename(resultado['arquivo']),
+                            'plataforma': self.plataforma,
+                            'status': 'PARCIAL' if contagem[resultado['fingerprint']]['erros'] else 'CONCLUIDA',
+                            'concluida_em': agora,
+                            'linhas_processadas': resultado['linhas'],
+                            **contagem[resultado['fingerprint']],
+                        }
+                    )
         except Exception as e:
             self.erros.append(str(e))
-        
+
         return self.get_result()
 
     def get_result(self) -> Dict:
         """Retorna o resultado da importação."""
         return {
             'success': len(self.erros) == 0,
-            'imported': len(self.sucessos),
+            'imported': self.criadas + self.atualizadas,
+            'created': self.criadas,
+            'updated': self.atualizadas,
+            'skipped': self.ignoradas,
+            'duplicate_file': self.arquivo_repetido,
+            'conflicts': self.conflitos,
             'errors': self.erros
         }
+
+
+class AirbnbCSVImporter(ReservationImporter):
+    """Importador do CSV do Airbnb (mantido para as views e chamadas existentes)."""
+
+    def __init__(self):
+        super().__init__(platform='airbnb')
+
+
+class AirbnbICalImporter:
+    """
+    Sincroniza as reservas com o calendário iCal exportado pelo Airbnb.
+
+    Os eventos são comparados com as reservas existentes por UID, código de
+    confirmação (extraído da URL na descrição) e, por fim, pelas datas de
+    entrada/saída, usando dicionários montados com uma única consulta. Só as
+    diferenças são gravadas: inserções com bulk_create, alterações de datas com
+    bulk_update e cancelamentos com um UPDATE, todos na mesma transação.
+
+    O Airbnb exporta um calendário por anúncio: com `propriedade`, só as
+    reservas desse anúncio (ou ainda sem anúncio, que passam a ser dele) são
+    comparadas. O cancelamento por ausência exige o anúncio e só atinge as
+    reservas dele já vinculadas ao calendário (com uid_ical): sem anúncio,
+    `cancelar_ausentes` é ignorado, já que o .ics de um anúncio não diz nada
+    sobre as reservas dos outros.
+    """
+
+    CODIGO_RE = re.compile(r'/details/([A-Z0-9]+)')
+    ESCAPE_RE = re.compile(r'\\([\\;,nN])')
+    # Eventos sem reserva (datas bloqueadas manualmente)
+    RESUMOS_BLOQUEIO = ('Airbnb (Not available)', 'Not available', 'Blocked')
+
+    def __init__(self, cancelar_ausentes: bool = True, propriedade: Optional[Propriedade] = None):
+        self.plataforma, _ = Plataforma.objects.get_or_create(
+            nome='Airbnb',
+            defaults={'ativo': True}
+        )
+        self.cancelar_ausentes = cancelar_ausentes and propriedade is not None
+        self.propriedade = propriedade
+        self.erros: List[str] = []
+        self.criadas = 0
+        self.atualizadas = 0
+        self.canceladas = 0
+        self.ignoradas = 0
+
+    @staticmethod
+    def unfold_lines(content: str) -> List[str]:
+        """Desfaz a quebra de linhas longas da RFC 5545 (continuação começa com espaço/tab)."""
+        linhas: List[str] = []
+        for linha in content.splitlines():
+            if linha[:1] in (' ', '\t') and linhas:
+                linhas[-1] += linha[1:]
+            elif linha:
+                linhas.append(linha)
+        return linhas
+
+    @classmethod
+    def unescape(cls, valor: str) -> str:
+        return cls.ESCAPE_RE.sub(lambda m: '\n' if m.group(1) in 'nN' else m.group(1), valor)
+
+    @staticmethod
+    def parse_ical_date(valor: str) -> Optional[date]:
+        """Aceita DATE (YYYYMMDD) e DATE-TIME (YYYYMMDDTHHMMSS[Z]), usando só a data."""
+        try:
+            return datetime.strptime(valor[:8], '%Y%m%d').date()
+        except ValueError:
+            return None
+
+    def parse_events(self, content: str) -> List[Dict]:
+        """Extrai os VEVENTs de reserva do conteúdo .ics."""
+        eventos = []
+        atual = None
+        for linha in self.unfold_lines(content):
+            nome, _, valor = linha.partition(':')
+            nome = nome.split(';', 1)[0].upper()
+            if nome == 'BEGIN' and valor == 'VEVENT':
+                atual = {}
+            elif nome == 'END' and valor == 'VEVENT' and atual is not None:
+                eventos.append(atual)
+                atual = None
+            elif atual is not None:
+                atual[nome] = valor
+
+        resultado = []
+        for evento in eventos:
+            resumo = self.unescape(evento.get('SUMMARY', ''))
+            if resumo in self.RESUMOS_BLOQUEIO:
+                continue
+
+            entrada = self.parse_ical_date(evento.get('DTSTART', ''))
+            saida = self.parse_ical_date(evento.get('DTEND', ''))
+            uid = evento.get('UID')
+            if not (uid and entrada and saida):
+                self.erros.append(f'Evento inválido no calendário: {uid or resumo}')
+                continue
+
+            codigo = self.CODIGO_RE.search(self.unescape(evento.get('DESCRIPTION', '')))
+            resultado.append({
+                'uid': uid,
+                'codigo': codigo.group(1) if codigo else None,
+                'data_entrada': entrada,
+                'data_saida': saida,
+            })
+        return resultado
+
+    def _read(self, source: Union[str, os.PathLike, io.IOBase]) -> str:
+        """Lê o .ics de um caminho local ou de um arquivo enviado (UploadedFile/arquivo aberto)."""
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'r', encoding='utf-8') as file:
+                return file.read()
+        if hasattr(source, 'chunks'):
+            content = b''.join(source.chunks())
+        else:
+            content = source.read()
+        return content.decode('utf-8') if isinstance(content, bytes) else content
+
+    def _indexar_existentes(self, eventos: List[Dict]) -> List[Reserva]:
+        """Carrega, em uma consulta, as reservas que podem corresponder aos eventos."""
+        hoje = timezone.localdate()
+        uids = [evento['uid'] for evento in eventos]
+        codigos = [evento['codigo'] for evento in eventos if evento['codigo']]
+        datas_entrada = {evento['data_entrada'] for evento in eventos}
+        filtro = (
+            models.Q(uid_ical__in=uids)
+            | models.Q(codigo_confirmacao__in=codigos)
+            | models.Q(data_entrada__in=datas_entrada)
+        )
+        if self.cancelar_ausentes:
+            filtro |= models.Q(data_entrada__gte=hoje, propriedade=self.propriedade, uid_ical__isnull=False)
+        reservas = Reserva.objects.filter(filtro, plataforma=self.plataforma)
+        if self.propriedade:
+            reservas = reservas.filter(
+                models.Q(propriedade=self.propriedade) | models.Q(propriedade__isnull=True)
+            )
+        return list(reservas)
+
+    def sync(self, source: Union[str, os.PathLike, io.IOBase]) -> Dict:
+        """Aplica o diff entre o calendário e as reservas existentes."""
+        try:
+            eventos = self.parse_events(self._read(source))
+        except Exception as e:
+            self.erros.append(str(e))
+            return self.get_result()
+
+        try:
+            with transaction.atomic(), lote_auditoria():
+                self._aplicar(eventos)
+        except Exception as e:
+            self.erros.append(f'Erro ao sincronizar calendário: {str(e)}')
+        return self.get_result()
+
+    def _aplicar(self, eventos: List[Dict]) -> None:
+        existentes = self._indexar_existentes(eventos)
+        por_uid = {r.uid_ical: r for r in existentes if r.uid_ical}
+        por_codigo = {r.codigo_confirmacao: r for r in existentes if r.codigo_confirmacao}
+        # Índice por datas, para eventos sem UID/código conhecidos
+        por_datas: Dict = {}
+        for reserva in existentes:
+            if reserva.status != 'CANCELADA':
+                por_datas.setdefault((reserva.data_entrada, reserva.data_saida), []).append(reserva)
+
+        agora = timezone.now()
+        vistas = set()
+        novas: List[Dict] = []
+        alteradas: List[Reserva] = []
+
+        for evento in eventos:
+            reserva = por_uid.get(evento['uid']) or por_codigo.get(evento['codigo'])
+            if reserva is None:
+                candidatas = [
+                    r for r in por_datas.get((evento['data_entrada'], evento['data_saida']), [])
+                    if r.pk not in vistas and not r.uid_ical
+                ]
+                reserva = candidatas[0] if candidatas else None
+
+            if reserva is None:
+                novas.append(evento)
+                continue
+
+            vistas.add(reserva.pk)
+            mudou = False
+            for campo in ('data_entrada', 'data_saida', 'uid_ical'):
+                valor = evento['uid'] if campo == 'uid_ical' else evento[campo]
+                if getattr(reserva, campo) != valor:
+                    setattr(reserva, campo, valor)
+                    mudou = True
+            if self.propriedade and reserva.propriedade_id is None:
+                reserva.propriedade = self.propriedade
+                mudou = True
+            if mudou:
+                reserva.noites = (reserva.data_saida - reserva.data_entrada).days
+                reserva.updated_at = agora
+                alteradas.append(reserva)
+            else:
+                self.ignoradas += 1
+
+        if alteradas:
+            Reserva.objects.bulk_update(
+                alteradas, ['data_entrada', 'data_saida', 'noites', 'uid_ical', 'propriedade', 'updated_at']
+            )
+            reservas_gravadas_em_lote.send(sender=Reserva, reservas=alteradas)
+            registrar_operacao_em_lote(alteradas)
+            self.atualizadas = len(alteradas)
+
+        if novas:
+            self._inserir(novas)
+
+        if self.cancelar_ausentes:
+            self._cancelar_ausentes(existentes, vistas, agora)
+
+    def _inserir(self, eventos: List[Dict]) -> None:
+        # O iCal do Airbnb não traz o nome do hóspede: cria um cadastro provisório
+        pessoas = Pessoa.objects.bulk_create([
+            Pessoa(nome=f"Hóspede Airbnb {evento['codigo'] or evento['uid'][:12]}")
+            for evento in eventos
+        ])
+        hoje = timezone.localdate()
+        reservas = Reserva.objects.bulk_create([
+            Reserva(
+                hospede_principal=pessoa,
+                plataforma=self.plataforma,
+                propriedade=self.propriedade,
+                codigo_confirmacao=evento['codigo'],
+                uid_ical=evento['uid'],
+                data_reserva=min(hoje, evento['data_entrada']),
+                data_entrada=evento['data_entrada'],
+                data_saida=evento['data_saida'],
+                noites=(evento['data_saida'] - evento['data_entrada']).days,
+                valor_bruto=Money(0, 'BRL'),
+                ganhos_brutos=Money(0, 'BRL'),
+                status='CONFIRMADA',
+            )
+            for pessoa, evento in zip(pessoas, eventos)
+        ])
+        reservas_gravadas_em_lote.send(sender=Reserva, reservas=reservas)
+        registrar_operacao_em_lote(pessoas, acao='CRIACAO')
+        registrar_operacao_em_lote(reservas, acao='CRIACAO')
+        self.criadas = len(reservas)
+
+    def _cancelar_ausentes(self, existentes: List[Reserva], vistas: set, agora) -> None:
+        """Cancela reservas futuras do anúncio, vindas deste calendário, que sumiram dele."""
+        hoje = timezone.localdate()
+        ausentes = [
+            r for r in existentes
+            if r.pk not in vistas and r.data_entrada >= hoje and r.status in ('PENDENTE', 'CONFIRMADA')
+            and r.uid_ical and r.propriedade_id == self.propriedade.pk
+        ]
+        if not ausentes:
+            return
+        for reserva in ausentes:
+            reserva.status = 'CANCELADA'
+        Reserva.objects.filter(pk__in=[r.pk for r in ausentes]).update(status='CANCELADA', updated_at=agora)
+        reservas_gravadas_em_lote.send(sender=Reserva, reservas=ausentes)
+        registrar_operacao_em_lote(ausentes)
+        self.canceladas = len(ausentes)
+
+    def get_result(self) -> Dict:
+        """Retorna o resultado da sincronização, no mesmo formato do importador de CSV."""
+        return {
+            'success': len(self.erros) == 0,
+            'imported': self.criadas + self.atualizadas + self.canceladas,
+            'created': self.criadas,
+            'updated': self.atualizadas,
+            'cancelled': self.canceladas,
+            'skipped': self.ignoradas,
+            'duplicate_file': False,
+            'errors': self.erros,
+        }
@@ -0,0 +1,9 @@
+"""Signals próprios do app de hóspedes."""
+
+from django.dispatch import Signal
+
+# Enviado pelas gravações em lote de Reserva (bulk_create, bulk_update e
+# UPDATE), que não disparam post_save. Argumento: `reservas`, as instâncias já
+# gravadas. Envie antes de registrar_operacao_em_lote, enquanto o snapshot do
+# log de alterações ainda tem os valores anteriores (ex.: hóspede anterior).
+reservas_gravadas_em_lote = Signal()
@@ -0,0 +1,22 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from ..assets import caminho_bundle, fontes_para_dev, usar_bundles
+
+register = template.Library()
+
+
+def _urls(nome):
+    return [static(caminho_bundle(nome))] if usar_bundles() else fontes_para_dev(nome)
+
+
+@register.simple_tag
+def bundle_css(nome):
+    """{% bundle_css 'hospedes.css' %}: o bundle com hash ou, em desenvolvimento, as fontes."""
+    return format_html_join('\n', '<link rel="stylesheet" href="{}">', ((url,) for url in _urls(nome)))
+
+
+@register.simple_tag
+def bundle_js(nome):
+    return format_html_join('\n', '<script src="{}"></script>', ((url,) for url in _urls(nome)))
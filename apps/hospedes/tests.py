@@ -1,3 +1,1517 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
+import csv
+from concurrent.futures import ProcessPoolExecutor
+import io
+import json
+import os
+import runpy
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+import django
+from asgiref.sync import async_to_sync
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.contrib.sessions.models import Session
+from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from djmoney.money import Money
+
+from . import analitico, assets, documentos, ical, operacoes, perfil, replica, services, views
+from .auditoria import lote_auditoria
+from .arquivo import arquivar_reservas
+from .models import (
+    Blob, DocumentoReserva, DocumentoReservaArquivado, HistogramaReservas, ImportacaoArquivo, Pessoa, PessoaReserva,
+    PessoaReservaArquivada, PessoaStats, Plataforma, Propriedade, QuadroOperacoes, RegistroAlteracao, Reserva,
+    ReservaArquivada, ReservaHistorica, centavos_para_decimal,
+)
+from .services import (
+    PLATFORM_PARSERS, AirbnbCSVImporter, AirbnbCSVParser, AirbnbICalImporter, BookingCSVParser, ColumnParser,
+    PlatformCSVParser, ReservationImporter, file_fingerprint, get_platform_parser, register_platform,
+)
+from .relatorios import relatorio_ritmo
+from .transicoes import TransicaoEmLote, executar_transicao, reconciliar_status
+
+
+def criar_reserva(**kwargs):
+    """Reserva mínima do Airbnb; `entrada` é o deslocamento em dias a partir de hoje."""
+    entrada = timezone.localdate() + timedelta(days=kwargs.pop('entrada', 10))
+    noites = kwargs.pop('noites', 3)
+    dados = {
+        'hospede_principal': Pessoa.objects.create(nome='Hóspede Teste'),
+        'plataforma': Plataforma.objects.get_or_create(nome='Airbnb')[0],
+        'data_reserva': entrada - timedelta(days=30),
+        'data_entrada': entrada,
+        'data_saida': entrada + timedelta(days=noites),
+        'noites': noites,
+        'valor_bruto': Money(300, 'BRL'),
+        'ganhos_brutos': Money(270, 'BRL'),
+        'status': 'CONFIRMADA',
+    }
+    dados.update(kwargs)
+    return Reserva.objects.create(**dados)
+
+
+def calendario(*eventos):
+    """Conteúdo .ics com um VEVENT por (uid, reserva ou (entrada, saída), código)."""
+    linhas = ['BEGIN:VCALENDAR', 'VERSION:2.0']
+    for uid, datas, codigo in eventos:
+        entrada, saida = (datas.data_entrada, datas.data_saida) if isinstance(datas, Reserva) else datas
+        linhas += [
+            'BEGIN:VEVENT',
+            f'DTSTART;VALUE=DATE:{entrada:%Y%m%d}',
+            f'DTEND;VALUE=DATE:{saida:%Y%m%d}',
+            f'UID:{uid}',
+            'SUMMARY:Reserved',
+        ]
+        if codigo:
+            linhas.append(f'DESCRIPTION:Reservation URL: https://www.airbnb.com/hosting/reservations/details/{codigo}')
+        linhas.append('END:VEVENT')
+    linhas.append('END:VCALENDAR')
+    return '\r\n'.join(linhas) + '\r\n'
+
+
+def escrever_csv(caminho, *linhas):
+    """CSV do Airbnb com uma linha por dicionário {campo canônico: valor}."""
+    colunas = AirbnbCSVParser.colunas
+    with open(caminho, 'w', encoding='utf-8', newline='') as arquivo:
+        writer = csv.DictWriter(arquivo, fieldnames=list(colunas.values()))
+        writer.writeheader()
+        for linha in linhas:
+            dados = {
+                'status': 'Confirmada', 'nome': 'Maria Silva', 'telefone': '', 'num_adultos': '2',
+                'num_criancas': '0', 'num_bebes': '0', 'data_entrada': '10/01/2030', 'data_saida': '13/01/2030',
+                'noites': '3', 'data_reserva': '01/12/2029', 'anuncio': 'Casa', 'valor': 'R$ 900,00',
+                **linha,
+            }
+            writer.writerow({colunas[campo]: valor for campo, valor in dados.items()})
+    return caminho
+
+
+class ColumnParserTests(SimpleTestCase):
+    def test_formato_de_data_detectado_no_primeiro_valor_preenchido(self):
+        parser = ColumnParser()
+        datas = parser.parse_dates(['', ' 02/03/2030 ', '2030-03-04', '31/02/2030', 'amanhã', None])
+
+        self.assertEqual(parser.date_format, '%d/%m/%Y')
+        # Os demais formatos continuam valendo para arquivos mistos
+        self.assertEqual(datas, [None, date(2030, 3, 2), date(2030, 3, 4), None, None, None])
+        self.assertEqual(ColumnParser().detect_date_format(['', '2030-03-02']), '%Y-%m-%d')
+        self.assertIsNone(ColumnParser().detect_date_format(['', 'sem data']))
+
+    def test_valores_em_reais(self):
+        parser = ColumnParser()
+        self.assertEqual(
+            parser.parse_decimals(['R$ 1.234,56', 'R$\xa0900,00', '75', 'R$ 1.234,56', 'grátis', '']),
+            [Decimal('1234.56'), Decimal('900.00'), Decimal('75'), Decimal('1234.56'), None, None],
+        )
+
+    def test_valores_do_booking(self):
+        parser = BookingCSVParser().columns
+        self.assertEqual(parser.parse_decimals(['1234.50 BRL', '1,234.50 BRL']), [Decimal('1234.50')] * 2)
+        self.assertEqual(parser.parse_dates(['2030-01-10 09:30:00']), [date(2030, 1, 10)])
+
+    def test_inteiros_e_telefones(self):
+        parser = ColumnParser()
+        self.assertEqual(parser.parse_ints(['2', '', None, 'dois'], default=1), [2, 1, 1, None])
+        self.assertEqual(parser.parse_phones(['+55 (11) 98765-4321', '', None]), ['+5511987654321', '', ''])
+
+
+class RegistroPlataformasTests(SimpleTestCase):
+    def test_despacho_por_plataforma(self):
+        esperados = (('airbnb', AirbnbCSVParser, 'Airbnb'), ('booking', BookingCSVParser, 'Booking.com'))
+        for key, classe, plataforma in esperados:
+            with self.subTest(key=key):
+                parser = get_platform_parser(key)
+                self.assertIs(type(parser), classe)
+                self.assertEqual((parser.key, parser.plataforma), (key, plataforma))
+        # Cada chamada devolve um parser novo: o formato de data detectado não vaza entre arquivos
+        self.assertIsNot(get_platform_parser('airbnb').columns, get_platform_parser('airbnb').columns)
+
+    def test_plataforma_registrada(self):
+        with mock.patch.dict(PLATFORM_PARSERS):
+            @register_platform
+            class VrboCSVParser(PlatformCSVParser):
+                key = 'vrbo'
+                plataforma = 'Vrbo'
+                colunas = {'codigo': 'Reservation ID', 'nome': 'Guest', 'data_entrada': 'Arrival',
+                           'data_saida': 'Departure', 'data_reserva': 'Booked', 'valor': 'Total'}
+
+            parser = get_platform_parser('vrbo')
+            registro, = parser.parse_rows([{
+                'Reservation ID': 'HA-1', 'Guest': 'Ana', 'Arrival': '2030-05-01', 'Departure': '2030-05-03',
+                'Booked': '2030-04-01', 'Total': '500',
+            }])
+
+        self.assertIsInstance(parser, VrboCSVParser)
+        self.assertEqual((registro['codigo'], registro['data_entrada'], registro['status']),
+                         ('HA-1', date(2030, 5, 1), 'PENDENTE'))
+        with self.assertRaisesMessage(ValueError, 'Opções: airbnb, booking'):
+            get_platform_parser('vrbo')
+
+
+class ImportacaoCSVTests(TestCase):
+    def setUp(self):
+        diretorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, diretorio, ignore_errors=True)
+        self.caminho = lambda nome: os.path.join(diretorio, nome)
+
+    def test_linhas_inalteradas_sao_puladas_pelo_hash(self):
+        AirbnbCSVImporter().import_csv(escrever_csv(
+            self.caminho('jan.csv'), {'codigo': 'HMA'}, {'codigo': 'HMB', 'nome': 'João Souza'},
+        ))
+        gravada = Reserva.objects.get(codigo_confirmacao='HMA').updated_at
+
+        # Nova exportação (outro arquivo): só a linha alterada é gravada
+        resultado = AirbnbCSVImporter().import_csv(escrever_csv(
+            self.caminho('fev.csv'), {'codigo': 'HMA'}, {'codigo': 'HMB', 'nome': 'João Souza', 'valor': 'R$ 1.200,00'},
+        ))
+
+        self.assertEqual((resultado['created'], resultado['updated'], resultado['skipped']), (0, 1, 1))
+        self.assertEqual(Reserva.objects.get(codigo_confirmacao='HMA').updated_at, gravada)
+        self.assertEqual(str(Reserva.objects.get(codigo_confirmacao='HMB').valor_bruto.amount), '1200.00')
+
+    def test_importacao_interrompida_continua_do_ultimo_lote(self):
+        caminho = escrever_csv(self.caminho('grande.csv'), *({'codigo': f'HM{i}'} for i in range(5)))
+        with mock.patch.object(AirbnbCSVImporter, 'BATCH_SIZE', 2):
+            process_batch = AirbnbCSVImporter.process_batch
+            lotes = []
+
+            def interromper_no_terceiro_lote(importer, rows, importacao):
+                lotes.append(len(rows))
+                if len(lotes) == 3:
+                    raise RuntimeError('worker reiniciado')
+                return process_batch(importer, rows, importacao)
+
+            with mock.patch.object(AirbnbCSVImporter, 'process_batch', interromper_no_terceiro_lote):
+                resultado = AirbnbCSVImporter().import_csv(caminho)
+            importacao = ImportacaoArquivo.objects.get()
+            self.assertFalse(resultado['success'])
+            self.assertEqual((importacao.status, importacao.linhas_processadas), ('EM_ANDAMENTO', 4))
+
+            resultado = AirbnbCSVImporter().import_csv(caminho)
+
+        importacao.refresh_from_db()
+        self.assertEqual(resultado['created'], 1)
+        self.assertEqual((importacao.status, importacao.linhas_processadas, importacao.criadas), ('CONCLUIDA', 5, 5))
+        self.assertEqual(Reserva.objects.count(), 5)
+
+    def test_falha_de_gravacao_isola_so_a_linha(self):
+        caminho = escrever_csv(
+            self.caminho('lote.csv'),
+            {'codigo': 'HMA', 'nome': 'Ana'}, {'codigo': 'HMFALHA', 'nome': 'Bia'}, {'codigo': 'HMC', 'nome': 'Caio'},
+        )
+        gravar = AirbnbCSVImporter._gravar
+
+        def gravar_com_falha(importer, registros):
+            if any(registro['codigo'] == 'HMFALHA' for registro in registros):
+                raise ValueError('falha simulada')
+            return gravar(importer, registros)
+
+        with mock.patch.object(AirbnbCSVImporter, '_gravar', gravar_com_falha):
+            resultado = AirbnbCSVImporter().import_csv(caminho)
+
+        self.assertEqual(resultado['created'], 2)
+        self.assertEqual(resultado['errors'], ['Erro ao processar reserva HMFALHA: falha simulada'])
+        self.assertEqual(
+            sorted(Reserva.objects.values_list('codigo_confirmacao', flat=True)), ['HMA', 'HMC']
+        )
+
+    def test_parser_do_booking(self):
+        caminho = self.caminho('booking.csv')
+        with open(caminho, 'w', encoding='utf-8', newline='') as arquivo:
+            arquivo.write(
+                'Book number,Guest name(s),Check-in,Check-out,Booked on,Status,Adults,Children,'
+                'Duration (nights),Price,Property name\n'
+                '4455667788,Ana Lima,2030-03-01,2030-03-04,2030-01-10 09:30:00,ok,2,1,3,1234.50 BRL,Casa\n'
+                '4455667799,Bruno Reis,2030-04-01,2030-04-02,2030-01-11,cancelled_by_guest,1,0,1,200 BRL,Casa\n'
+            )
+
+        resultado = ReservationImporter(platform='booking').import_csv(caminho)
+
+        self.assertTrue(resultado['success'], resultado['errors'])
+        confirmada = Reserva.objects.get(codigo_confirmacao='4455667788')
+        self.assertEqual(confirmada.plataforma.nome, 'Booking.com')
+        self.assertEqual(str(confirmada.valor_bruto.amount), '1234.50')
+        self.assertEqual((confirmada.num_criancas, confirmada.propriedade.nome), (1, 'Casa'))
+        self.assertEqual(Reserva.objects.get(codigo_confirmacao='4455667799').status, 'CANCELADA')
+
+    def test_plataforma_desconhecida(self):
+        with self.assertRaisesMessage(ValueError, 'Plataforma desconhecida: vrbo'):
+            get_platform_parser('vrbo')
+
+    def test_import_files_pula_reservas_arquivadas(self):
+        reserva = criar_reserva(codigo_confirmacao='HMARQUIVO', status='FINALIZADA', entrada=-1000)
+        arquivar_reservas()
+        self.assertTrue(ReservaArquivada.objects.filter(pk=reserva.pk).exists())
+
+        arquivos = [
+            escrever_csv(self.caminho('a.csv'), {'codigo': 'HMARQUIVO', 'status': 'Hóspede anterior'}),
+            escrever_csv(self.caminho('b.csv'), {'codigo': 'HMNOVA'}),
+        ]
+        resultado = AirbnbCSVImporter().import_files(arquivos, workers=1)
+
+        self.assertTrue(resultado['success'], resultado['errors'])
+        self.assertEqual((resultado['created'], resultado['skipped']), (1, 1))
+        self.assertEqual(list(Reserva.objects.values_list('codigo_confirmacao', flat=True)), ['HMNOVA'])
+
+
+    def test_arquivo_com_erros_fica_parcial_e_pode_ser_reimportado(self):
+        caminho = escrever_csv(
+            self.caminho('parcial.csv'),
+            {'codigo': 'HMVALIDA'},
+            {'codigo': 'HMDATA', 'data_entrada': '99/99/2030'},
+        )
+
+        resultado = AirbnbCSVImporter().import_csv(caminho)
+        importacao = ImportacaoArquivo.objects.get()
+        self.assertEqual(resultado['created'], 1)
+        self.assertEqual((importacao.status, importacao.erros, importacao.criadas), ('PARCIAL', 1, 1))
+
+        # Reimportar não é barrado como repetido: reprocessa do início e pula o que já foi gravado
+        resultado = AirbnbCSVImporter().import_csv(caminho)
+        importacao.refresh_from_db()
+        self.assertFalse(resultado['duplicate_file'])
+        self.assertEqual((resultado['created'], resultado['skipped']), (0, 1))
+        self.assertEqual((importacao.status, importacao.linhas_processadas, importacao.ignoradas), ('PARCIAL', 2, 1))
+
+    def test_arquivo_sem_erros_nao_e_reprocessado(self):
+        caminho = escrever_csv(self.caminho('ok.csv'), {'codigo': 'HMVALIDA'})
+
+        AirbnbCSVImporter().import_csv(caminho)
+        resultado = AirbnbCSVImporter().import_csv(caminho)
+
+        self.assertTrue(resultado['duplicate_file'])
+        self.assertEqual(ImportacaoArquivo.objects.get().status, 'CONCLUIDA')
+
+    def test_fingerprint_inclui_a_plataforma(self):
+        caminho = escrever_csv(self.caminho('ok.csv'), {'codigo': 'HMVALIDA'})
+        self.assertNotEqual(file_fingerprint(caminho, 'airbnb'), file_fingerprint(caminho, 'booking'))
+
+    def test_import_files_marca_parcial_so_o_arquivo_com_falha(self):
+        arquivos = [
+            escrever_csv(self.caminho('a.csv'), {'codigo': 'HMA'}),
+            escrever_csv(self.caminho('b.csv'), {'codigo': 'HMB'}, {'codigo': 'HMFALHA'}),
+        ]
+        gravar = AirbnbCSVImporter._gravar
+
+        def gravar_com_falha(importer, registros):
+            if any(registro['codigo'] == 'HMFALHA' for registro in registros):
+                raise ValueError('falha simulada')
+            return gravar(importer, registros)
+
+        with mock.patch.object(AirbnbCSVImporter, '_gravar', gravar_com_falha):
+            resultado = AirbnbCSVImporter().import_files(arquivos, workers=1)
+
+        self.assertEqual(resultado['created'], 2)
+        status = dict(ImportacaoArquivo.objects.values_list('nome_arquivo', 'status'))
+        self.assertEqual(status, {'a.csv': 'CONCLUIDA', 'b.csv': 'PARCIAL'})
+        self.assertEqual(ImportacaoArquivo.objects.get(nome_arquivo='b.csv').erros, 1)
+
+
+    def test_import_files_em_paralelo_prevalece_o_arquivo_mais_recente(self):
+        arquivos = [
+            escrever_csv(self.caminho('marco.csv'), {'codigo': 'HMA', 'valor': 'R$ 500,00'}, {'codigo': 'HMB'}),
+            escrever_csv(self.caminho('janeiro.csv'), {'codigo': 'HMA', 'valor': 'R$ 300,00'}, {'codigo': 'HMC'}),
+            escrever_csv(self.caminho('fevereiro.csv'), {'codigo': 'HMA', 'valor': 'R$ 400,00'}, {'codigo': 'HMD'}),
+        ]
+        for dia, caminho in ((3, arquivos[0]), (1, arquivos[1]), (2, arquivos[2])):
+            os.utime(caminho, (1_700_000_000 + dia * 86400,) * 2)
+
+        with mock.patch.object(services, 'ProcessPoolExecutor', wraps=ProcessPoolExecutor) as pool:
+            resultado = AirbnbCSVImporter().import_files(arquivos, workers=2)
+
+        pool.assert_called_once_with(max_workers=2, initializer=django.setup)
+        self.assertTrue(resultado['success'], resultado['errors'])
+        self.assertEqual((resultado['created'], resultado['conflicts']), (4, 2))
+        self.assertEqual(str(Reserva.objects.get(codigo_confirmacao='HMA').valor_bruto.amount), '500.00')
+        self.assertEqual(
+            sorted(ImportacaoArquivo.objects.values_list('nome_arquivo', 'status', 'linhas_processadas')),
+            [('fevereiro.csv', 'CONCLUIDA', 2), ('janeiro.csv', 'CONCLUIDA', 2), ('marco.csv', 'CONCLUIDA', 2)],
+        )
+
+    def test_import_files_pula_arquivo_ja_importado(self):
+        importado = escrever_csv(self.caminho('importado.csv'), {'codigo': 'HMA'})
+        AirbnbCSVImporter().import_csv(importado)
+
+        resultado = AirbnbCSVImporter().import_files([importado, importado], workers=2)
+        self.assertTrue(resultado['duplicate_file'])
+        self.assertEqual(resultado['imported'], 0)
+
+        novo = escrever_csv(self.caminho('novo.csv'), {'codigo': 'HMA'}, {'codigo': 'HMB'})
+        importer = AirbnbCSVImporter()
+        resultado = importer.import_files([importado, novo], workers=2)
+        self.assertFalse(resultado['duplicate_file'])
+        self.assertEqual((importer.arquivos_repetidos, resultado['created'], resultado['skipped']), (1, 1, 1))
+        self.assertEqual(ImportacaoArquivo.objects.count(), 2)
+
+    def test_import_files_conclui_importacao_interrompida(self):
+        caminho = escrever_csv(self.caminho('grande.csv'), *({'codigo': f'HM{i}'} for i in range(5)))
+        with mock.patch.object(AirbnbCSVImporter, 'BATCH_SIZE', 2):
+            process_batch = AirbnbCSVImporter.process_batch
+
+            def interromper_no_terceiro_lote(importer, rows, importacao):
+                if ImportacaoArquivo.objects.get(pk=importacao.pk).linhas_processadas == 4:
+                    raise RuntimeError('worker reiniciado')
+                return process_batch(importer, rows, importacao)
+
+            with mock.patch.object(AirbnbCSVImporter, 'process_batch', interromper_no_terceiro_lote):
+                AirbnbCSVImporter().import_csv(caminho)
+        importacao = ImportacaoArquivo.objects.get()
+        self.assertEqual((importacao.status, importacao.linhas_processadas), ('EM_ANDAMENTO', 4))
+
+        outro = escrever_csv(self.caminho('outro.csv'), {'codigo': 'HMOUTRO'})
+        resultado = AirbnbCSVImporter().import_files([caminho, outro], workers=2)
+
+        # As linhas dos lotes já confirmados são puladas pelo hash
+        self.assertEqual((resultado['created'], resultado['skipped']), (2, 4))
+        importacao.refresh_from_db()
+        self.assertEqual((importacao.status, importacao.linhas_processadas, importacao.criadas, importacao.ignoradas),
+                         ('CONCLUIDA', 5, 1, 4))
+        self.assertEqual(Reserva.objects.count(), 6)
+
+    def test_fallback_descarta_o_log_da_tentativa_revertida(self):
+        caminho = escrever_csv(
+            self.caminho('falha.csv'),
+            {'codigo': 'HMA', 'nome': 'Ana'}, {'codigo': 'HMFALHA', 'nome': 'Bia'},
+        )
+        gravar = AirbnbCSVImporter._gravar
+
+        def gravar_com_falha(importer, registros):
+            # Enfileira o log do lote inteiro antes de falhar
+            gravar(importer, registros)
+            if any(registro['codigo'] == 'HMFALHA' for registro in registros):
+                raise ValueError('falha simulada')
+
+        with mock.patch.object(AirbnbCSVImporter, '_gravar', gravar_com_falha):
+            resultado = AirbnbCSVImporter().import_csv(caminho)
+
+        self.assertEqual(resultado['created'], 1)
+        reserva = Reserva.objects.get()
+        self.assertEqual(
+            sorted(RegistroAlteracao.objects.values_list('modelo', 'objeto_id')),
+            [('pessoa', reserva.hospede_principal_id), ('reserva', reserva.pk)],
+        )
+
+
+class AirbnbICalImporterTests(TestCase):
+    def setUp(self):
+        self.casa = Propriedade.objects.create(nome='Casa')
+        self.chale = Propriedade.objects.create(nome='Chalé')
+
+    def sync(self, conteudo, **kwargs):
+        return AirbnbICalImporter(**kwargs).sync(SimpleUploadedFile('calendario.ics', conteudo.encode('utf-8')))
+
+    def test_diff_cria_atualiza_e_ignora(self):
+        por_codigo = criar_reserva(codigo_confirmacao='HMCODIGO1', entrada=5)
+        por_uid = criar_reserva(uid_ical='uid-2', propriedade=self.casa, entrada=20)
+        hoje = timezone.localdate()
+        nova = (hoje + timedelta(days=40), hoje + timedelta(days=42))
+        resultado = self.sync(calendario(
+            ('uid-1', por_codigo, 'HMCODIGO1'),
+            ('uid-2', (por_uid.data_entrada, por_uid.data_saida + timedelta(days=1)), None),
+            ('uid-3', nova, 'HMNOVA'),
+        ), propriedade=self.casa)
+
+        self.assertTrue(resultado['success'], resultado['errors'])
+        self.assertEqual((resultado['created'], resultado['updated'], resultado['skipped']), (1, 2, 0))
+        por_codigo.refresh_from_db()
+        por_uid.refresh_from_db()
+        self.assertEqual((por_codigo.uid_ical, por_codigo.propriedade), ('uid-1', self.casa))
+        self.assertEqual(por_uid.noites, 4)
+        criada = Reserva.objects.get(uid_ical='uid-3')
+        self.assertEqual((criada.codigo_confirmacao, criada.propriedade, criada.data_entrada), ('HMNOVA', self.casa, nova[0]))
+
+        # Segunda sincronização do mesmo calendário: nada muda
+        resultado = self.sync(calendario(
+            ('uid-1', por_codigo, 'HMCODIGO1'), ('uid-2', por_uid, None), ('uid-3', nova, 'HMNOVA'),
+        ), propriedade=self.casa)
+        self.assertEqual((resultado['imported'], resultado['skipped']), (0, 3))
+
+    def test_cancela_so_reservas_do_anuncio_vindas_do_calendario(self):
+        ausente = criar_reserva(uid_ical='uid-casa', propriedade=self.casa)
+        manual = criar_reserva(propriedade=self.casa, entrada=12)
+        outro_anuncio = criar_reserva(uid_ical='uid-chale', propriedade=self.chale, entrada=14)
+        sem_anuncio = criar_reserva(uid_ical='uid-solto', entrada=16)
+        passada = criar_reserva(uid_ical='uid-passada', propriedade=self.casa, entrada=-10)
+
+        resultado = self.sync(calendario(), propriedade=self.casa, cancelar_ausentes=True)
+
+        self.assertEqual(resultado['cancelled'], 1)
+        status = dict(Reserva.objects.values_list('pk', 'status'))
+        self.assertEqual(status[ausente.pk], 'CANCELADA')
+        for reserva in (manual, outro_anuncio, sem_anuncio, passada):
+            self.assertEqual(status[reserva.pk], 'CONFIRMADA')
+
+    def test_sem_anuncio_nao_cancela(self):
+        reserva = criar_reserva(uid_ical='uid-casa', propriedade=self.casa)
+
+        resultado = self.sync(calendario(), cancelar_ausentes=True)
+
+        self.assertEqual(resultado['cancelled'], 0)
+        reserva.refresh_from_db()
+        self.assertEqual(reserva.status, 'CONFIRMADA')
+
+
+class ImportarUploadTests(TestCase):
+    def setUp(self):
+        self.url = reverse('hospedes:importar_csv')
+        self.casa = Propriedade.objects.create(nome='Casa')
+        self.reserva = criar_reserva(uid_ical='uid-casa', propriedade=self.casa)
+
+    def upload(self, **dados):
+        arquivo = SimpleUploadedFile('calendario.ics', calendario().encode('utf-8'), content_type='text/calendar')
+        return self.client.post(self.url, {'csv_file': arquivo, **dados})
+
+    def test_exige_login(self):
+        response = self.upload(propriedade=self.casa.pk, cancelar_ausentes='on')
+
+        self.assertEqual(response.status_code, 302)
+        self.reserva.refresh_from_db()
+        self.assertEqual(self.reserva.status, 'CONFIRMADA')
+
+    def test_upload_nao_cancela_por_padrao(self):
+        self.client.force_login(User.objects.create_user('operador'))
+
+        response = self.upload(propriedade=self.casa.pk)
+
+        self.assertTrue(response.json()['success'])
+        self.reserva.refresh_from_db()
+        self.assertEqual(self.reserva.status, 'CONFIRMADA')
+
+    def test_cancelar_exige_anuncio(self):
+        self.client.force_login(User.objects.create_user('operador'))
+
+        response = self.upload(cancelar_ausentes='on')
+        self.assertFalse(response.json()['success'])
+
+        response = self.upload(propriedade=self.casa.pk, cancelar_ausentes='on')
+        self.assertTrue(response.json()['success'])
+        self.reserva.refresh_from_db()
+        self.assertEqual(self.reserva.status, 'CANCELADA')
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('operador'))
+
+    def test_totais_restritos_ao_anuncio(self):
+        casa = Propriedade.objects.create(nome='Casa')
+        chale = Propriedade.objects.create(nome='Chalé')
+        criar_reserva(codigo_confirmacao='HMCASA1', propriedade=casa, entrada=5)
+        criar_reserva(codigo_confirmacao='HMCASA2', propriedade=casa, entrada=0, valor_bruto=Money(200, 'BRL'))
+        criar_reserva(codigo_confirmacao='HMCASA3', propriedade=casa, entrada=-10, status='FINALIZADA')
+        criar_reserva(codigo_confirmacao='HMCASA4', propriedade=casa, entrada=20, status='CANCELADA')
+        criar_reserva(codigo_confirmacao='HMCHALE1', propriedade=chale, entrada=3, valor_bruto=Money(1000, 'BRL'))
+        criar_reserva(codigo_confirmacao='HMCHALE2', propriedade=chale, entrada=-3, status='CHECKIN')
+        criar_reserva(codigo_confirmacao='HMSEMANUNCIO', entrada=0)
+
+        contexto = self.client.get(reverse('hospedes:dashboard'), {'propriedade': casa.pk}).context
+        self.assertEqual(contexto['propriedade'], casa)
+        totais = {chave: contexto[chave] for chave in (
+            'total_reservas', 'reservas_programadas', 'receitas_programadas', 'reservas_hoje', 'checkout_hoje',
+            'count_em_andamento', 'count_concluidas', 'count_canceladas',
+        )}
+        self.assertEqual(totais, {
+            'total_reservas': 4,
+            'reservas_programadas': 2,
+            'receitas_programadas': Decimal('500.00'),
+            'reservas_hoje': 1,
+            'checkout_hoje': 0,
+            'count_em_andamento': 1,
+            'count_concluidas': 1,
+            'count_canceladas': 1,
+        })
+        self.assertEqual({r.propriedade_id for r in contexto['reservas']}, {casa.pk})
+
+        contexto = self.client.get(reverse('hospedes:dashboard')).context
+        self.assertIsNone(contexto['propriedade'])
+        self.assertEqual((contexto['total_reservas'], contexto['reservas_hoje'], contexto['checkout_hoje']), (7, 2, 1))
+        self.assertEqual(contexto['receitas_programadas'], Decimal('1800.00'))
+
+
+class ReceitaCentavosTests(TestCase):
+    def test_soma_exata_em_centavos(self):
+        reservas = [
+            criar_reserva(codigo_confirmacao='HMCENT1', valor_bruto=Money('0.10', 'BRL'),
+                          taxa_servico=Money('0.20', 'BRL'), taxa_limpeza=Money('0.07', 'BRL'),
+                          impostos=Money('0.01', 'BRL')),
+            criar_reserva(codigo_confirmacao='HMCENT2', valor_bruto=Money('1234.56', 'BRL'),
+                          impostos=Money('99.99', 'BRL')),
+        ]
+        criar_reserva(codigo_confirmacao='HMCENT3', valor_bruto=Money('500', 'BRL'), status='CANCELADA')
+
+        validas = Reserva.objects.exclude(status='CANCELADA')
+        self.assertEqual(validas.receita_liquida_centavos(), 36 + 113457)
+        esperado = sum(
+            (r.valor_bruto + r.taxa_servico + r.taxa_limpeza - r.impostos).amount for r in reservas
+        )
+        self.assertEqual(centavos_para_decimal(validas.receita_liquida_centavos()), esperado)
+        self.assertEqual(Reserva.objects.none().receita_liquida_centavos(), 0)
+
+    def test_centavos_para_decimal(self):
+        self.assertEqual(str(centavos_para_decimal(123456)), '1234.56')
+        self.assertEqual(str(centavos_para_decimal(-5)), '-0.05')
+        self.assertEqual(str(centavos_para_decimal(None)), '0.00')
+
+
+class ViewsAssincronasTests(TestCase):
+    """Variantes ASGI (ASYNC_VIEWS), chamadas direto: as rotas são escolhidas no import das URLs."""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('operador')
+
+    def autenticar(self, request, usuario=None):
+        usuario = usuario or self.usuario
+
+        async def auser():
+            return usuario
+
+        request.user, request.auser = usuario, auser
+        return request
+
+    def test_dashboard_assincrono_tem_o_mesmo_contexto(self):
+        casa = Propriedade.objects.create(nome='Casa')
+        criar_reserva(codigo_confirmacao='HMASYNC1', propriedade=casa, entrada=5)
+        criar_reserva(codigo_confirmacao='HMASYNC2', propriedade=casa, entrada=0)
+        criar_reserva(codigo_confirmacao='HMASYNC3', entrada=-10, status='FINALIZADA')
+
+        for parametros in ({}, {'propriedade': casa.pk}, {'status': 'concluidas'}):
+            with self.subTest(parametros=parametros):
+                sincrono = views.DashboardView()
+                sincrono.setup(self.autenticar(RequestFactory().get('/', parametros)))
+                assincrono = views.AsyncDashboardView()
+                assincrono.setup(self.autenticar(AsyncRequestFactory().get('/', parametros)))
+
+                esperado = sincrono.get_dados_dashboard()
+                contexto = async_to_sync(assincrono.aget_context_data)()
+                self.assertIs(contexto.pop('view'), assincrono)
+                for chave in ('reservas', 'propriedades'):
+                    self.assertEqual([o.pk for o in contexto.pop(chave)], [o.pk for o in esperado.pop(chave)])
+                self.assertEqual(contexto, esperado)
+
+    def test_dashboard_assincrono_renderiza_e_exige_login(self):
+        criar_reserva(codigo_confirmacao='HMRENDER')
+        view = views.AsyncDashboardView.as_view()
+
+        response = async_to_sync(view)(self.autenticar(AsyncRequestFactory().get('/')))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Hóspede Teste')
+
+        response = async_to_sync(view)(self.autenticar(AsyncRequestFactory().get('/'), AnonymousUser()))
+        self.assertEqual(response.status_code, 302)
+
+    def test_importar_csv_assincrono(self):
+        diretorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, diretorio, ignore_errors=True)
+        caminho = escrever_csv(os.path.join(diretorio, 'async.csv'), {'codigo': 'HMASYNCCSV'})
+        with open(caminho, 'rb') as arquivo:
+            upload = SimpleUploadedFile('reservas-async.csv', arquivo.read(), content_type='text/csv')
+
+        request = self.autenticar(AsyncRequestFactory().post('/importar-csv/', {'csv_file': upload}))
+        response = async_to_sync(views.importar_csv_async)(request)
+
+        self.assertTrue(json.loads(response.content)['success'])
+        self.assertTrue(Reserva.objects.filter(codigo_confirmacao='HMASYNCCSV').exists())
+
+        request = self.autenticar(AsyncRequestFactory().post('/importar-csv/', {}), AnonymousUser())
+        self.assertEqual(async_to_sync(views.importar_csv_async)(request).status_code, 302)
+
+
+class AuditoriaTests(TestCase):
+    def test_estado_so_e_montado_ao_gravar(self):
+        criar_reserva(codigo_confirmacao='HMAUD1')
+        criar_reserva(codigo_confirmacao='HMAUD2')
+
+        reservas = list(Reserva.objects.order_by('pk'))
+        self.assertFalse(any('_estado_auditoria_salvo' in reserva.__dict__ for reserva in reservas))
+
+        reserva = reservas[0]
+        reserva.observacoes = 'Chega tarde'
+        reserva.valor_bruto = Money('350.00', 'BRL')
+        reserva.save()
+
+        registro = RegistroAlteracao.objects.filter(objeto_id=reserva.pk, acao='ALTERACAO').get()
+        self.assertEqual(registro.alteracoes, {
+            'observacoes': [None, 'Chega tarde'],
+            'valor_bruto': ['300.00', '350.00'],
+        })
+        self.assertNotIn('_estado_auditoria_salvo', reservas[1].__dict__)
+
+    def test_lote_com_erro_nao_grava_registros(self):
+        reserva = criar_reserva(codigo_confirmacao='HMAUDERRO')
+        antes = RegistroAlteracao.objects.count()
+
+        with self.assertRaises(ValueError), lote_auditoria(), transaction.atomic():
+            reserva.observacoes = 'Revertida'
+            reserva.save()
+            raise ValueError('falha no meio do lote')
+
+        self.assertEqual(RegistroAlteracao.objects.count(), antes)
+
+        reserva = Reserva.objects.get(pk=reserva.pk)
+        reserva.observacoes = 'Gravada'
+        with lote_auditoria():
+            reserva.save()
+        self.assertEqual(RegistroAlteracao.objects.count(), antes + 1)
+
+
+class FeedICalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_fragmentos_no_cache_compartilhado(self):
+        criar_reserva(codigo_confirmacao='HMFEED1')
+        criar_reserva(codigo_confirmacao='HMFEED2', entrada=20)
+
+        conteudo = ''.join(ical.iter_calendario())
+        self.assertEqual(conteudo.count('BEGIN:VEVENT'), 2)
+
+        # Os fragmentos ficam na tabela do cache, visível para os outros processos
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM hospedes_cache')
+            self.assertEqual(cursor.fetchone()[0], 2)
+        with mock.patch.object(ical, 'gerar_vevent', side_effect=AssertionError('fora do cache')):
+            self.assertEqual(''.join(ical.iter_calendario()), conteudo)
+
+    @override_settings(ICAL_FEED_TOKEN='segredo')
+    def test_feed_por_propriedade(self):
+        casa = Propriedade.objects.create(nome='Casa')
+        chale = Propriedade.objects.create(nome='Chalé')
+        criar_reserva(codigo_confirmacao='HMCASA', propriedade=casa)
+        criar_reserva(codigo_confirmacao='HMCHALE', propriedade=chale, entrada=20)
+        url = reverse('hospedes:calendario_ics', args=['segredo'])
+
+        geral = self.client.get(url)
+        conteudo = b''.join(geral.streaming_content).decode()
+        self.assertEqual(conteudo.count('BEGIN:VEVENT'), 2)
+
+        # O feed do anúncio reaproveita os fragmentos já montados pelo geral
+        with mock.patch.object(ical, 'gerar_vevent', side_effect=AssertionError('fora do cache')):
+            response = self.client.get(url, {'propriedade': casa.pk})
+            conteudo = b''.join(response.streaming_content).decode()
+        self.assertEqual(conteudo.count('BEGIN:VEVENT'), 1)
+        self.assertIn('HMCASA', conteudo)
+        self.assertIn('X-WR-CALNAME:Reservas - Casa', conteudo)
+        self.assertIn(f'reservas-{casa.pk}.ics', response['Content-Disposition'])
+
+        # Cada feed tem o seu ETag, mesmo com a mesma quantidade de reservas
+        etag_chale = self.client.get(url, {'propriedade': chale.pk})['ETag']
+        self.assertEqual(len({geral['ETag'], response['ETag'], etag_chale}), 3)
+        for propriedade, status in ((casa, 304), (chale, 200)):
+            with self.subTest(propriedade=propriedade.nome):
+                condicional = self.client.get(url, {'propriedade': propriedade.pk}, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(condicional.status_code, status)
+
+        for valor in ('999999', 'casa'):
+            with self.subTest(propriedade=valor):
+                self.assertEqual(self.client.get(url, {'propriedade': valor}).status_code, 404)
+
+
+class PerfilStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_stats_invalidadas_ao_gravar_reserva(self):
+        reserva = criar_reserva(codigo_confirmacao='HMPERFIL', noites=3)
+        pessoa_id = reserva.hospede_principal_id
+
+        self.assertEqual(perfil.stats_pessoas([pessoa_id])[pessoa_id]['noites'], 3)
+        with self.assertNumQueries(2):
+            # Geração e estatísticas lidas do cache compartilhado, sem recalcular
+            self.assertEqual(perfil.stats_pessoas([pessoa_id])[pessoa_id]['estadias'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reserva.data_saida += timedelta(days=2)
+            reserva.save()
+        self.assertEqual(perfil.stats_pessoas([pessoa_id])[pessoa_id]['noites'], 5)
+
+    def test_chave_muda_com_o_dia(self):
+        reserva = criar_reserva(codigo_confirmacao='HMPROXIMA', entrada=1)
+        pessoa_id = reserva.hospede_principal_id
+        self.assertEqual(perfil.stats_pessoas([pessoa_id])[pessoa_id]['proxima_visita'], reserva.data_entrada)
+
+        amanha = timezone.localdate() + timedelta(days=1)
+        with mock.patch.object(timezone, 'localdate', return_value=amanha):
+            stats = perfil.stats_pessoas([pessoa_id])[pessoa_id]
+        self.assertEqual((stats['proxima_visita'], stats['ultima_visita']), (None, reserva.data_entrada))
+
+
+class PessoaStatsTests(TestCase):
+    def tabela(self):
+        return {
+            linha.pk: tuple(getattr(linha, campo) for campo in perfil.CAMPOS_PESSOA_STATS)
+            for linha in PessoaStats.objects.all()
+        }
+
+    def assertIgualAoRecalculo(self):
+        esperado = {
+            linha.pessoa_id: tuple(getattr(linha, campo) for campo in perfil.CAMPOS_PESSOA_STATS)
+            for linha in perfil.calcular_pessoa_stats(Pessoa.objects.values_list('pk', flat=True))
+        }
+        self.assertEqual(self.tabela(), esperado)
+
+    def test_deltas_acompanham_o_recalculo(self):
+        primeira = criar_reserva(codigo_confirmacao='HMST1', entrada=-30)
+        hospede = primeira.hospede_principal
+        meio = criar_reserva(codigo_confirmacao='HMST2', entrada=-10, hospede_principal=hospede, noites=2)
+        ultima = criar_reserva(codigo_confirmacao='HMST3', entrada=20, hospede_principal=hospede)
+        outra = criar_reserva(codigo_confirmacao='HMST4', entrada=5, taxa_limpeza=Money('50.55', 'BRL'))
+        self.assertEqual(self.tabela()[hospede.pk][:3], (3, 8, 90000))
+        self.assertIgualAoRecalculo()
+
+        # Mudança que não mexe na primeira nem na última estadia: só o UPDATE com F(), sem agrupar reservas
+        with CaptureQueriesContext(connection) as consultas:
+            meio.valor_bruto = Money('420.00', 'BRL')
+            meio.data_saida += timedelta(days=1)
+            meio.save()
+        self.assertFalse(any(ReservaHistorica._meta.db_table in q['sql'] for q in consultas.captured_queries))
+        self.assertIgualAoRecalculo()
+
+        ultima.hospede_principal = outra.hospede_principal
+        ultima.save()
+        self.assertIgualAoRecalculo()
+
+        primeira.delete()
+        self.assertIgualAoRecalculo()
+
+        executar_transicao('cancelar', [meio.pk])
+        self.assertIgualAoRecalculo()
+        self.assertNotIn(hospede.pk, self.tabela())
+
+    def test_importacao_em_lote(self):
+        diretorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, diretorio, ignore_errors=True)
+        caminho = escrever_csv(
+            os.path.join(diretorio, 'stats.csv'),
+            {'codigo': 'HMLOTE1', 'nome': 'Ana Lote', 'data_entrada': '10/01/2030', 'data_saida': '12/01/2030',
+             'noites': '2'},
+            {'codigo': 'HMLOTE2', 'nome': 'Bruno Lote'},
+        )
+        AirbnbCSVImporter().import_csv(caminho)
+        self.assertEqual(len(self.tabela()), 2)
+        self.assertIgualAoRecalculo()
+
+        caminho = escrever_csv(
+            os.path.join(diretorio, 'stats-cancelada.csv'),
+            {'codigo': 'HMLOTE2', 'nome': 'Bruno Lote', 'status': 'Cancelada'},
+        )
+        AirbnbCSVImporter().import_csv(caminho)
+        self.assertEqual(len(self.tabela()), 1)
+        self.assertIgualAoRecalculo()
+
+    def test_reconstruir_corrige_divergencias(self):
+        reservas = [criar_reserva(codigo_confirmacao=f'HMREC{i}', entrada=i) for i in range(3)]
+        sem_reserva = Pessoa.objects.create(nome='Sem Reserva')
+        PessoaStats.objects.filter(pk=reservas[0].hospede_principal_id).update(estadias=99)
+        PessoaStats.objects.filter(pk=reservas[1].hospede_principal_id).delete()
+        PessoaStats.objects.create(pessoa=sem_reserva, estadias=1)
+
+        saida = io.StringIO()
+        call_command('reconstruir_pessoa_stats', dry_run=True, stdout=saida)
+        self.assertIn('1 criada(s), 1 corrigida(s), 1 removida(s)', saida.getvalue())
+        self.assertEqual(PessoaStats.objects.get(pk=reservas[0].hospede_principal_id).estadias, 99)
+
+        call_command('reconstruir_pessoa_stats', stdout=io.StringIO())
+        self.assertIgualAoRecalculo()
+        self.assertEqual(len(self.tabela()), 3)
+
+
+class QuadroOperacoesTests(TestCase):
+    def setUp(self):
+        self.hoje = timezone.localdate()
+        self.casa = Propriedade.objects.create(nome='Casa')
+
+    def quadro(self):
+        return QuadroOperacoes.objects.get(data=self.hoje).dados
+
+    def test_quadro_gravado_acompanha_as_reservas(self):
+        chegada = criar_reserva(codigo_confirmacao='HMCHEGA', entrada=0, propriedade=self.casa)
+        criar_reserva(codigo_confirmacao='HMSAI', entrada=-3, propriedade=self.casa)
+        operacoes.quadro_do_dia(self.hoje)
+
+        quadro = self.quadro()
+        self.assertEqual([item['codigo'] for item in quadro['chegadas']], ['HMCHEGA'])
+        self.assertEqual([item['codigo'] for item in quadro['saidas']], ['HMSAI'])
+        self.assertEqual((quadro['trocas'], quadro['checkins_feitos']), (1, 0))
+
+        executar_transicao('checkin', [chegada.pk])
+        self.assertEqual(self.quadro()['checkins_feitos'], 1)
+
+        chegada.refresh_from_db()
+        chegada.data_entrada += timedelta(days=1)
+        chegada.save()
+        self.assertEqual((self.quadro()['chegadas'], self.quadro()['trocas']), ([], 0))
+
+    def test_renomear_atualiza_os_nomes_no_quadro(self):
+        reserva = criar_reserva(codigo_confirmacao='HMNOME', entrada=0, propriedade=self.casa)
+        operacoes.quadro_do_dia(self.hoje)
+
+        pessoa = Pessoa.objects.get(pk=reserva.hospede_principal_id)
+        pessoa.nome = 'Hóspede Renomeado'
+        pessoa.save()
+        self.casa.nome = 'Casa da Praia'
+        self.casa.save()
+        plataforma = Plataforma.objects.get(pk=reserva.plataforma_id)
+        plataforma.nome = 'Airbnb Brasil'
+        plataforma.save()
+
+        item = self.quadro()['chegadas'][0]
+        self.assertEqual(
+            (item['hospede'], item['propriedade'], item['plataforma']),
+            ('Hóspede Renomeado', 'Casa da Praia', 'Airbnb Brasil'),
+        )
+
+        # Quem não aparece em nenhum quadro gravado não remonta nada
+        outra = Pessoa.objects.create(nome='Sem Reserva')
+        outra.nome = 'Ainda Sem Reserva'
+        with self.assertNumQueries(4):
+            # UPDATE, log de alterações e as duas leituras dos dias afetados
+            outra.save()
+
+
+class ReservaAPITests(TestCase):
+    def setUp(self):
+        self.url = reverse('hospedes:api_reservas')
+        self.client.force_login(User.objects.create_user('operador'))
+
+    def paginas(self, **parametros):
+        """Segue os links `proximo` e devolve os ids de cada página."""
+        paginas = []
+        response = self.client.get(self.url, parametros)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            dados = response.json()
+            paginas.append([linha['id'] for linha in dados['resultados']])
+            if not dados['proximo']:
+                return paginas
+            response = self.client.get(dados['proximo'])
+
+    def test_cursor_percorre_todas_as_reservas_sem_repetir(self):
+        # Entradas repetidas: o id desempata dentro do mesmo valor
+        reservas = [
+            criar_reserva(codigo_confirmacao=f'HMAPI{i}', entrada=entrada)
+            for i, entrada in enumerate([5, 3, 5, 1, 5, 3, 8])
+        ]
+        crescente = [r.pk for r in sorted(reservas, key=lambda r: (r.data_entrada, r.pk))]
+
+        paginas = self.paginas(ordem='data_entrada', limite=2)
+        self.assertEqual([len(pagina) for pagina in paginas], [2, 2, 2, 1])
+        self.assertEqual(sum(paginas, []), crescente)
+
+        decrescente = [r.pk for r in sorted(reservas, key=lambda r: (r.data_entrada, r.pk), reverse=True)]
+        self.assertEqual(sum(self.paginas(ordem='-data_entrada', limite=3), []), decrescente)
+
+    def test_proximo_mantem_filtros_e_campos(self):
+        confirmadas = [criar_reserva(codigo_confirmacao=f'HMCONF{i}', entrada=i) for i in range(3)]
+        criar_reserva(codigo_confirmacao='HMCANC', entrada=1, status='CANCELADA')
+
+        response = self.client.get(self.url, {'status': 'CONFIRMADA', 'fields': 'id,status', 'limite': 2})
+        dados = response.json()
+        self.assertEqual(dados['resultados'], [{'id': r.pk, 'status': 'CONFIRMADA'} for r in confirmadas[:2]])
+        self.assertIn('status=CONFIRMADA', dados['proximo'])
+
+        seguinte = self.client.get(dados['proximo']).json()
+        self.assertEqual(seguinte, {'resultados': [{'id': confirmadas[2].pk, 'status': 'CONFIRMADA'}], 'proximo': None})
+
+    def test_parametros_invalidos(self):
+        for parametros in ({'cursor': 'invalido'}, {'ordem': 'nome'}, {'limite': '0'}, {'fields': 'senha'}):
+            with self.subTest(parametros=parametros):
+                self.assertEqual(self.client.get(self.url, parametros).status_code, 400)
+
+
+class TransicaoReservasAPITests(TestCase):
+    def setUp(self):
+        self.url = reverse('hospedes:api_transicoes')
+        self.client.force_login(User.objects.create_user('operador'))
+
+    def post(self, corpo):
+        return self.client.post(self.url, corpo, content_type='application/json')
+
+    def test_checkin_em_lote_com_motivos_de_rejeicao(self):
+        hoje = criar_reserva(codigo_confirmacao='HMHOJE', entrada=0)
+        amanha = criar_reserva(codigo_confirmacao='HMAMANHA', entrada=1)
+        distante = criar_reserva(codigo_confirmacao='HMDISTANTE', entrada=10)
+        cancelada = criar_reserva(codigo_confirmacao='HMCANCELADA', entrada=0, status='CANCELADA')
+
+        response = self.post({
+            'transicao': 'checkin',
+            'ids': [hoje.pk, amanha.pk, distante.pk, cancelada.pk, hoje.pk, 999999],
+            'observacoes': 'Chaves entregues',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        dados = response.json()
+        self.assertEqual(dados['aplicadas'], [hoje.pk, amanha.pk])
+        self.assertEqual(dados['rejeitadas'], [
+            {'id': distante.pk, 'motivo': 'Não é possível realizar check-in com mais de 1 dia de antecedência.'},
+            {'id': cancelada.pk, 'motivo': 'Só é possível realizar check-in em reservas confirmadas.'},
+            {'id': 999999, 'motivo': 'Reserva não encontrada.'},
+        ])
+        hoje.refresh_from_db()
+        self.assertEqual((hoje.status, hoje.checkin_por.username, hoje.observacoes_checkin),
+                         ('CHECKIN', 'operador', 'Chaves entregues'))
+        # Log de alterações só das aplicadas, com o usuário da requisição
+        registros = RegistroAlteracao.objects.filter(modelo='reserva', acao='ALTERACAO')
+        self.assertEqual(sorted(registros.values_list('objeto_id', flat=True)), [hoje.pk, amanha.pk])
+        self.assertEqual(set(registros.values_list('usuario__username', flat=True)), {'operador'})
+
+    def test_checkout_cancelamento_e_finalizacao(self):
+        em_andamento = criar_reserva(codigo_confirmacao='HMANDAMENTO', entrada=-2, status='CHECKIN')
+        atrasada = criar_reserva(codigo_confirmacao='HMATRASADA', entrada=-5, noites=2, status='CHECKIN')
+        futura = criar_reserva(codigo_confirmacao='HMFUTURA', entrada=30)
+
+        resultado = executar_transicao('checkout', [em_andamento.pk, atrasada.pk, futura.pk])
+        self.assertEqual(resultado['rejeitadas'], [
+            {'id': futura.pk, 'motivo': 'Só é possível realizar check-out após o check-in.'},
+        ])
+        status = dict(Reserva.objects.values_list('pk', 'status'))
+        # Check-out depois da data de saída já fica finalizado
+        self.assertEqual((status[em_andamento.pk], status[atrasada.pk]), ('CHECKOUT', 'FINALIZADA'))
+
+        resultado = executar_transicao('cancelar', [em_andamento.pk, futura.pk])
+        self.assertEqual(resultado['aplicadas'], [futura.pk])
+        self.assertEqual(resultado['rejeitadas'][0]['motivo'], 'Não é possível cancelar uma reserva após o check-in.')
+
+        resultado = executar_transicao('finalizar', [em_andamento.pk, futura.pk])
+        self.assertEqual(resultado['aplicadas'], [em_andamento.pk])
+        self.assertEqual(resultado['rejeitadas'][0]['motivo'], 'Só é possível finalizar reservas com check-out realizado.')
+
+    def test_transicao_so_com_status_de_destino(self):
+        # A base já sabe aplicar o status e rejeitar quem já está nele
+        class ConfirmacaoEmLote(TransicaoEmLote):
+            key = 'confirmar'
+            status_destino = 'CONFIRMADA'
+
+        confirmada = criar_reserva(codigo_confirmacao='HMCONFIRMADA', entrada=5)
+        cancelada = criar_reserva(codigo_confirmacao='HMREATIVADA', entrada=5, status='CANCELADA')
+
+        resultado = ConfirmacaoEmLote().executar([confirmada.pk, cancelada.pk])
+        self.assertEqual(resultado['aplicadas'], [cancelada.pk])
+        self.assertEqual(resultado['rejeitadas'], [
+            {'id': confirmada.pk, 'motivo': 'A reserva já está com o status Confirmada.'},
+        ])
+        cancelada.refresh_from_db()
+        self.assertEqual(cancelada.status, 'CONFIRMADA')
+
+    def test_reconciliacao_idempotente(self):
+        vencida = criar_reserva(codigo_confirmacao='HMVENCIDA', entrada=-5, noites=2)
+        Reserva.objects.filter(pk=vencida.pk).update(status='CHECKOUT')
+
+        self.assertEqual(reconciliar_status(dry_run=True)['FINALIZADA'], 1)
+        self.assertEqual(reconciliar_status()['FINALIZADA'], 1)
+        self.assertEqual(reconciliar_status(), {'FINALIZADA': 0, 'CONFIRMADA': 0})
+        vencida.refresh_from_db()
+        self.assertEqual(vencida.status, 'FINALIZADA')
+
+    def test_comando_reconciliar_status(self):
+        vencida = criar_reserva(codigo_confirmacao='HMVENCIDA', entrada=-5, noites=2)
+        pendente = criar_reserva(codigo_confirmacao='HMPENDENTE', entrada=10)
+        booking = criar_reserva(codigo_confirmacao='BKPENDENTE', entrada=10,
+                                plataforma=Plataforma.objects.create(nome='Booking.com'))
+        Reserva.objects.filter(pk=vencida.pk).update(status='CHECKOUT')
+        Reserva.objects.filter(pk__in=[pendente.pk, booking.pk]).update(status='PENDENTE')
+
+        saida = io.StringIO()
+        call_command('reconciliar_status', dry_run=True, stdout=saida)
+        self.assertIn('[dry-run] 2 reserva(s) reconciliada(s).', saida.getvalue())
+        self.assertEqual(Reserva.objects.get(pk=vencida.pk).status, 'CHECKOUT')
+
+        saida = io.StringIO()
+        call_command('reconciliar_status', stdout=saida)
+        self.assertIn('→ FINALIZADA: 1', saida.getvalue())
+        self.assertIn('→ CONFIRMADA: 1', saida.getvalue())
+        status = dict(Reserva.objects.values_list('pk', 'status'))
+        # Só pendentes do Airbnb são confirmadas
+        self.assertEqual([status[vencida.pk], status[pendente.pk], status[booking.pk]],
+                         ['FINALIZADA', 'CONFIRMADA', 'PENDENTE'])
+        registros = RegistroAlteracao.objects.filter(modelo='reserva', acao='ALTERACAO')
+        self.assertEqual(sorted(registros.values_list('objeto_id', flat=True)), sorted([vencida.pk, pendente.pk]))
+
+    def test_corpo_que_nao_e_objeto(self):
+        for corpo in ('[1, 2]', '"checkin"', '3', 'null'):
+            with self.subTest(corpo=corpo):
+                response = self.post(corpo)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['erro'], 'O corpo deve ser um objeto JSON')
+
+    def test_ids_invalidos(self):
+        for ids in ('1', [1, '2'], [True]):
+            with self.subTest(ids=ids):
+                self.assertEqual(self.post({'transicao': 'checkin', 'ids': ids}).status_code, 400)
+
+
+@mock.patch.object(replica, 'replica_configurada', return_value=True)
+class RoteadorReplicaTests(SimpleTestCase):
+    def setUp(self):
+        self.roteador = replica.RoteadorReplica()
+
+    def test_so_leituras_marcadas_de_modelos_do_app(self, _):
+        self.assertIsNone(self.roteador.db_for_read(Reserva))
+        with replica.leitura_replica():
+            self.assertEqual(self.roteador.db_for_read(Reserva), replica.REPLICA)
+            self.assertIsNone(self.roteador.db_for_read(User))
+            self.assertIsNone(self.roteador.db_for_read(Session))
+        self.assertFalse(self.roteador.allow_migrate(replica.REPLICA, 'hospedes'))
+
+    def test_transacao_e_escrita_leem_do_principal(self, _):
+        with replica.leitura_replica(), mock.patch.object(connection, 'in_atomic_block', True):
+            self.assertIsNone(self.roteador.db_for_read(Reserva))
+
+        estado = replica.EstadoRequisicao()
+        token = replica.estado_atual.set(estado)
+        self.addCleanup(replica.estado_atual.reset, token)
+        with replica.leitura_replica():
+            # Sessão e cache no banco não contam como escrita nos dados replicados
+            self.roteador.db_for_write(Session)
+            self.assertEqual(self.roteador.db_for_read(Reserva), replica.REPLICA)
+            self.roteador.db_for_write(Reserva)
+            self.assertEqual(self.roteador.db_for_read(Reserva), 'default')
+
+
+@override_settings(REPLICA_JANELA_ESCRITA=10)
+@mock.patch.object(replica, 'replica_configurada', return_value=True)
+class ReplicaMiddlewareTests(SimpleTestCase):
+    def chamar(self, view, cookies=None):
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies or {})
+        return replica.ReplicaMiddleware(view)(request)
+
+    def test_escrita_grava_cookie_com_a_janela(self, _):
+        def view(request):
+            replica.RoteadorReplica().db_for_write(Reserva)
+            return HttpResponse()
+
+        cookie = self.chamar(view).cookies[replica.COOKIE_ESCRITA]
+        self.assertEqual(cookie['max-age'], 10)
+        self.assertTrue(cookie['httponly'])
+        self.assertNotIn(replica.COOKIE_ESCRITA, self.chamar(lambda request: HttpResponse()).cookies)
+
+    def test_cookie_valido_mantem_leituras_no_principal(self, _):
+        bancos = []
+
+        @replica.usar_replica
+        def view(request):
+            bancos.append(replica.RoteadorReplica().db_for_read(Reserva))
+            return HttpResponse()
+
+        agora = timezone.now().timestamp()
+        self.chamar(view)
+        self.chamar(view, {replica.COOKIE_ESCRITA: f'{agora + 5:.0f}'})
+        self.chamar(view, {replica.COOKIE_ESCRITA: f'{agora - 5:.0f}'})
+        self.chamar(view, {replica.COOKIE_ESCRITA: 'invalido'})
+        self.assertEqual(bancos, [replica.REPLICA, 'default', replica.REPLICA, replica.REPLICA])
+
+
+class MediaTemporariaMixin:
+    """MEDIA_ROOT num diretório temporário, removido ao fim da classe."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._media = tempfile.mkdtemp()
+        cls._override_media = override_settings(MEDIA_ROOT=cls._media)
+        cls._override_media.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._override_media.disable()
+        shutil.rmtree(cls._media, ignore_errors=True)
+
+
+class DocumentoUploadTests(MediaTemporariaMixin, TestCase):
+    def test_arquivo_gravado_com_fieldfile_save_vai_para_o_blob(self):
+        reserva = criar_reserva(codigo_confirmacao='HMDOC')
+        documento = DocumentoReserva(reserva=reserva, pessoa=reserva.hospede_principal, tipo_documento='RG')
+
+        # A miniatura roda numa thread, fora da transação do teste
+        with self.captureOnCommitCallbacks(execute=True), mock.patch.object(documentos, 'agendar_miniatura'):
+            documento.arquivo.save('rg.pdf', ContentFile(b'%PDF-1.4 rg'))
+
+        blob = Blob.objects.get()
+        documento.refresh_from_db()
+        self.assertEqual((documento.blob, documento.arquivo.name, documento.tamanho), (blob, blob.arquivo.name, 11))
+        self.assertEqual(blob.referencias, 1)
+        # Só o blob fica no storage; a cópia gravada pelo FieldFile.save é apagada
+        storage = blob.arquivo.storage
+        self.assertEqual(storage.listdir(f'documentos/{timezone.now():%Y/%m}')[1], [])
+
+        outro = DocumentoReserva(reserva=reserva, pessoa=reserva.hospede_principal, tipo_documento='CPF')
+        outro.arquivo.save('copia.pdf', ContentFile(b'%PDF-1.4 rg'))
+        blob.refresh_from_db()
+        self.assertEqual((Blob.objects.count(), blob.referencias), (1, 2))
+
+
+class ArquivoReservasTests(MediaTemporariaMixin, TestCase):
+    def test_documento_arquivado_mantem_o_blob(self):
+        reserva = criar_reserva(codigo_confirmacao='HMARQUIVO', status='FINALIZADA', entrada=-1000)
+        DocumentoReserva.objects.create(
+            reserva=reserva, pessoa=reserva.hospede_principal, tipo_documento='RG',
+            arquivo=SimpleUploadedFile('rg.pdf', b'%PDF-1.4 documento'),
+        )
+        blob = Blob.objects.get()
+
+        arquivar_reservas()
+        call_command('coletar_blobs', horas=0, stdout=open(os.devnull, 'w'))
+
+        self.assertTrue(DocumentoReservaArquivado.objects.filter(blob=blob).exists())
+        blob.refresh_from_db()
+        self.assertEqual(blob.referencias, 1)
+        self.assertTrue(blob.arquivo.storage.exists(blob.arquivo.name))
+
+    def test_move_reservas_encerradas_alem_do_horizonte(self):
+        antiga = criar_reserva(codigo_confirmacao='HMANTIGA', status='FINALIZADA', entrada=-400)
+        cancelada = criar_reserva(codigo_confirmacao='HMCANCELADA', status='CANCELADA', entrada=-400)
+        recente = criar_reserva(codigo_confirmacao='HMRECENTE', status='FINALIZADA', entrada=-100)
+        aberta = criar_reserva(codigo_confirmacao='HMABERTA', status='CONFIRMADA', entrada=-400)
+        vinculo = PessoaReserva.objects.create(
+            reserva=antiga, pessoa=antiga.hospede_principal, tipo_envolvimento='HOSPEDE_PRINCIPAL',
+        )
+        documento = DocumentoReserva.objects.create(
+            reserva=antiga, pessoa=antiga.hospede_principal, tipo_documento='RG',
+            arquivo=SimpleUploadedFile('rg.pdf', b'%PDF-1.4 antiga'),
+        )
+
+        previsto = arquivar_reservas(dias=365, dry_run=True)
+        self.assertEqual(previsto, {'reservas': 2, 'pessoas': 1, 'documentos': 1})
+        self.assertEqual((Reserva.objects.count(), ReservaArquivada.objects.count()), (4, 0))
+
+        self.assertEqual(arquivar_reservas(dias=365, batch_size=1), previsto)
+        self.assertQuerySetEqual(Reserva.objects.order_by('pk'), [recente, aberta])
+        arquivada = ReservaArquivada.objects.get(pk=antiga.pk)
+        self.assertEqual((arquivada.codigo_confirmacao, arquivada.valor_bruto), ('HMANTIGA', antiga.valor_bruto))
+        self.assertTrue(ReservaArquivada.objects.filter(pk=cancelada.pk).exists())
+        self.assertEqual(PessoaReservaArquivada.objects.get().pk, vinculo.pk)
+        self.assertEqual(DocumentoReservaArquivado.objects.get().pk, documento.pk)
+        self.assertFalse(PessoaReserva.objects.exists() or DocumentoReserva.objects.exists())
+
+        # Idempotente
+        self.assertEqual(arquivar_reservas(dias=365), {'reservas': 0, 'pessoas': 0, 'documentos': 0})
+
+    def test_historico_une_reservas_quentes_e_arquivadas(self):
+        antiga = criar_reserva(codigo_confirmacao='HMHIST1', status='FINALIZADA', entrada=-400)
+        recente = criar_reserva(codigo_confirmacao='HMHIST2', status='FINALIZADA', entrada=-10)
+        arquivar_reservas(dias=365)
+
+        self.assertEqual(list(Reserva.objects.values_list('pk', flat=True)), [recente.pk])
+        self.assertEqual(
+            sorted(ReservaHistorica.objects.values_list('pk', 'codigo_confirmacao')),
+            sorted([(antiga.pk, 'HMHIST1'), (recente.pk, 'HMHIST2')]),
+        )
+
+
+class RelatorioRitmoTests(TestCase):
+    hoje = date(2025, 6, 15)
+
+    def reservar(self, codigo, entrada, reservada, valor, **kwargs):
+        return criar_reserva(
+            codigo_confirmacao=codigo, data_entrada=entrada, data_saida=entrada + timedelta(days=3),
+            data_reserva=reservada, valor_bruto=Money(valor, 'BRL'), **kwargs
+        )
+
+    def test_carteira_contra_mesma_data_do_ano_anterior(self):
+        self.reservar('HMJUN25', date(2025, 6, 20), date(2025, 5, 1), 500)
+        self.reservar('HMJUN25TARDE', date(2025, 6, 25), date(2025, 6, 16), 700)
+        self.reservar('HMJUN25CANC', date(2025, 6, 28), date(2025, 5, 1), 1000, status='CANCELADA')
+        self.reservar('HMJUL25', date(2025, 7, 10), date(2025, 6, 1), 300, taxa_limpeza=Money(50, 'BRL'),
+                      impostos=Money(50, 'BRL'))
+        self.reservar('HMJUN24', date(2024, 6, 10), date(2024, 6, 1), 200, status='FINALIZADA')
+        self.reservar('HMJUN24TARDE', date(2024, 6, 20), date(2024, 6, 18), 300, status='FINALIZADA')
+        self.reservar('HMJUL24', date(2024, 7, 5), date(2024, 5, 1), 400, status='FINALIZADA')
+        self.reservar('HMAGO25', date(2025, 8, 2), date(2025, 5, 1), 900)
+        # O ano anterior vem do arquivo, pela view ReservaHistorica
+        self.assertEqual(arquivar_reservas(hoje=self.hoje, dias=300)['reservas'], 3)
+
+        relatorio = relatorio_ritmo(hoje=self.hoje, meses=2)
+
+        self.assertEqual(relatorio['data_base_ano_anterior'], date(2024, 6, 15))
+        self.assertEqual(relatorio['meses'], [
+            {
+                'mes': date(2025, 6, 1),
+                'reservas': 1,
+                'receita': Decimal('500.00'),
+                'reservas_ano_anterior': 1,
+                'receita_ano_anterior': Decimal('200.00'),
+                'receita_final_ano_anterior': Decimal('500.00'),
+                'variacao': 150.0,
+                'projecao': Decimal('1250.00'),
+            },
+            {
+                'mes': date(2025, 7, 1),
+                'reservas': 1,
+                'receita': Decimal('300.00'),
+                'reservas_ano_anterior': 1,
+                'receita_ano_anterior': Decimal('400.00'),
+                'receita_final_ano_anterior': Decimal('400.00'),
+                'variacao': -25.0,
+                'projecao': Decimal('300.00'),
+            },
+        ])
+
+    def test_sem_historico_e_29_de_fevereiro(self):
+        self.reservar('HMMAR24', date(2024, 3, 5), date(2024, 2, 1), 250)
+
+        relatorio = relatorio_ritmo(hoje=date(2024, 2, 29), meses=2)
+
+        self.assertEqual(relatorio['data_base_ano_anterior'], date(2023, 2, 28))
+        marco = relatorio['meses'][1]
+        self.assertEqual((marco['reservas'], marco['receita']), (1, Decimal('250.00')))
+        # Sem receita no ano anterior não há ritmo nem projeção
+        self.assertEqual((marco['receita_ano_anterior'], marco['variacao'], marco['projecao']),
+                         (Decimal('0.00'), None, None))
+
+
+class HistogramasTests(TestCase):
+    def gravados(self):
+        return {
+            (h.metrica, h.plataforma_id, h.temporada): h.contagens
+            for h in HistogramaReservas.objects.all() if any(h.contagens)
+        }
+
+    def assertIgualAReconstrucao(self):
+        reconstruidos = {
+            (h.metrica, h.plataforma_id, h.temporada): h.contagens for h in analitico.calcular_histogramas()
+        }
+        self.assertEqual(self.gravados(), reconstruidos)
+        saida = io.StringIO()
+        call_command('reconstruir_histogramas', dry_run=True, stdout=saida)
+        self.assertIn('0 divergente(s)', saida.getvalue())
+
+    def test_deltas_iguais_a_reconstrucao(self):
+        booking = Plataforma.objects.create(nome='Booking')
+        airbnb = criar_reserva(codigo_confirmacao='HMHIST', entrada=10, noites=3)
+        grupo = criar_reserva(codigo_confirmacao='BKGRUPO', plataforma=booking, entrada=100, noites=8, num_adultos=4,
+                              num_criancas=2)
+        criar_reserva(codigo_confirmacao='HMCANC', entrada=40, status='CANCELADA')
+        self.assertIgualAReconstrucao()
+        # 8 noites cai na faixa 7–9
+        self.assertEqual(self.gravados()[('ESTADIA', booking.pk, analitico.temporada(grupo.data_entrada))][5], 1)
+
+        # Alteração: a contribuição anterior sai e a nova entra
+        reserva = Reserva.objects.get(pk=airbnb.pk)
+        reserva.data_saida = reserva.data_entrada + timedelta(days=15)
+        reserva.num_adultos = 5
+        reserva.save()
+        self.assertIgualAReconstrucao()
+
+        # Reativação de uma cancelada e cancelamento em lote
+        cancelada = Reserva.objects.get(codigo_confirmacao='HMCANC')
+        cancelada.status = 'CONFIRMADA'
+        cancelada.save()
+        executar_transicao('cancelar', [grupo.pk])
+        self.assertIgualAReconstrucao()
+
+        Reserva.objects.get(pk=airbnb.pk).delete()
+        self.assertIgualAReconstrucao()
+
+    def test_reconstrucao_corrige_divergencias(self):
+        reserva = criar_reserva(codigo_confirmacao='HMRECONSTRUIR')
+        outra_temporada = 'ALTA' if analitico.temporada(reserva.data_entrada) == 'BAIXA' else 'BAIXA'
+        HistogramaReservas.objects.all().update(contagens=[9])
+        HistogramaReservas.objects.create(
+            metrica='GRUPO', plataforma=reserva.plataforma, temporada=outra_temporada, contagens=[1],
+        )
+
+        saida = io.StringIO()
+        call_command('reconstruir_histogramas', stdout=saida)
+        self.assertIn('4 divergente(s)', saida.getvalue())
+        self.assertIgualAReconstrucao()
+
+
+class BlobTests(MediaTemporariaMixin, TestCase):
+    def documento(self, reserva, conteudo, tipo='RG'):
+        return DocumentoReserva.objects.create(
+            reserva=reserva, pessoa=reserva.hospede_principal, tipo_documento=tipo,
+            arquivo=SimpleUploadedFile('doc.pdf', conteudo),
+        )
+
+    def referencias(self):
+        return dict(Blob.objects.values_list('hash', 'referencias'))
+
+    def test_conteudo_igual_compartilha_o_blob(self):
+        reserva = criar_reserva(codigo_confirmacao='HMBLOB')
+        primeiro = self.documento(reserva, b'%PDF-1.4 igual')
+        segundo = self.documento(reserva, b'%PDF-1.4 igual', tipo='CPF')
+        self.assertEqual(primeiro.blob, segundo.blob)
+        self.assertEqual(primeiro.arquivo.name, segundo.arquivo.name)
+        self.assertEqual(self.referencias(), {primeiro.hash_conteudo: 2})
+
+        segundo.arquivo = SimpleUploadedFile('novo.pdf', b'%PDF-1.4 outro')
+        segundo.save()
+        self.assertEqual(self.referencias(), {primeiro.hash_conteudo: 1, segundo.hash_conteudo: 1})
+
+        primeiro.delete()
+        segundo.delete()
+        self.assertEqual(set(self.referencias().values()), {0})
+
+    def test_coleta_remove_blobs_sem_referencia_e_arquivos_orfaos(self):
+        reserva = criar_reserva(codigo_confirmacao='HMCOLETA')
+        mantido = self.documento(reserva, b'%PDF-1.4 mantido').blob
+        removido = self.documento(reserva, b'%PDF-1.4 removido')
+        removido.delete()
+        storage = mantido.arquivo.storage
+        orfao = storage.save('blobs/ff/orfao', ContentFile(b'upload interrompido'))
+        # Contador divergente é corrigido pelas referências reais
+        Blob.objects.filter(pk=mantido.pk).update(referencias=5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('coletar_blobs', horas=0, dry_run=True, stdout=open(os.devnull, 'w'))
+        self.assertEqual(Blob.objects.count(), 2)
+        self.assertTrue(storage.exists(removido.arquivo.name) and storage.exists(orfao))
+        self.assertEqual(Blob.objects.get(pk=mantido.pk).referencias, 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('coletar_blobs', horas=0, stdout=open(os.devnull, 'w'))
+        self.assertQuerySetEqual(Blob.objects.all(), [mantido])
+        self.assertEqual(Blob.objects.get().referencias, 1)
+        self.assertTrue(storage.exists(mantido.arquivo.name))
+        self.assertFalse(storage.exists(removido.arquivo.name) or storage.exists(orfao))
+
+
+class AssetsTests(SimpleTestCase):
+    """Pipeline de assets num STATICFILES_DIRS temporário, com vendor falso."""
+
+    def setUp(self):
+        self.static = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static, ignore_errors=True)
+        shutil.copytree(settings.STATICFILES_DIRS[0], self.static, dirs_exist_ok=True)
+        override = override_settings(STATICFILES_DIRS=[self.static])
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def escrever_vendor(self):
+        for destino in assets.VENDOR:
+            caminho = os.path.join(self.static, destino)
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            conteudo = f'/*! {destino} */'
+            if destino.endswith('bootstrap-icons.min.css'):
+                conteudo += '\n@font-face{src:url("fonts/bootstrap-icons.woff2?v=1") format("woff2")}'
+            with open(caminho, 'w') as arquivo:
+                arquivo.write(conteudo + '\n/*# sourceMappingURL=x.map */\n')
+
+    def test_vendor_precisa_estar_no_lock_e_igual(self):
+        self.assertEqual(len(assets.verificar_vendor()), len(assets.VENDOR))
+
+        self.escrever_vendor()
+        self.assertTrue(all('sem registro' in problema for problema in assets.verificar_vendor()))
+
+        # Arquivos já presentes entram no lock sem acessar a rede
+        self.assertEqual(assets.baixar_vendor(), [])
+        self.assertEqual(assets.verificar_vendor(), [])
+
+        with open(os.path.join(self.static, 'vendor/bootstrap/bootstrap.min.css'), 'a') as arquivo:
+            arquivo.write('.alterado{}')
+        self.assertEqual(
+            assets.verificar_vendor(), [f'vendor/bootstrap/bootstrap.min.css (difere do {assets.VENDOR_LOCK})'],
+        )
+
+    @override_settings(ASSETS_BUNDLES=True)
+    def test_montar_assets_grava_os_bundles(self):
+        with self.assertRaises(CommandError) as erro:
+            call_command('montar_assets', stdout=open(os.devnull, 'w'))
+        self.assertEqual(str(erro.exception).count('rode montar_assets --baixar'), len(assets.VENDOR))
+
+        self.escrever_vendor()
+        assets.baixar_vendor()
+        call_command('montar_assets', stdout=open(os.devnull, 'w'))
+
+        with open(os.path.join(self.static, 'dist/base.css')) as arquivo:
+            css = arquivo.read()
+        self.assertIn('url("../vendor/bootstrap-icons/fonts/bootstrap-icons.woff2?v=1")', css)
+        self.assertNotIn('sourceMappingURL', css)
+        self.assertLess(css.index('vendor/bootstrap/bootstrap.min.css'), css.index(':root{'))
+        self.assertEqual(sorted(os.listdir(os.path.join(self.static, 'dist'))), sorted(assets.BUNDLES))
+
+    @override_settings(ASSETS_BUNDLES=False)
+    def test_sem_bundles_so_confere_os_templates(self):
+        call_command('montar_assets', stdout=open(os.devnull, 'w'))
+        self.assertFalse(os.path.exists(os.path.join(self.static, 'dist')))
+
+        os.remove(os.path.join(self.static, 'css/base.css'))
+        with self.assertRaisesMessage(CommandError, 'css/base.css'):
+            call_command('montar_assets', stdout=open(os.devnull, 'w'))
+
+
+class GunicornConfTests(SimpleTestCase):
+    def carregar(self, memoria=None, **ambiente):
+        """Executa o gunicorn.conf.py com as variáveis e o limite de memória do cgroup informados."""
+        abrir = open
+
+        def abrir_cgroup(caminho, *args, **kwargs):
+            if str(caminho).startswith('/sys/fs/cgroup/'):
+                if memoria is None:
+                    raise FileNotFoundError(caminho)
+                return io.StringIO(memoria)
+            return abrir(caminho, *args, **kwargs)
+
+        variaveis = ('WEB_CONCURRENCY', 'GUNICORN_MAX_WORKERS', 'GUNICORN_WORKER_MEMORY_MB', 'ASYNC_VIEWS')
+        limpo = {nome: valor for nome, valor in os.environ.items() if nome not in variaveis}
+        with (
+            mock.patch.dict(os.environ, {**limpo, **ambiente}, clear=True),
+            mock.patch('builtins.open', abrir_cgroup),
+            mock.patch('multiprocessing.cpu_count', return_value=4),
+        ):
+            return runpy.run_path(str(settings.BASE_DIR / 'gunicorn.conf.py'))
+
+    def test_workers_limitados_pela_memoria_do_container(self):
+        # 512 MB / 150 MB por worker: 3, abaixo de 2 x 4 CPUs + 1
+        self.assertEqual(self.carregar(memoria=str(512 * 1024 * 1024))['workers'], 3)
+        # Sem limite de memória vale o teto de GUNICORN_MAX_WORKERS
+        self.assertEqual(self.carregar(memoria='max')['workers'], 8)
+        self.assertEqual(self.carregar(GUNICORN_MAX_WORKERS='20')['workers'], 9)
+        self.assertEqual(self.carregar(memoria=str(64 * 1024 * 1024))['workers'], 1)
+        self.assertEqual(self.carregar(memoria=str(512 * 1024 * 1024), WEB_CONCURRENCY='5')['workers'], 5)
+
+    def test_servidor_wsgi_ou_asgi(self):
+        wsgi = self.carregar()
+        self.assertEqual((wsgi['wsgi_app'], wsgi['worker_class']), ('core.wsgi:application', 'gthread'))
+        self.assertTrue(wsgi['preload_app'])
+
+        asgi = self.carregar(ASYNC_VIEWS='True')
+        self.assertEqual((asgi['wsgi_app'], asgi['worker_class']),
+                         ('core.asgi:application', 'uvicorn.workers.UvicornWorker'))
+
+
+class InicializacaoTests(SimpleTestCase):
+    def modulos_carregados(self, settings_module):
+        """Módulos em sys.modules depois do django.setup() num processo novo."""
+        script = (
+            'import os, sys, django\n'
+            f'os.environ["DJANGO_SETTINGS_MODULE"] = "{settings_module}"\n'
+            'django.setup()\n'
+            'print("\\n".join(sys.modules))\n'
+        )
+        resultado = subprocess.run(
+            [sys.executable, '-c', script], capture_output=True, text=True, cwd=settings.BASE_DIR, check=True,
+        )
+        return set(resultado.stdout.split())
+
+    def test_pillow_nao_carrega_na_inicializacao(self):
+        modulos = self.modulos_carregados('core.settings')
+        self.assertIn('apps.hospedes.documentos', modulos)
+        self.assertNotIn('PIL', modulos)
+
+    def test_settings_enxuto_nao_carrega_os_apps_web(self):
+        excluidos = {'django.contrib.admin', 'django.contrib.messages', 'django.contrib.humanize', 'crispy_forms',
+                     'whitenoise', 'djmoney.admin'}
+        self.assertLessEqual(excluidos, self.modulos_carregados('core.settings'))
+
+        modulos = self.modulos_carregados('core.settings_lean')
+        self.assertIn('apps.hospedes.models', modulos)
+        self.assertEqual(excluidos & modulos, set())
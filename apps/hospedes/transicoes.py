@@ -0,0 +1,205 @@
+"""
+Transições de status em lote: check-in, check-out, finalização e cancelamento.
+
+As regras são as mesmas de Reserva.realizar_checkin/realizar_checkout
+(validação e horários padrão vêm do próprio modelo), mas as reservas são
+carregadas numa consulta, validadas em memória e gravadas com bulk_update
+(um UPDATE por lote), sem passar pelo save() de cada uma. As rejeitadas
+voltam com o motivo.
+
+A reconciliação (comando reconciliar_status) aplica as regras de
+Reserva.status_atual a todas as reservas com um UPDATE ... WHERE por regra,
+em vez de depender de cada reserva ser salva depois da data de saída.
+
+Como bulk_update/update não disparam signals, log de alterações,
+estatísticas do hóspede e quadro de operações são atualizados pelo sinal
+reservas_gravadas_em_lote e por registrar_operacao_em_lote.
+"""
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .auditoria import lote_auditoria, registrar_operacao_em_lote
+from .models import Reserva
+from .signals import reservas_gravadas_em_lote
+
+BATCH_SIZE = 500
+
+# Campos carregados: regras, gravação e o que os receivers do sinal em lote leem
+CAMPOS_CARREGADOS = [
+    'pk', 'status', 'data_entrada', 'data_saida', 'hospede_principal_id',
+    'data_checkin', 'data_checkout', 'checkin_por', 'checkout_por',
+    'observacoes_checkin', 'observacoes_checkout',
+    'plataforma_id', 'data_reserva', 'noites', 'num_adultos', 'num_criancas',
+    'valor_bruto', 'taxa_servico', 'taxa_limpeza', 'impostos',
+]
+
+TRANSICOES = {}
+
+
+def register_transicao(cls):
+    TRANSICOES[cls.key] = cls
+    return cls
+
+
+def get_transicao(key):
+    try:
+        return TRANSICOES[key]
+    except KeyError:
+        raise ValueError(f'Transição desconhecida: {key}')
+
+
+class TransicaoEmLote:
+    """
+    Base das transições. Subclasses definem `key` e o `status_destino`; as
+    que gravam mais que o status informam os `campos` e sobrescrevem
+    `aplicar`. `erro` devolve o motivo da rejeição ou None: por padrão, só
+    rejeita reservas já no status de destino.
+    """
+    key = None
+    status_destino = None
+    campos = ['status']
+
+    def __init__(self, usuario=None, observacoes=None):
+        self.usuario = usuario
+        self.observacoes = observacoes
+
+    def erro(self, reserva, hoje):
+        if reserva.status == self.status_destino:
+            return f'A reserva já está com o status {reserva.get_status_display()}.'
+        return None
+
+    def aplicar(self, reserva, hoje, agora):
+        reserva.status = self.status_destino
+
+    def executar(self, pks):
+        """Aplica a transição às reservas informadas e retorna o resultado."""
+        pks = list(dict.fromkeys(pks))
+        agora = timezone.now()
+        hoje = agora.date()
+        aplicadas = []
+        rejeitadas = []
+
+        with transaction.atomic(), lote_auditoria(self.usuario):
+            reservas = Reserva.objects.select_for_update().only(*CAMPOS_CARREGADOS).in_bulk(pks)
+            for pk in pks:
+                reserva = reservas.get(pk)
+                erro = 'Reserva não encontrada.' if reserva is None else self.erro(reserva, hoje)
+                if erro:
+                    rejeitadas.append({'id': pk, 'motivo': erro})
+                    continue
+                self.aplicar(reserva, hoje, agora)
+                reserva.updated_at = agora
+                aplicadas.append(reserva)
+
+            if aplicadas:
+                Reserva.objects.bulk_update(aplicadas, [*self.campos, 'updated_at'], batch_size=BATCH_SIZE)
+                reservas_gravadas_em_lote.send(sender=Reserva, reservas=aplicadas)
+                registrar_operacao_em_lote(aplicadas)
+
+        return {
+            'success': True,
+            'transicao': self.key,
+            'aplicadas': [reserva.pk for reserva in aplicadas],
+            'rejeitadas': rejeitadas,
+        }
+
+
+@register_transicao
+class CheckinEmLote(TransicaoEmLote):
+    key = 'checkin'
+    status_destino = 'CHECKIN'
+    campos = ['status', 'data_checkin', 'checkin_por', 'observacoes_checkin']
+
+    def erro(self, reserva, hoje):
+        return reserva.erro_checkin(hoje)
+
+    def aplicar(self, reserva, hoje, agora):
+        reserva.data_checkin = reserva.momento_checkin(hoje, agora)
+        reserva.checkin_por = self.usuario
+        reserva.observacoes_checkin = self.observacoes
+        super().aplicar(reserva, hoje, agora)
+
+
+@register_transicao
+class CheckoutEmLote(TransicaoEmLote):
+    key = 'checkout'
+    status_destino = 'CHECKOUT'
+    campos = ['status', 'data_checkout', 'checkout_por', 'observacoes_checkout']
+
+    def erro(self, reserva, hoje):
+        return reserva.erro_checkout(hoje)
+
+    def aplicar(self, reserva, hoje, agora):
+        reserva.data_checkout = reserva.momento_checkout(hoje, agora)
+        reserva.checkout_por = self.usuario
+        reserva.observacoes_checkout = self.observacoes
+        # Como no save(): check-out depois da data de saída já fica finalizado
+        reserva.status = 'FINALIZADA' if hoje > reserva.data_saida else 'CHECKOUT'
+
+
+@register_transicao
+class FinalizacaoEmLote(TransicaoEmLote):
+    key = 'finalizar'
+    status_destino = 'FINALIZADA'
+
+    def erro(self, reserva, hoje):
+        if reserva.status != 'CHECKOUT':
+            return 'Só é possível finalizar reservas com check-out realizado.'
+        return None
+
+
+@register_transicao
+class CancelamentoEmLote(TransicaoEmLote):
+    key = 'cancelar'
+    status_destino = 'CANCELADA'
+
+    def erro(self, reserva, hoje):
+        if reserva.status == 'CANCELADA':
+            return 'A reserva já está cancelada.'
+        if reserva.status in ('CHECKIN', 'CHECKOUT', 'FINALIZADA'):
+            return 'Não é possível cancelar uma reserva após o check-in.'
+        return None
+
+
+def executar_transicao(key, pks, usuario=None, observacoes=None):
+    """Atalho: executar_transicao('checkin', [1, 2, 3], usuario=request.user)."""
+    return get_transicao(key)(usuario=usuario, observacoes=observacoes).executar(pks)
+
+
+# Regras de Reserva.status_atual: novo status e condição (em função de hoje)
+REGRAS_RECONCILIACAO = [
+    ('FINALIZADA', lambda hoje: Q(status='CHECKOUT', data_saida__lt=hoje)),
+    ('CONFIRMADA', lambda hoje: Q(status='PENDENTE', plataforma__nome='Airbnb')),
+]
+
+
+def reconciliar_status(dry_run=False):
+    """
+    Grava o status calculado de todas as reservas desatualizadas, um UPDATE
+    por regra. Idempotente: uma segunda execução no mesmo dia não altera nada.
+    Retorna {novo status: reservas alteradas}.
+    """
+    agora = timezone.now()
+    hoje = agora.date()
+    contagens = {}
+
+    with transaction.atomic(), lote_auditoria():
+        for novo_status, regra in REGRAS_RECONCILIACAO:
+            desatualizadas = Reserva.objects.filter(regra(hoje))
+            if dry_run:
+                contagens[novo_status] = desatualizadas.count()
+                continue
+
+            # Carregadas (e travadas) só para o log de alterações e os receivers do sinal
+            reservas = list(desatualizadas.select_for_update().only(*CAMPOS_CARREGADOS))
+            contagens[novo_status] = desatualizadas.update(status=novo_status, updated_at=agora)
+            for reserva in reservas:
+                reserva.status = novo_status
+                reserva.updated_at = agora
+            if reservas:
+                reservas_gravadas_em_lote.send(sender=Reserva, reservas=reservas)
+                registrar_operacao_em_lote(reservas)
+
+    return contagens
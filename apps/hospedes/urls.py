@@ -1,11 +1,35 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, views
+from .replica import usar_replica
 
 app_name = 'hospedes'
 
+# Com ASYNC_VIEWS ativo (deploy ASGI) as rotas principais usam as variantes assíncronas;
+# o dashboard lê da réplica, se configurada
+if settings.ASYNC_VIEWS:
+    dashboard_view = usar_replica(views.AsyncDashboardView.as_view())
+    importar_csv_view = views.importar_csv_async
+else:
+    dashboard_view = usar_replica(views.DashboardView.as_view())
+    importar_csv_view = views.importar_csv
+
 urlpatterns = [
     # URLs serão implementadas posteriormente
-    path('', views.DashboardView.as_view(), name='dashboard'),
-    path('importar-csv/', views.importar_csv, name='importar_csv'),
+    path('', dashboard_view, name='dashboard'),
+    path('importar-csv/', importar_csv_view, name='importar_csv'),
     path('reservas/criar/', views.CriarReservaView.as_view(), name='criar_reserva'),
+    path('calendario/<str:token>.ics', views.calendario_ics, name='calendario_ics'),
+    path('operacoes/', views.QuadroOperacoesView.as_view(), name='operacoes'),
+    path('hospedes/<int:pk>/', views.PerfilHospedeView.as_view(), name='perfil_hospede'),
+    path('api/hospedes/<int:pk>/', views.perfil_hospede_api, name='perfil_hospede_api'),
+    path('api/relatorios/histogramas/', views.histogramas_api, name='histogramas_api'),
+    path('api/relatorios/ritmo/', views.relatorio_ritmo_api, name='relatorio_ritmo_api'),
+    path('api/reservas/', api.RecursoView.as_view(recurso_class=api.ReservaAPI), name='api_reservas'),
+    path('api/reservas/transicoes/', api.TransicaoReservasView.as_view(), name='api_transicoes'),
+    path('api/reservas/<int:pk>/', api.RecursoView.as_view(recurso_class=api.ReservaAPI), name='api_reserva'),
+    path('api/pessoas/', api.RecursoView.as_view(recurso_class=api.PessoaAPI), name='api_pessoas'),
+    path('api/pessoas/<int:pk>/', api.RecursoView.as_view(recurso_class=api.PessoaAPI), name='api_pessoa'),
+    path('api/contatos/', api.RecursoView.as_view(recurso_class=api.ContatoAPI), name='api_contatos'),
+    path('api/contatos/<int:pk>/', api.RecursoView.as_view(recurso_class=api.ContatoAPI), name='api_contato'),
 ]
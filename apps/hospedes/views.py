@@ -1,82 +1,116 @@
 from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.crypto import constant_time_compare
 from django.views.generic import View, TemplateView
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
 from django.utils import timezone
-from django.db.models import Count, Sum, F
-from .models import Reserva
-from .services import AirbnbCSVImporter
-from datetime import datetime, timedelta
-import csv
+from django.db.models import Prefetch
+from asgiref.sync import sync_to_async
+from .models import DocumentoReserva, Propriedade, Reserva, centavos_para_decimal
+from .replica import fixar_banco, usar_replica
+from datetime import date, timedelta
 import tempfile
 import os
 
-class DashboardView(LoginRequiredMixin, TemplateView):
-    template_name = 'hospedes/dashboard.html'
-    login_url = reverse_lazy('auth:login')
+class DashboardQueriesMixin:
+    """
+    Consultas e preparação dos dados do dashboard, compartilhadas pelas views
+    síncrona e assíncrona. Com ?propriedade=<id>, todas as consultas ficam
+    restritas ao anúncio pelos índices (propriedade, ...).
+    """
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        hoje = timezone.localtime().date()
-        
-        # Pegar o status do filtro da URL
-        filtro_status = self.request.GET.get('status')
-        context['filtro_status'] = filtro_status
-        
-        # Filtros básicos
-        reservas_programadas = Reserva.objects.filter(status='CONFIRMADA')
-        reservas_em_andamento = Reserva.objects.filter(
-            data_entrada__lte=hoje,
-            data_saida__gte=hoje
-        )
-        reservas_concluidas = Reserva.objects.filter(
-            data_saida__lt=hoje
-        ).exclude(status='CANCELADA')
-        reservas_canceladas = Reserva.objects.filter(status='CANCELADA')
-        
-        # Estatísticas para os cards
-        context['total_reservas'] = Reserva.objects.count()
-        
-        # Reservas programadas e suas receitas
-        reservas_programadas = Reserva.objects.filter(
-            status='CONFIRMADA',
-            data_entrada__gte=hoje
-        )
-        context['reservas_programadas'] = reservas_programadas.count()
-        
-        # Calcula o total somando valor_bruto + taxa_servico + taxa_limpeza - impostos
-        context['receitas_programadas'] = reservas_programadas.aggregate(
-            total=Sum(F('valor_bruto') + F('taxa_servico') + F('taxa_limpeza') - F('impostos'))
-        )['total'] or 0
-        
-        context['reservas_hoje'] = Reserva.objects.filter(
-            data_entrada=hoje
-        ).count()
-        context['checkout_hoje'] = Reserva.objects.filter(
-            data_saida=hoje
-        ).count()
-        
-        # Dados para a tabela de reservas
-        reservas = Reserva.objects.select_related(
-            'hospede_principal', 'plataforma'
+    def get_propriedade_id(self):
+        try:
+            return int(self.request.GET['propriedade'])
+        except (KeyError, ValueError):
+            return None
+
+    def get_querysets(self, hoje, propriedade_id=None):
+        """Retorna os querysets independentes usados pelos cards, abas e tabela."""
+        base = Reserva.objects.all()
+        if propriedade_id:
+            base = base.filter(propriedade_id=propriedade_id)
+        reservas = base.select_related(
+            'hospede_principal', 'plataforma', 'propriedade'
         ).prefetch_related(
-            'hospede_principal__contatos'
+            'hospede_principal__contatos',
+            # Só o necessário para as miniaturas do modal
+            Prefetch('documentos', queryset=DocumentoReserva.objects.only(
+                'reserva_id', 'tipo_documento', 'arquivo', 'miniatura'
+            )),
         )
-        
-        # Aplicar filtro baseado no status selecionado
-        if filtro_status == 'em_andamento':
-            reservas = reservas_em_andamento
-        elif filtro_status == 'concluidas':
-            reservas = reservas_concluidas
-        elif filtro_status == 'canceladas':
-            reservas = reservas_canceladas
-        else:  # programadas (default)
-            reservas = reservas.filter(
+        return {
+            'todas': base,
+            'programadas': base.filter(
+                status='CONFIRMADA',
+                data_entrada__gte=hoje
+            ),
+            'em_andamento': reservas.filter(
+                data_entrada__lte=hoje,
                 data_saida__gte=hoje
-            ).exclude(status='CANCELADA')
-        
+            ),
+            'concluidas': reservas.filter(
+                data_saida__lt=hoje
+            ).exclude(status='CANCELADA'),
+            'canceladas': reservas.filter(status='CANCELADA'),
+            'ativas': reservas.filter(
+                data_saida__gte=hoje
+            ).exclude(status='CANCELADA'),
+            'entradas_hoje': base.filter(data_entrada=hoje),
+            'saidas_hoje': base.filter(data_saida=hoje),
+            'propriedades': Propriedade.objects.filter(ativo=True).only('nome'),
+        }
+
+    def get_dados_dashboard(self):
+        """Contexto do dashboard: cards, contadores das abas e tabela de reservas."""
+        hoje = timezone.localtime().date()
+        # Pegar o status do filtro da URL
+        filtro_status = self.request.GET.get('status')
+        propriedade_id = self.get_propriedade_id()
+        querysets = self.get_querysets(hoje, propriedade_id)
+
+        reservas_programadas = querysets['programadas'].count()
+        return {
+            'filtro_status': filtro_status,
+            **self.contexto_propriedade(list(querysets['propriedades']), propriedade_id),
+            # Estatísticas para os cards
+            'total_reservas': querysets['todas'].count(),
+            'reservas_programadas': reservas_programadas,
+            # Soma valor_bruto + taxa_servico + taxa_limpeza - impostos em centavos
+            'receitas_programadas': centavos_para_decimal(querysets['programadas'].receita_liquida_centavos()),
+            'reservas_hoje': querysets['entradas_hoje'].count(),
+            'checkout_hoje': querysets['saidas_hoje'].count(),
+            # Dados para a tabela de reservas
+            'reservas': self.preparar_reservas(self.get_reservas_queryset(querysets, filtro_status), filtro_status),
+            # Contadores para as abas
+            'count_programadas': reservas_programadas,
+            'count_em_andamento': querysets['em_andamento'].count(),
+            'count_concluidas': querysets['concluidas'].count(),
+            'count_canceladas': querysets['canceladas'].count(),
+        }
+
+    def contexto_propriedade(self, propriedades, propriedade_id):
+        """Lista do seletor de anúncios e o anúncio escolhido (None = todos)."""
+        return {
+            'propriedades': propriedades,
+            'propriedade': next((p for p in propriedades if p.pk == propriedade_id), None),
+        }
+
+    def get_reservas_queryset(self, querysets, filtro_status):
+        """Seleciona o queryset da tabela conforme a aba escolhida."""
+        if filtro_status in ('em_andamento', 'concluidas', 'canceladas'):
+            return querysets[filtro_status]
+        return querysets['ativas']  # programadas (default)
+
+    def preparar_reservas(self, reservas, filtro_status):
+        """Ordena as reservas e monta o link do WhatsApp de cada hóspede."""
         # Ordenar reservas por prioridade do status calculado e data de check-in
         if filtro_status == 'concluidas':
             # Para concluídas, ordenar por data de check-in decrescente (mais recente primeiro)
@@ -84,10 +118,13 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         else:
             # Para as demais, manter ordem crescente de data
             reservas = sorted(reservas, key=lambda r: (r.calcular_status['prioridade'], r.data_entrada))
-            
-        # Preparar os dados de contato para cada reserva
+
+        # Preparar os dados de contato para cada reserva (usa os contatos já pré-carregados)
         for reserva in reservas:
-            whatsapp = reserva.hospede_principal.contatos.filter(tipo='WHATSAPP').first()
+            whatsapp = next(
+                (c for c in reserva.hospede_principal.contatos.all() if c.tipo == 'WHATSAPP'),
+                None
+            )
             if whatsapp:
                 # Remove todos os caracteres não numéricos do telefone
                 telefone_limpo = ''.join(filter(str.isdigit, whatsapp.valor))
@@ -97,18 +134,47 @@ class DashboardView(LoginRequiredMixin, TemplateView):
                 reserva.whatsapp_link = f"https://wa.me/{telefone_limpo}?text=Oi,%20{reserva.hospede_principal.nome.split()[0]}"
             else:
                 reserva.whatsapp_link = None
-                
-        context['reservas'] = reservas
-        
-        # Contadores para as abas
-        context['count_programadas'] = reservas_programadas.count()
-        context['count_em_andamento'] = reservas_em_andamento.count()
-        context['count_concluidas'] = reservas_concluidas.count()
-        context['count_canceladas'] = reservas_canceladas.count()
-        
+
+        return reservas
+
+
+class DashboardView(LoginRequiredMixin, DashboardQueriesMixin, TemplateView):
+    template_name = 'hospedes/dashboard.html'
+    login_url = reverse_lazy('auth:login')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update(self.get_dados_dashboard())
         return context
 
 
+class AsyncDashboardView(DashboardQueriesMixin, View):
+    """
+    Variante assíncrona do dashboard, para o deploy ASGI.
+
+    As consultas rodam numa única chamada sync_to_async, uma depois da outra:
+    o ORM assíncrono do Django executa cada consulta na mesma thread, então
+    dispará-las juntas não as tornaria concorrentes, só somaria uma troca de
+    thread por consulta. O ganho é o event loop livre para outras requisições
+    enquanto o banco responde.
+    """
+    template_name = 'hospedes/dashboard.html'
+    login_url = reverse_lazy('auth:login')
+
+    async def get(self, request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path(), self.login_url)
+        # Evita que o template resolva request.user de forma síncrona
+        request.user = user
+
+        context = await self.aget_context_data()
+        return render(request, self.template_name, context)
+
+    async def aget_context_data(self):
+        return {'view': self, **await sync_to_async(self.get_dados_dashboard)()}
+
+
 class ImportarCSVAirbnbView(LoginRequiredMixin, View):
     template_name = 'hospedes/importar_csv.html'
     
@@ -129,6 +195,7 @@ class ImportarCSVAirbnbView(LoginRequiredMixin, View):
                 destination.write(chunk)
         
         # Processa o arquivo
+        from .services import AirbnbCSVImporter
         importer = AirbnbCSVImporter()
         if tipo_importacao == 'pendente':
             resultado = importer.import_pending_csv(f'/tmp/{csv_file.name}')
@@ -145,48 +212,254 @@ class ImportarCSVAirbnbView(LoginRequiredMixin, View):
         return redirect('importar_csv')
 
 
-def importar_csv(request):
-    if request.method == 'POST' and request.FILES.get('csv_file'):
-        try:
-            csv_file = request.FILES['csv_file']
-            
-            # Salva o arquivo temporariamente
-            temp_file_path = os.path.join(tempfile.gettempdir(), csv_file.name)
-            with open(temp_file_path, 'wb+') as destination:
-                for chunk in csv_file.chunks():
-                    destination.write(chunk)
-            
-            # Processa o arquivo
-            importer = AirbnbCSVImporter()
-            resultado = importer.import_csv(temp_file_path)
-            
-            # Remove o arquivo temporário
-            os.remove(temp_file_path)
-            
-            # Se houver erros, retorna eles
-            if resultado['errors']:
-                return JsonResponse({
-                    'success': False,
-                    'error': f"Erro ao importar: {resultado['errors'][0]}. {resultado['imported']} reservas foram importadas com sucesso."
-                })
-            
-            # Se tudo deu certo
-            return JsonResponse({
-                'success': True,
-                'message': f"{resultado['imported']} reservas foram importadas."
-            })
-            
-        except Exception as e:
-            return JsonResponse({
-                'success': False,
-                'error': f"Erro inesperado: {str(e)}"
-            })
+def _opcoes_ical(post):
+    """
+    Anúncio e cancelamento de ausentes escolhidos no formulário. Por padrão o
+    upload não cancela nada; cancelar exige o anúncio do calendário.
+    """
+    propriedade = None
+    if post.get('propriedade'):
+        propriedade = Propriedade.objects.filter(pk=post['propriedade'], ativo=True).first()
+        if propriedade is None:
+            raise ValueError('Anúncio não encontrado')
+    cancelar_ausentes = post.get('cancelar_ausentes') == 'on'
+    if cancelar_ausentes and propriedade is None:
+        raise ValueError('Selecione o anúncio do calendário para cancelar as reservas ausentes')
+    return {'propriedade': propriedade, 'cancelar_ausentes': cancelar_ausentes}
+
+
+def _importar_upload(csv_file, post):
+    """Grava o upload em um arquivo temporário e executa o importador."""
+    # Calendários .ics do Airbnb são sincronizados direto do upload
+    if csv_file.name.lower().endswith('.ics'):
+        from .services import AirbnbICalImporter
+        return AirbnbICalImporter(**_opcoes_ical(post)).sync(csv_file)
+
+    # Salva o arquivo temporariamente
+    temp_file_path = os.path.join(tempfile.gettempdir(), csv_file.name)
+    with open(temp_file_path, 'wb+') as destination:
+        for chunk in csv_file.chunks():
+            destination.write(chunk)
+    
+    # Processa o arquivo (importado sob demanda: só as rotas de importação usam o serviço)
+    from .services import AirbnbCSVImporter
+    importer = AirbnbCSVImporter()
+    resultado = importer.import_csv(temp_file_path, nome_arquivo=csv_file.name)
     
+    # Remove o arquivo temporário
+    os.remove(temp_file_path)
+    return resultado
+
+
+def _resposta_importacao(resultado):
+    # Se houver erros, retorna eles
+    if resultado['errors']:
+        return JsonResponse({
+            'success': False,
+            'error': f"Erro ao importar: {resultado['errors'][0]}. {resultado['imported']} reservas foram importadas com sucesso."
+        })
+    
+    if resultado['duplicate_file']:
+        return JsonResponse({
+            'success': True,
+            'message': "Este arquivo já foi importado. Nenhuma reserva foi alterada."
+        })
+    
+    # Se tudo deu certo
+    message = f"{resultado['imported']} reservas foram importadas."
+    if resultado['skipped']:
+        message += f" {resultado['skipped']} sem alterações foram ignoradas."
+    return JsonResponse({
+        'success': True,
+        'message': message
+    })
+
+
+def _resposta_sem_arquivo():
     return JsonResponse({
         'success': False,
         'error': 'Nenhum arquivo foi enviado. Por favor, selecione um arquivo CSV.'
     })
 
+
+def _resposta_erro_inesperado(e):
+    return JsonResponse({
+        'success': False,
+        'error': f"Erro inesperado: {str(e)}"
+    })
+
+
+@login_required
+def importar_csv(request):
+    if request.method == 'POST' and request.FILES.get('csv_file'):
+        try:
+            resultado = _importar_upload(request.FILES['csv_file'], request.POST)
+            return _resposta_importacao(resultado)
+        except Exception as e:
+            return _resposta_erro_inesperado(e)
+    
+    return _resposta_sem_arquivo()
+
+
+@login_required
+async def importar_csv_async(request):
+    """
+    Variante assíncrona de importar_csv.
+
+    O parsing do multipart, a gravação em disco e a importação rodam em uma
+    thread via sync_to_async, então uploads lentos e importações longas não
+    prendem o event loop do worker ASGI.
+    """
+    if request.method != 'POST':
+        return _resposta_sem_arquivo()
+
+    files = await sync_to_async(lambda: request.FILES)()
+    csv_file = files.get('csv_file')
+    if not csv_file:
+        return _resposta_sem_arquivo()
+
+    try:
+        resultado = await sync_to_async(_importar_upload)(csv_file, request.POST)
+        return _resposta_importacao(resultado)
+    except Exception as e:
+        return _resposta_erro_inesperado(e)
+
+@usar_replica
+def calendario_ics(request, token):
+    """
+    Feed iCalendar das reservas para apps de calendário.
+
+    Protegido por um token secreto na URL (ICAL_FEED_TOKEN), já que clientes
+    de calendário não fazem login. Com ?propriedade=<id>, traz só as reservas
+    daquele anúncio. Responde 304 quando o ETag não mudou.
+    """
+    if not settings.ICAL_FEED_TOKEN or not constant_time_compare(token, settings.ICAL_FEED_TOKEN):
+        raise Http404
+
+    from .ical import feed_etag, feed_queryset, iter_calendario
+
+    propriedade = None
+    if request.GET.get('propriedade'):
+        if not request.GET['propriedade'].isdigit():
+            raise Http404
+        propriedade = Propriedade.objects.filter(pk=int(request.GET['propriedade'])).only('nome').first()
+        if propriedade is None:
+            raise Http404
+    propriedade_id = propriedade.pk if propriedade else None
+
+    queryset = fixar_banco(feed_queryset(propriedade_id))
+    etag = quote_etag(feed_etag(queryset, propriedade_id))
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = StreamingHttpResponse(
+            iter_calendario(queryset, nome=f'Reservas - {propriedade.nome}' if propriedade else 'Reservas'),
+            content_type='text/calendar; charset=utf-8'
+        )
+        nome_arquivo = f'reservas-{propriedade_id}.ics' if propriedade else 'reservas.ics'
+        response['Content-Disposition'] = f'inline; filename="{nome_arquivo}"'
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, max-age=300'
+    return response
+
+
+class PerfilHospedeView(LoginRequiredMixin, TemplateView):
+    """Perfil do hóspede: estadias, contatos, documentos e relacionamentos."""
+    template_name = 'hospedes/perfil_hospede.html'
+    login_url = reverse_lazy('auth:login')
+
+    def get_context_data(self, **kwargs):
+        from .perfil import perfil_pessoa
+
+        context = super().get_context_data(**kwargs)
+        context.update(perfil_pessoa(self.kwargs['pk']))
+        return context
+
+
+@login_required
+def perfil_hospede_api(request, pk):
+    from .perfil import perfil_pessoa, perfil_para_dict
+
+    return JsonResponse(perfil_para_dict(perfil_pessoa(pk)))
+
+
+@login_required
+@usar_replica
+def relatorio_ritmo_api(request):
+    """
+    Ritmo de reservas dos próximos meses (?meses=12) contra o ano anterior,
+    de todos os anúncios ou de um só (?propriedade=<id>).
+    """
+    from .models import ReservaHistorica
+    from .relatorios import MESES_PADRAO, relatorio_ritmo
+
+    try:
+        meses = min(max(int(request.GET.get('meses', MESES_PADRAO)), 1), 36)
+    except ValueError:
+        meses = MESES_PADRAO
+    queryset = ReservaHistorica.objects.all()
+    if request.GET.get('propriedade', '').isdigit():
+        queryset = queryset.filter(propriedade_id=int(request.GET['propriedade']))
+    return JsonResponse(relatorio_ritmo(meses=meses, queryset=queryset), encoder=DjangoJSONEncoder)
+
+
+@login_required
+@usar_replica
+def histogramas_api(request):
+    """
+    Histogramas pré-calculados (?metrica=ESTADIA&temporada=ALTA&plataforma=Airbnb),
+    com os rótulos das faixas.
+    """
+    from .analitico import histogramas_para_dict
+    from .models import HistogramaReservas
+
+    filtros = {
+        campo: request.GET[parametro]
+        for parametro, campo in (('metrica', 'metrica'), ('temporada', 'temporada'), ('plataforma', 'plataforma__nome'))
+        if request.GET.get(parametro)
+    }
+    return JsonResponse(histogramas_para_dict(HistogramaReservas.objects.filter(**filtros)))
+
+
+class QuadroOperacoesView(LoginRequiredMixin, TemplateView):
+    """
+    Chegadas, saídas e trocas do dia (?data=AAAA-MM-DD), lidas do quadro
+    pré-calculado. Responde 304 enquanto o quadro não muda.
+    """
+    template_name = 'hospedes/operacoes.html'
+    login_url = reverse_lazy('auth:login')
+
+    def get(self, request, *args, **kwargs):
+        from .operacoes import filtrar_quadro, quadro_do_dia
+
+        try:
+            dia = date.fromisoformat(request.GET.get('data', ''))
+        except ValueError:
+            dia = timezone.localdate()
+        try:
+            propriedade_id = int(request.GET['propriedade'])
+        except (KeyError, ValueError):
+            propriedade_id = None
+        quadro = quadro_do_dia(dia)
+
+        etag = quote_etag(f'{dia}-{propriedade_id}-{quadro.gerado_em.timestamp():.6f}-{request.user.pk}')
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            propriedades = list(Propriedade.objects.filter(ativo=True).only('nome'))
+            response = self.render_to_response(self.get_context_data(
+                dia=dia,
+                hoje=timezone.localdate(),
+                anterior=dia - timedelta(days=1),
+                proximo=dia + timedelta(days=1),
+                quadro=quadro,
+                propriedades=propriedades,
+                propriedade=next((p for p in propriedades if p.pk == propriedade_id), None),
+                **(filtrar_quadro(quadro.dados, propriedade_id) if propriedade_id else quadro.dados),
+            ))
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
 class CriarReservaView(LoginRequiredMixin, TemplateView):
     template_name = 'hospedes/criar_reserva.html'
     login_url = reverse_lazy('auth:login')
@@ -55,6 +55,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.hospedes.replica.ReplicaMiddleware',  # Read-your-writes da réplica de leitura
+    'apps.hospedes.middleware.AuditoriaMiddleware',  # Log de alterações em lote
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -78,6 +80,10 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'core.wsgi.application'
+ASGI_APPLICATION = 'core.asgi.application'
+
+# Usa as views assíncronas do dashboard/importação (ative ao servir via ASGI)
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
 
 # Database
 POSTGRES_LOCALLY = False
@@ -93,6 +99,41 @@ DATABASES = {
 if ENVIRONMENT == 'production' or POSTGRES_LOCALLY == True:
     DATABASES['default'] = dj_database_url.config(default=config('DATABASE_URL'))
 
+# Réplica de leitura opcional para dashboard, feed iCalendar e relatórios
+# (apps/hospedes/replica.py). Localmente: sqlite:///replica.sqlite3
+REPLICA_DATABASE_URL = config('REPLICA_DATABASE_URL', default='')
+if REPLICA_DATABASE_URL:
+    DATABASES['replica'] = {
+        **dj_database_url.parse(REPLICA_DATABASE_URL),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['apps.hospedes.replica.RoteadorReplica']
+
+# Segundos em que quem gravou continua lendo do banco principal
+REPLICA_JANELA_ESCRITA = config('REPLICA_JANELA_ESCRITA', default=10, cast=int)
+
+# Cache compartilhado entre workers e dynos (fragmentos do feed iCalendar).
+# Com REDIS_URL usa o Redis; sem ele, uma tabela no banco principal, criada
+# a cada migrate (apps/hospedes/apps.py).
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'hospedes_cache',
+            # Um fragmento por reserva: o limite padrão (300) descartaria o feed a cada acesso
+            'OPTIONS': {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=50000, cast=int)},
+        }
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -125,10 +166,23 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Bundles de CSS/JS gerados por `manage.py montar_assets` (apps/hospedes/assets.py).
+# Só ligue depois de versionar static/vendor e o vendor.lock.json
+# (`montar_assets --baixar`); desativado, os templates incluem as fontes uma a
+# uma e o Bootstrap ainda não versionado vem do CDN
+ASSETS_BUNDLES = config('ASSETS_BUNDLES', default=False, cast=bool)
+
 # Configure o storage baseado no ambiente
 if ENVIRONMENT == 'production':
-    # Configuração para produção
-    STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+    # Nomes com hash do conteúdo e variantes .gz/.br; o WhiteNoise serve os
+    # arquivos com hash com Cache-Control de um ano (immutable). O manifest
+    # estrito faz o collectstatic falhar em url()/sourceMappingURL ausentes.
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+    }
+    # Só os arquivos com hash vão para o STATIC_ROOT
+    WHITENOISE_KEEP_ONLY_HASHED_FILES = True
 
 # Media files
 MEDIA_URL = 'media/'
@@ -141,6 +195,13 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
+# Feed iCalendar (/calendario/<token>.ics); vazio desativa o feed
+ICAL_FEED_TOKEN = config('ICAL_FEED_TOKEN', default='')
+
+# Reservas encerradas há mais dias que isso vão para as tabelas de arquivo
+# (comando arquivar_reservas); relatórios históricos continuam lendo todas
+ARQUIVO_HORIZONTE_DIAS = config('ARQUIVO_HORIZONTE_DIAS', default=730, cast=int)
+
 # Auth settings
 LOGIN_URL = 'auth:login'
 LOGIN_REDIRECT_URL = 'hospedes:dashboard'
@@ -0,0 +1,48 @@
+"""
+Perfil enxuto de settings para processos de linha de comando e workers.
+
+Remove apps usados apenas pela interface web (admin, crispy forms, humanize,
+whitenoise) para reduzir o tempo de inicialização de comandos avulsos como
+import_reservations e create_test_user:
+
+    python manage.py import_reservations arquivo.csv --settings=core.settings_lean
+
+Use o settings completo para servir HTTP e para o collectstatic.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+WEB_ONLY_APPS = [
+    'django.contrib.admin',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'django.contrib.humanize',
+    'crispy_forms',
+    'crispy_bootstrap5',
+    'whitenoise',
+    # O ready() do djmoney só adapta o admin (e importa django.contrib.admin);
+    # MoneyField e Money funcionam sem o app instalado
+    'djmoney',
+]
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in WEB_ONLY_APPS]
+
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE
+    if middleware not in (
+        'whitenoise.middleware.WhiteNoiseMiddleware',
+        'django.contrib.messages.middleware.MessageMiddleware',
+    )
+]
+
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        'OPTIONS': {
+            'context_processors': [
+                processor for processor in TEMPLATES[0]['OPTIONS']['context_processors']
+                if processor != 'django.contrib.messages.context_processors.messages'
+            ],
+        },
+    },
+]
@@ -0,0 +1,76 @@
+"""
+Configuração do gunicorn.
+
+Carregada automaticamente pelo gunicorn a partir do diretório do projeto.
+Todos os valores podem ser ajustados por variáveis de ambiente.
+"""
+
+import multiprocessing
+
+# "config" é um nome reservado pelo gunicorn neste arquivo
+from decouple import config as env
+
+bind = f"0.0.0.0:{env('PORT', default='8000')}"
+
+
+def limite_memoria_mb():
+    """Limite de memória do container (cgroup v2 ou v1) em MB; None se não houver."""
+    for caminho in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(caminho) as arquivo:
+                valor = arquivo.read().strip()
+        except OSError:
+            continue
+        # "max" (v2) ou um valor enorme (v1) significam sem limite
+        if valor.isdigit() and int(valor) < 1 << 50:
+            return int(valor) // (1024 * 1024)
+    return None
+
+
+# Orçamento de memória: cada worker ocupa cerca de GUNICORN_WORKER_MEMORY_MB
+# (Django e o app já carregados pelo preload, mais o pico de uma importação
+# de CSV grande; as threads do worker dividem essa memória). O número de
+# workers é o menor entre 2 x CPUs + 1, o que cabe no limite de memória do
+# container e GUNICORN_MAX_WORKERS, porque cpu_count() enxerga as CPUs do
+# host, não as do container. Num dyno de 512 MB isso dá 3 workers.
+# WEB_CONCURRENCY, quando definido, substitui o cálculo.
+memoria_worker = env('GUNICORN_WORKER_MEMORY_MB', default=150, cast=int)
+limite_memoria = limite_memoria_mb()
+workers_por_cpu = multiprocessing.cpu_count() * 2 + 1
+workers_por_memoria = max(1, limite_memoria // memoria_worker) if limite_memoria else workers_por_cpu
+workers = env(
+    'WEB_CONCURRENCY',
+    default=min(workers_por_cpu, workers_por_memoria, env('GUNICORN_MAX_WORKERS', default=8, cast=int)),
+    cast=int,
+)
+
+# ASYNC_VIEWS=True serve o projeto por ASGI (workers do uvicorn), com as views
+# assíncronas do dashboard e da importação; sem ele, WSGI. O processo web do
+# Procfile é o mesmo nos dois casos.
+servidor_asgi = env('ASYNC_VIEWS', default=False, cast=bool)
+wsgi_app = 'core.asgi:application' if servidor_asgi else 'core.wsgi:application'
+
+# Workers com threads atendem várias requisições por processo (uploads lentos
+# não prendem o processo inteiro); no ASGI o event loop faz esse papel.
+worker_class = env(
+    'GUNICORN_WORKER_CLASS',
+    default='uvicorn.workers.UvicornWorker' if servidor_asgi else 'gthread',
+)
+threads = env('GUNICORN_THREADS', default=4, cast=int)
+
+# Carrega o Django uma vez no master e compartilha a memória com os workers via fork
+preload_app = env('GUNICORN_PRELOAD', default=True, cast=bool)
+
+# Recicla os workers periodicamente para conter vazamentos de memória;
+# o jitter evita que todos reiniciem ao mesmo tempo
+max_requests = env('GUNICORN_MAX_REQUESTS', default=1000, cast=int)
+max_requests_jitter = env('GUNICORN_MAX_REQUESTS_JITTER', default=100, cast=int)
+
+# Importações de CSV grandes podem levar alguns minutos
+timeout = env('GUNICORN_TIMEOUT', default=120, cast=int)
+graceful_timeout = env('GUNICORN_GRACEFUL_TIMEOUT', default=60, cast=int)
+keepalive = env('GUNICORN_KEEPALIVE', default=5, cast=int)
+
+accesslog = '-'
+errorlog = '-'
+loglevel = env('GUNICORN_LOG_LEVEL', default='info')